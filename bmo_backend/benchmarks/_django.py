@@ -0,0 +1,36 @@
+# Shared bootstrap for the benchmark scripts: run them from bmo_backend/, e.g.
+#   python benchmarks/bench_embedding_batching.py
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bmo_backend.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+ADMIN_CSV = os.path.join(settings.MEDIA_ROOT, "Admin.csv")
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def scale_frame(df, rows):
+    """Repeat `df` up to `rows` rows, giving every copy a unique test_case_id."""
+    import pandas as pd
+    copies = -(-rows // len(df))
+    frames = []
+    for copy in range(copies):
+        frame = df.copy()
+        if "test_case_id" in frame.columns:
+            frame["test_case_id"] = frame["test_case_id"].astype(str) + f"_{copy}"
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True).head(rows)
@@ -0,0 +1,72 @@
+"""
+Recall@k and latency of the HNSW / IVF-Flat backends against the exact flat
+index used by compare_group, over a grid of search parameters.
+
+Vectors come from the on-disk embedding cache (real MiniLM embeddings of our
+descriptions and steps), resampled with small noise up to the requested
+sizes, or from synthetic clustered data with --source synthetic.
+
+    python benchmarks/bench_ann_recall.py --sizes 5000,20000,50000 --k 5
+"""
+import argparse
+import os
+
+import numpy as np
+
+from _django import timed
+from bmo_backend.ann_index import build_index
+from bmo_backend.embedding_cache import get_embedding_cache
+
+
+def load_vectors(source, size, seed=0):
+    rng = np.random.default_rng(seed)
+    if source == "cache":
+        cache = get_embedding_cache()
+        base = cache._vectors()
+        if base is None or not os.path.exists(cache.vectors_path):
+            raise SystemExit("Embedding cache is empty; run pre-processing first or use --source synthetic.")
+        base = np.asarray(base)
+    else:
+        base = rng.normal(size=(max(size // 20, 10), 384)).astype(np.float32)
+    picks = rng.integers(0, len(base), size)
+    vectors = base[picks] + rng.normal(scale=0.02, size=(size, base.shape[1]))
+    return vectors.astype(np.float32)
+
+
+def recall(exact_ids, approx_ids):
+    hits = sum(len(set(e) & set(a[a >= 0])) for e, a in zip(exact_ids, approx_ids))
+    return hits / exact_ids.size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="5000,20000,50000")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--source", choices=["cache", "synthetic"], default="cache")
+    parser.add_argument("--ef-search", default="16,32,64,128")
+    parser.add_argument("--nprobe", default="1,4,16,32")
+    args = parser.parse_args()
+
+    print(f"{'rows':>7} {'backend':>8} {'param':>12} {'build s':>8} {'search s':>9} {'recall@k':>9}")
+    for size in map(int, args.sizes.split(",")):
+        vectors = load_vectors(args.source, size)
+        # compare_group searches every vector against the whole group
+        flat, flat_build = timed(build_index, vectors, "flat")
+        (_, exact), flat_search = timed(flat.search, vectors, args.k)
+        print(f"{size:>7} {'flat':>8} {'-':>12} {flat_build:>8.2f} {flat_search:>9.2f} {1.0:>9.4f}")
+
+        hnsw, hnsw_build = timed(build_index, vectors, "hnsw")
+        for ef in map(int, args.ef_search.split(",")):
+            hnsw.hnsw.efSearch = ef
+            (_, approx), secs = timed(hnsw.search, vectors, args.k)
+            print(f"{size:>7} {'hnsw':>8} {f'efSearch={ef}':>12} {hnsw_build:>8.2f} {secs:>9.2f} {recall(exact, approx):>9.4f}")
+
+        ivf, ivf_build = timed(build_index, vectors, "ivf")
+        for nprobe in map(int, args.nprobe.split(",")):
+            ivf.nprobe = min(nprobe, ivf.nlist)
+            (_, approx), secs = timed(ivf.search, vectors, args.k)
+            print(f"{size:>7} {'ivf':>8} {f'nprobe={ivf.nprobe}':>12} {ivf_build:>8.2f} {secs:>9.2f} {recall(exact, approx):>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Latency of the read-heavy API views with the in-process artifact cache.
+
+Runs on a copy of media/ in a temp directory. The transaction summary is
+timed three ways: as it used to be computed (the baseline workbook plus
+both label sheets parsed and exploded on every GET), then through the view
+cold and warm. The processed test cases view is timed fetching one page
+from a CSV scaled to --rows rows, first streamed from disk (the previous
+path) and then from the cache. The view responses must equal the previous
+ones. Then, with the cache shrunk below the estimated size of the parsed
+frame, the view must stream the page instead of parsing the whole file.
+
+    python benchmarks/bench_artifact_cache.py --rows 10000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+
+from _django import scale_frame, timed
+from django.conf import settings
+
+MEDIA_SOURCE = settings.MEDIA_ROOT
+settings.MEDIA_ROOT = tempfile.mkdtemp(prefix="bmo-bench-")
+shutil.copytree(MEDIA_SOURCE, settings.MEDIA_ROOT, dirs_exist_ok=True)
+
+from rest_framework.test import APIRequestFactory  # noqa: E402
+from bmo_backend import api  # noqa: E402
+from bmo_backend.artifact_cache import artifact_cache, artifact_cache_stats  # noqa: E402
+from bmo_backend.artifacts import export_excel  # noqa: E402
+from bmo_backend.process_labels import process_labels  # noqa: E402
+
+
+def legacy_summary(summary_file, baseline_file):
+    baseline_df = pd.read_excel(baseline_file)
+    baselined = baseline_df["Transaction"].dropna().unique().tolist()
+    lists = []
+    for sheet in ("Matched Labels", "Not Matched Labels"):
+        series = pd.read_excel(summary_file, sheet_name=sheet)["Transactions"].dropna().str.split("|").explode()
+        counts = series.value_counts().reset_index()
+        counts.columns = ["transaction", "count"]
+        lists.append(counts.to_dict(orient="records"))
+    return {"mapped": lists[0], "unmapped": lists[1], "baselined": baselined}
+
+
+def call(view, path, **params):
+    response = view(APIRequestFactory().get(path, params))
+    if hasattr(response, "render"):
+        response.render()
+    return response.status_code, json.loads(response.content)
+
+
+def repeat(fn, times):
+    results = [timed(fn) for _ in range(times)]
+    return results[-1][0], sum(t for _, t in results) / times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000, help="Rows in the scaled processed test cases CSV.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    media = settings.MEDIA_ROOT
+
+    # Transaction summary
+    baseline_file = os.path.join(media, "Admin_metadata.xlsx")
+    result = process_labels(os.path.join(media, "Admin_with_gwt_conditions.csv"), baseline_file, {})
+    if "error" in result:
+        sys.exit(result["error"])
+    summary_file = export_excel(os.path.join(media, "transaction_summary.xlsx"))
+    expected, legacy_time = repeat(lambda: legacy_summary(summary_file, baseline_file), args.repeat)
+    summary_view = api.GetTransactionSummaryAPIView.as_view()
+    (_, cold), cold_time = timed(call, summary_view, "/api/get-transaction-summary/", metadata_url="/media/Admin_metadata.xlsx")
+    (_, warm), warm_time = repeat(lambda: call(summary_view, "/api/get-transaction-summary/", metadata_url="/media/Admin_metadata.xlsx"), args.repeat)
+    summary_ok = cold == expected and warm == expected
+    print(f"transaction summary: previous {legacy_time * 1000:.1f}ms, cold {cold_time * 1000:.1f}ms, "
+          f"warm {warm_time * 1000:.2f}ms, identical: {summary_ok}")
+
+    # Processed test cases, one page from a large CSV
+    csv_path = os.path.join(media, "processed_test_cases_bench.csv")
+    scale_frame(pd.read_csv(os.path.join(media, "processed_test_cases_mapped.csv")), args.rows).to_csv(csv_path, index=False)
+    params = {"file_url": "/media/processed_test_cases_bench.csv", "offset": args.rows // 2, "limit": 50,
+              "fields": "test_case_id,Transactions"}
+    fields = params["fields"].split(",")
+    streamed, streamed_time = repeat(lambda: list(api.iter_csv_records(csv_path, fields, None, params["offset"], 51)), args.repeat)
+    processed_view = api.GetProcessedTestCasesAPI.as_view()
+    (_, cold), cold_time = timed(call, processed_view, "/api/get-processed-test-cases/", **params)
+    (_, warm), warm_time = repeat(lambda: call(processed_view, "/api/get-processed-test-cases/", **params), args.repeat)
+    page_ok = cold == warm and warm["processed_data"] == streamed[:50]
+    print(f"processed test cases ({args.rows} rows, 1 page): streamed {streamed_time * 1000:.1f}ms, "
+          f"cold {cold_time * 1000:.1f}ms, warm {warm_time * 1000:.2f}ms, identical: {page_ok}")
+
+    # A file whose parsed frame would not fit is streamed, not parsed whole
+    estimate = api.estimate_csv_frame_bytes(csv_path)
+    actual = api.estimate_size(pd.read_csv(csv_path))
+    artifact_cache.clear()
+    max_bytes, artifact_cache.max_bytes = artifact_cache.max_bytes, estimate // 2
+    misses = artifact_cache_stats()["misses"]
+    (_, large), large_time = timed(call, processed_view, "/api/get-processed-test-cases/", **params)
+    artifact_cache.max_bytes = max_bytes
+    large_ok = large == warm and artifact_cache_stats()["misses"] == misses
+    print(f"parsed frame estimated at {estimate / 2**20:.1f} MB (actual {actual / 2**20:.1f} MB); "
+          f"above the cache size: {large_time * 1000:.1f}ms, streamed: {large_ok}")
+
+    print("artifact cache:", artifact_cache_stats())
+    shutil.rmtree(media, ignore_errors=True)
+    sys.exit(0 if summary_ok and page_ok and large_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Before/after timing of the non-spaCy dissect stage: label, transaction and
+gateway extraction plus building the output frame.
+
+"before" is the previous per-row loop (patterns compiled per row, one
+df.at write per cell); "after" is assemble_dissect_frame. Both start from
+the same GIVEN/WHEN/THEN parts, tokenized once on Admin.csv and repeated
+with the rows, and each uses a fresh in-memory label matcher. The two
+output frames are compared; exits non-zero if they differ.
+
+    python benchmarks/bench_dissect_assembly.py --rows 3000,100000
+"""
+import argparse
+import re
+import sys
+
+import pandas as pd
+
+from _django import ADMIN_CSV, scale_frame, timed
+from bmo_backend.input_dissect import GWT_COLUMNS, assemble_dissect_frame, clean_description, extract_gwt, extract_labels
+from bmo_backend.label_matcher import CanonicalLabelMatcher
+
+
+def legacy_extract_all_transactions(text):
+    sentences = text.split('|')
+    for sentence in sentences:
+        if 'transaction' in sentence.lower():
+            pattern = re.compile(r"Transaction\s*[:=]\s*([\s\S]+?)(?=\s*(?:\n|[|~]|$))", re.IGNORECASE)
+            matches = pattern.findall(text)
+            if matches:
+                transaction_types = [re.sub(r"\s+", " ", m).strip() for m in matches if m.strip()]
+                return " | ".join(transaction_types)
+            fallback_pattern = re.compile(r"(\S+)\s+transaction", re.IGNORECASE | re.DOTALL)
+            fallback_matches = fallback_pattern.findall(text)
+            if fallback_matches:
+                fallback_matches = [m.strip() for m in fallback_matches if m.strip()]
+                return " | ".join(fallback_matches)
+            return ""
+    return ""
+
+
+def legacy_assemble(df, gwt, label_matcher):
+    for i, row in df.iterrows():
+        if i not in gwt.index:
+            continue
+        given_text, when_text, then_text, condition_text, remaining_text = gwt.loc[i]
+        df.at[i, 'GIVEN'] = given_text.strip()
+        df.at[i, 'WHEN'] = when_text.strip()
+        df.at[i, 'THEN'] = then_text.strip()
+        df.at[i, 'Condition'] = condition_text.strip()
+        df.at[i, 'Remaining'] = remaining_text.strip()
+        for label, value in extract_labels(remaining_text, label_matcher).items():
+            df.at[i, label] = value
+        df.at[i, 'Transactions'] = legacy_extract_all_transactions(row['test_steps'])
+        example_pattern = re.compile(r'\b(e\.?g\.?|ex|example)\b', re.IGNORECASE)
+        if not example_pattern.search(condition_text):
+            for label, value in extract_labels(condition_text, label_matcher).items():
+                df.at[i, label] = value
+        gateway_pattern = re.compile(r'\bgateway\s*[:\-]\s*(\S+)', re.IGNORECASE)
+        gateway_match = gateway_pattern.search(condition_text)
+        df.at[i, 'Gateway'] = gateway_match.group(1).strip() if gateway_match else 'No'
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", default="3000,100000")
+    args = parser.parse_args()
+
+    base = pd.read_csv(ADMIN_CSV)
+    base_descriptions = base["Description"].where(base["Description"].map(lambda d: isinstance(d, str)))
+    base_parts = dict(zip(
+        base_descriptions.dropna().index,
+        extract_gwt([clean_description(d) for d in base_descriptions.dropna()])
+    ))
+
+    failed = False
+    for rows in [int(r) for r in args.rows.split(",")]:
+        df = scale_frame(base, rows)
+        df[GWT_COLUMNS] = ""
+        source_rows = [i % len(base) for i in range(len(df))]
+        keep = [i for i, source in enumerate(source_rows) if source in base_parts]
+        gwt = pd.DataFrame([base_parts[source_rows[i]] for i in keep], index=keep, columns=GWT_COLUMNS, dtype=object)
+
+        before, before_time = timed(legacy_assemble, df.copy(), gwt, CanonicalLabelMatcher())
+        after, after_time = timed(assemble_dissect_frame, df.copy(), gwt, CanonicalLabelMatcher())
+        try:
+            pd.testing.assert_frame_equal(before, after, check_dtype=False)
+            same = "identical"
+        except AssertionError as e:
+            same, failed = f"DIFFERENT: {e}", True
+        print(f"{rows} rows: before {before_time:.2f}s, after {after_time:.2f}s "
+              f"({before_time / max(after_time, 1e-9):.1f}x), output {same}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
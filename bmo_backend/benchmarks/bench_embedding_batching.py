@@ -0,0 +1,61 @@
+"""
+Rows/sec of the per-row embedding path (one embed_documents call per row on a
+ThreadPoolExecutor) versus the batched, length-bucketed stage used by
+pre_process_test_cases. The embedding cache is bypassed so both paths run the
+model on every row.
+
+    python benchmarks/bench_embedding_batching.py --sizes admin,50000
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from _django import ADMIN_CSV, scale_frame, timed
+from bmo_backend.embeddings import embed_in_batches, get_embedding_model
+from bmo_backend.pre_process import build_combined_text, clean_test_steps
+
+
+def load_rows(size):
+    df = pd.read_csv(ADMIN_CSV)
+    if size != "admin":
+        df = scale_frame(df, int(size))
+    df["Processed_Steps"] = df["test_steps"].map(clean_test_steps)
+    transactions = df["Transactions"] if "Transactions" in df.columns else [""] * len(df)
+    return [
+        build_combined_text(tc_id, desc, trans, steps)
+        for tc_id, desc, trans, steps in zip(df["test_case_id"], df["Description"], transactions, df["Processed_Steps"])
+    ]
+
+
+def per_row(texts):
+    embedding_model = get_embedding_model()
+    vectors = [None] * len(texts)
+    with ThreadPoolExecutor() as executor:
+        futures = {executor.submit(embedding_model.embed_documents, [text]): i for i, text in enumerate(texts)}
+        for future in as_completed(futures):
+            vectors[futures[future]] = future.result()[0]
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="admin,50000")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--per-row-limit", type=int, default=5000,
+                        help="Time the per-row path on at most this many rows and report its rate.")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'per-row rows/s':>15} {'batched rows/s':>15} {'speedup':>8}")
+    for size in args.sizes.split(","):
+        texts = load_rows(size.strip())
+        sample = texts[:args.per_row_limit]
+        _, per_row_secs = timed(per_row, sample)
+        _, batched_secs = timed(embed_in_batches, texts, get_embedding_model().embed_documents, args.batch_size)
+        per_row_rate = len(sample) / per_row_secs
+        batched_rate = len(texts) / batched_secs
+        print(f"{len(texts):>8} {per_row_rate:>15.1f} {batched_rate:>15.1f} {batched_rate / per_row_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
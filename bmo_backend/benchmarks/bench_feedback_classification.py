@@ -0,0 +1,99 @@
+"""
+Feedback classification throughput against the stub LLM server.
+
+"before" classifies row by row with a new connection per call, as the
+`ollama run` subprocess did (without the process spawn, so it flatters the
+old path). "after" is classify_feedback_rows: pooled keep-alive connections,
+bounded concurrency, and the classification cache. It runs twice: cold, then
+warm (the same workbook uploaded again). The stub fails every --fail-every-th
+request with a 503, so the retries are exercised. The results must match.
+
+    python benchmarks/bench_feedback_classification.py --rows 500 --latency 0.05
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from _django import timed
+from django.conf import settings
+
+settings.MEDIA_ROOT = tempfile.mkdtemp(prefix="bmo-bench-")
+settings.DATABASES["default"]["NAME"] = os.path.join(settings.MEDIA_ROOT, "bench.sqlite3")
+# LLM tier only (bench_feedback_tiers.py covers the kNN tier)
+settings.FEEDBACK_KNN_THRESHOLD = 1.01
+
+import requests  # noqa: E402
+from stub_llm_server import start_stub_server  # noqa: E402
+from bmo_backend import feedback as feedback_module  # noqa: E402
+from bmo_backend import llm_client  # noqa: E402
+
+REMARKS = [
+    "Same steps, only the wording differs",
+    "Minor format change in the description",
+    "Different transaction flow and validation steps",
+    "Covers a different product type",
+    "Duplicate of the other case",
+    "Steps differ after login",
+]
+
+
+def make_rows(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        (f"transaction {rng.randint(1, 40)}", rng.randint(1000, 9999), rng.randint(1000, 9999),
+         f"{rng.choice(REMARKS)} ({i % 50})")
+        for i in range(count)
+    ]
+
+
+def before(url, model, rows):
+    results = []
+    for row in rows:
+        response = requests.post(url + "/api/generate", json={
+            "model": model, "prompt": feedback_module.build_feedback_prompt(*row), "stream": False
+        }, headers={"Connection": "close"})
+        results.append(feedback_module.parse_classification(response.json()["response"]) if response.ok else "UNKNOWN")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub seconds per classification.")
+    parser.add_argument("--concurrency", type=int, default=settings.FEEDBACK_LLM_CONCURRENCY)
+    parser.add_argument("--fail-every", type=int, default=25)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    server = start_stub_server(latency=args.latency)
+    expected, before_time = timed(before, server.url, settings.FEEDBACK_LLM_MODEL, rows)
+    before_connections = server.connections
+    server.shutdown()
+    server.server_close()
+
+    server = start_stub_server(latency=args.latency, fail_every=args.fail_every)
+    llm_client._client = llm_client.LLMClient(
+        server.url, settings.FEEDBACK_LLM_MODEL, timeout=10, retries=3, backoff=0.01, max_concurrency=args.concurrency
+    )
+    cold, cold_time = timed(feedback_module.classify_feedback_rows, rows)
+    cold_requests, cold_connections = server.requests, server.connections
+    warm, warm_time = timed(feedback_module.classify_feedback_rows, rows)
+    server.shutdown()
+
+    print(f"{args.rows} rows ({len(set(map(feedback_module.feedback_key, *zip(*rows))))} distinct), stub latency {args.latency}s:")
+    print(f"  before: {before_time:.2f}s, {before_connections} connections")
+    print(f"  after, cold: {cold_time:.2f}s ({before_time / cold_time:.1f}x), {cold_requests} requests "
+          f"(incl. {cold_requests // args.fail_every if args.fail_every else 0} failed and retried) "
+          f"over {cold_connections} connections")
+    print(f"  after, warm: {warm_time * 1000:.1f}ms, {server.requests - cold_requests} requests")
+    mismatches = sum(a != b[0] for a, b in zip(expected, cold)) + sum(a != b[0] for a, b in zip(expected, warm))
+    print(f"  mismatches: {mismatches}")
+    shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Share of feedback rows the kNN tier handles, and how often it agrees with the
+LLM, over a range of confidence thresholds.
+
+The labelled history (feedback log) and the uploaded rows are
+paraphrases of the same feedback remarks, labelled by the stub LLM server.
+For each threshold, the rows go through classify_feedback_rows (kNN first,
+the stub for the rest) and are compared with classifying every row with the
+stub. Needs the MiniLM embedding model (or BMO_EMBEDDING_SOCKET).
+
+    python benchmarks/bench_feedback_tiers.py --history 300 --rows 500 --thresholds 0.7,0.8,0.85,0.9
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+from _django import timed
+from django.conf import settings
+
+settings.MEDIA_ROOT = tempfile.mkdtemp(prefix="bmo-bench-")
+settings.DATABASES["default"]["NAME"] = os.path.join(settings.MEDIA_ROOT, "bench.sqlite3")
+
+from stub_llm_server import classify, start_stub_server  # noqa: E402
+from bmo_backend import feedback as feedback_module  # noqa: E402
+from bmo_backend import feedback_classifier, llm_client  # noqa: E402
+from bmo_backend.feedback_log import append_feedback  # noqa: E402
+
+REMARKS = [
+    "same steps, wording differs", "same steps only the wording is different", "minor format change",
+    "similar with minor variations", "looks similar", "duplicate test case", "identical except for a typo",
+    "different transaction", "different transaction flow", "personal and commercial profiles are involved",
+    "steps differ after login", "validates a different product", "mark them not similar",
+]
+PREFIXES = ["", "I think ", "Reviewed: ", "Note - "]
+SUFFIXES = ["", ".", " please check", " (checked twice)"]
+
+
+def paraphrases(count, rng):
+    return [f"{rng.choice(PREFIXES)}{rng.choice(REMARKS)}{rng.choice(SUFFIXES)}" for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--history", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub seconds per classification.")
+    parser.add_argument("--thresholds", default="0.7,0.8,0.85,0.9")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    append_feedback([
+        {"Transaction_Type": "history", "Test_Case_1": i, "Test_Case_2": i + 1,
+         "Feedback": text, "Classification": classify(f'User Feedback: "{text}"')}
+        for i, text in enumerate(paraphrases(args.history, rng))
+    ], source="bench")
+    rows = [(f"transaction {rng.randint(1, 40)}", rng.randint(1000, 9999), rng.randint(1000, 9999), text)
+            for text in paraphrases(args.rows, rng)]
+    expected = [classify(f'User Feedback: "{row[3]}"') for row in rows]
+
+    server = start_stub_server(latency=args.latency)
+    llm_client._client = llm_client.LLMClient(server.url, settings.FEEDBACK_LLM_MODEL, timeout=10)
+    _, build_time = timed(feedback_classifier.get_feedback_classifier)
+    print(f"history {args.history} rows, classifier built in {build_time:.2f}s; {args.rows} uploaded rows")
+
+    for threshold in [float(t) for t in args.thresholds.split(",")] + [1.01]:
+        settings.FEEDBACK_KNN_THRESHOLD = threshold
+        if os.path.exists(feedback_module.CLASSIFICATION_CACHE_PATH):
+            os.remove(feedback_module.CLASSIFICATION_CACHE_PATH)
+        results, elapsed = timed(feedback_module.classify_feedback_rows, rows)
+        tiers = feedback_module.feedback_tier_stats([{"Tier": tier} for _, tier, _ in results])
+        knn = [(label, want) for (label, tier, _), want in zip(results, expected) if tier == "knn"]
+        agreement = sum(label == want for label, want in knn) / len(knn) if knn else 1.0
+        name = "LLM only" if threshold > 1 else f"threshold {threshold:.2f}"
+        print(f"  {name}: {elapsed:.2f}s, kNN {tiers['knn']:.1%} / LLM {tiers['llm']:.1%}, "
+              f"kNN agrees with the LLM on {agreement:.1%}")
+
+    server.shutdown()
+    shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
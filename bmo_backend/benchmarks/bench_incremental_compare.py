@@ -0,0 +1,94 @@
+"""
+Incremental compare: time and output of a full run versus delta runs.
+
+On a copy of media/ in a temp directory, the processed test cases are
+compared four ways:
+1. in full (every group recomputed), which also fills the group cache;
+2. incrementally with no changes (every group reused);
+3. incrementally after editing the description of one test case;
+4. in full on the edited file, as the reference for run 3.
+The Differences rows of runs 1 and 2, and of runs 3 and 4, must be identical.
+
+All four runs go through the group cache, so the output is also checked
+on its own: similarity columns must be rounded to 4 decimals (no float32
+noise), and with --baseline, run 1 must match, byte for byte, the results
+CSV an earlier version wrote for the same input.
+Needs the embedding model and a built FAISS store (run pre-processing first).
+
+    python benchmarks/bench_incremental_compare.py --rows 5000
+    python benchmarks/bench_incremental_compare.py --csv in.csv --baseline baseline_results.csv
+"""
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+
+from _django import scale_frame, timed
+from django.conf import settings
+
+MEDIA_SOURCE = settings.MEDIA_ROOT
+settings.MEDIA_ROOT = tempfile.mkdtemp(prefix="bmo-bench-")
+shutil.copytree(MEDIA_SOURCE, settings.MEDIA_ROOT, dirs_exist_ok=True)
+settings.DATABASES["default"]["NAME"] = os.path.join(settings.MEDIA_ROOT, "bench.sqlite3")
+
+from bmo_backend import test_case_comparison  # noqa: E402
+
+
+def run(csv_path, incremental, keep_as=None):
+    _, results_csv, _ = test_case_comparison.compare_test_cases(csv_path, incremental=incremental)
+    if keep_as:
+        shutil.copyfile(results_csv, keep_as)
+    return pd.read_csv(results_csv)
+
+
+def rounded(df):
+    """Similarity columns hold 4-decimal values, as written without the cache."""
+    columns = [c for c in ("Similarity FAISS Distance", "Similarity Score") if c in df.columns]
+    return all(df[c].equals(df[c].round(4)) for c in columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--csv", default=os.path.join(settings.MEDIA_ROOT, "processed_test_cases_mapped.csv"))
+    parser.add_argument("--rows", type=int, default=0, help="Scale the CSV up to this many rows.")
+    parser.add_argument("--baseline", help="Results CSV an earlier version wrote for the same input.")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    if args.rows:
+        df = scale_frame(df, args.rows)
+    csv_path = os.path.join(settings.MEDIA_ROOT, "processed_test_cases_bench.csv")
+    df.to_csv(csv_path, index=False)
+
+    full_csv = os.path.join(settings.MEDIA_ROOT, "bench_full_results.csv")
+    full, full_time = timed(run, csv_path, False, full_csv)
+    unchanged, unchanged_time = timed(run, csv_path, True)
+
+    edited = df.copy()
+    row = edited["Transactions"].notna().idxmax()
+    edited.loc[row, "Description"] = f"{edited.loc[row, 'Description']} (edited)"
+    edited.to_csv(csv_path, index=False)
+    delta, delta_time = timed(run, csv_path, True)
+    reference, reference_time = timed(run, csv_path, False)
+
+    unchanged_ok = full.equals(unchanged)
+    delta_ok = reference.equals(delta)
+    rounding_ok = rounded(full) and rounded(delta)
+    baseline_ok = filecmp.cmp(full_csv, args.baseline, shallow=False) if args.baseline else True
+    print(f"{len(df)} test cases, {len(full)} difference rows")
+    print(f"  full: {full_time:.2f}s")
+    print(f"  incremental, nothing changed: {unchanged_time:.2f}s, identical: {unchanged_ok}")
+    print(f"  incremental, one test case edited: {delta_time:.2f}s (full: {reference_time:.2f}s), identical: {delta_ok}")
+    print(f"  similarity columns rounded to 4 decimals: {rounding_ok}")
+    if args.baseline:
+        print(f"  full run identical to {args.baseline}: {baseline_ok}")
+    shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+    sys.exit(0 if unchanged_ok and delta_ok and rounding_ok and baseline_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Parity and speed of CanonicalLabelMatcher against the difflib lookup it
+replaced in process_test_cases.
+
+Raw label spellings are the "Key:" parts of the description lines in
+Admin.csv, extended with synthetic misspellings (dropped, swapped and
+inserted characters) up to --labels distinct spellings, then looked up
+--repeats times in a shuffled stream. Exits non-zero on any mismatch.
+
+    python benchmarks/bench_label_matcher.py --labels 3000 --repeats 5
+"""
+import argparse
+import difflib
+import random
+import sys
+
+import pandas as pd
+
+from _django import ADMIN_CSV, timed
+from bmo_backend.label_matcher import CanonicalLabelMatcher, normalize_label
+
+
+def difflib_canonical(labels, cutoff=0.8):
+    """The previous get_canonical_label loop, verbatim."""
+    canonical_dict = {}
+    out = []
+    for label in labels:
+        normalized = normalize_label(label)
+        if not canonical_dict:
+            canonical_dict[normalized] = label
+            out.append(label)
+            continue
+        matches = difflib.get_close_matches(normalized, canonical_dict.keys(), n=1, cutoff=cutoff)
+        if matches:
+            out.append(canonical_dict[matches[0]])
+        else:
+            canonical_dict[normalized] = label
+            out.append(label)
+    return out
+
+
+def indexed_canonical(labels, cache_size):
+    matcher = CanonicalLabelMatcher(cache_size=cache_size)
+    return [matcher.canonical(label) for label in labels], matcher
+
+
+def raw_labels(csv_path):
+    labels = []
+    for description in pd.read_csv(csv_path)["Description"].dropna().astype(str):
+        for line in description.split("\n"):
+            if ":" in line:
+                key = line.split(":", 1)[0].strip()
+                if key:
+                    labels.append(key)
+    return labels
+
+
+def misspell(label, rng):
+    if len(label) < 3:
+        return label + rng.choice("sx")
+    i = rng.randrange(len(label) - 1)
+    return rng.choice([
+        label[:i] + label[i + 1:],
+        label[:i] + label[i + 1] + label[i] + label[i + 2:],
+        label[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + label[i:],
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--labels", type=int, default=3000, help="Distinct spellings to generate.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--cache-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    base = list(dict.fromkeys(raw_labels(ADMIN_CSV)))
+    words = "account branch card cheque customer deposit fee limit teller vault wire".split()
+    while len(base) < args.labels // 3:
+        base.append(" ".join(rng.sample(words, rng.randint(1, 3))).title() + f" {rng.randint(1, 99)}")
+    spellings = list(base)
+    while len(spellings) < args.labels:
+        spellings.append(misspell(rng.choice(base), rng))
+    stream = spellings * args.repeats
+    rng.shuffle(stream)
+
+    expected, difflib_time = timed(difflib_canonical, stream)
+    (actual, matcher), indexed_time = timed(indexed_canonical, stream, args.cache_size)
+    mismatches = sum(a != b for a, b in zip(expected, actual))
+    print(f"{len(stream)} lookups over {len(set(stream))} spellings -> {len(matcher.labels)} canonical labels")
+    print(f"difflib {difflib_time:.2f}s, indexed {indexed_time:.2f}s "
+          f"({difflib_time / max(indexed_time, 1e-9):.1f}x), {mismatches} mismatches")
+    print(f"matcher stats: {matcher.stats}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
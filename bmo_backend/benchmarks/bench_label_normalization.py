@@ -0,0 +1,102 @@
+"""
+Throughput of transaction label normalization in process_labels.
+
+"before" runs lookup_compound and the regex cleanup for every label
+occurrence, as normalize_label used to. "after" normalizes each distinct
+label once through the memoized normalize_label (exact-word fast path +
+LRU) and maps the results back; "after, warm" repeats it with the LRU
+already filled, as on repeated UpdateTransactionMapping calls. Results
+must be identical.
+
+Labels come from the Transactions columns in media/, with misspelled
+variants, repeated up to --rows rows. Uses the BMO frequency dictionary
+when present, otherwise the English dictionary shipped with symspellpy.
+
+    python benchmarks/bench_label_normalization.py --rows 50000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+
+import pandas as pd
+
+from _django import timed
+from django.conf import settings
+from bmo_backend import process_labels as labels_module
+from bmo_backend.resources import get_resource
+
+
+def legacy_normalize(label, sym_spell):
+    if not isinstance(label, str) or not label.strip():
+        return None
+    suggestions = sym_spell.lookup_compound(label, max_edit_distance=2)
+    label = suggestions[0].term if suggestions else label
+    label = label.lower().strip()
+    label = re.sub(r"[-]", " ", label)
+    label = re.sub(r"[^\w\s]", "", label)
+    label = re.sub(r"\s+", " ", label).strip()
+    if label.endswith("s"):
+        label = label[:-1]
+    return label
+
+
+def before(column, sym_spell):
+    return [
+        [legacy_normalize(label.strip(), sym_spell) for label in value.split("|")]
+        for value in column
+    ]
+
+
+def after(column):
+    distinct = column.str.split("|").explode().str.strip().unique()
+    normalized = {label: labels_module.normalize_label(label) for label in distinct}
+    return [[normalized[label.strip()] for label in value.split("|")] for value in column]
+
+
+def load_column(rows, seed=0):
+    rng = random.Random(seed)
+    values = []
+    for name in ("processed_test_cases_mapped.csv", "Admin_with_gwt_conditions.csv"):
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        if os.path.exists(path):
+            values += pd.read_csv(path)["Transactions"].dropna().astype(str).tolist()
+    labels = sorted({label.strip() for value in values for label in value.split("|") if label.strip()})
+    variants = list(labels)
+    for label in labels:
+        for _ in range(3):
+            i = rng.randrange(len(label))
+            variants.append(label[:i] + label[i + 1:])
+    column = ["|".join(rng.sample(variants, rng.choice([1, 1, 2]))) for _ in range(rows)]
+    return pd.Series(column), len(set(variants))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    if not os.path.exists(labels_module.DICTIONARY_PATH):
+        import symspellpy
+        labels_module.DICTIONARY_PATH = os.path.join(os.path.dirname(symspellpy.__file__), "frequency_dictionary_en_82_765.txt")
+    print(f"Dictionary: {labels_module.DICTIONARY_PATH}")
+    sym_spell = get_resource("sym_spell")
+
+    column, distinct = load_column(args.rows)
+    occurrences = int(column.str.count(r"\|").sum()) + len(column)
+    expected, before_time = timed(before, column, sym_spell)
+    labels_module._normalize_label.cache_clear()
+    cold, cold_time = timed(after, column)
+    warm, warm_time = timed(after, column)
+
+    print(f"{occurrences} label occurrences, {distinct} distinct spellings")
+    for name, seconds in (("before", before_time), ("after", cold_time), ("after, warm", warm_time)):
+        print(f"  {name:12s} {seconds:7.3f}s  {occurrences / max(seconds, 1e-9):12,.0f} labels/s")
+    identical = expected == cold == warm
+    print(f"results identical: {identical}; cache: {labels_module._normalize_label.cache_info()}")
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Per-group comparison in-process versus across a process pool.
+
+Groups come from the processed test cases scaled up to --rows and exploded
+on Transactions, with group sizes skewed by --skew so one transaction
+dominates (the case the largest-first scheduling is for). Embeddings are
+random unit vectors (seeded), so the model is not needed. Each worker count
+is timed on the same tasks and its output must equal the in-process run.
+
+    python benchmarks/bench_parallel_compare.py --rows 20000 --workers 2,4,8
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from _django import scale_frame, timed
+from django.conf import settings
+from bmo_backend.ann_index import choose_backend
+from bmo_backend.group_compare import compare_groups, metadata_fields
+from bmo_backend.test_case_comparison import comparison_options, transaction_groups
+
+
+def build_tasks(df, skew, rng):
+    transactions = df["Transactions"].fillna("").astype(str).str.split("|").explode().unique()
+    # Zipf-like weights: the first transaction gets the biggest share
+    weights = 1 / np.arange(1, len(transactions) + 1) ** skew
+    df = df.assign(Transactions=rng.choice(transactions, size=len(df), p=weights / weights.sum()))
+    fields = metadata_fields(df)
+    tasks = [{
+        "transaction": transaction, "test_case_ids": df["test_case_id"].to_numpy()[rows].tolist(),
+        "fields": {name: values[rows] for name, values in fields.items()}, "verdicts": {},
+        "backend": choose_backend(len(rows)), "rows": rows,
+    } for transaction, rows in transaction_groups(df).items()]
+    embeddings = rng.standard_normal((len(df), 384)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return tasks, embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--csv", default=os.path.join(settings.MEDIA_ROOT, "processed_test_cases_mapped.csv"))
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--workers", default="2,4")
+    args = parser.parse_args()
+
+    tasks, embeddings = build_tasks(scale_frame(pd.read_csv(args.csv), args.rows), args.skew, np.random.default_rng(0))
+    options = comparison_options()
+    sizes = sorted((len(task["test_case_ids"]) for task in tasks), reverse=True)
+    print(f"{len(tasks)} groups, {len(embeddings)} rows, largest groups {sizes[:3]}; {os.cpu_count()} CPUs")
+
+    serial, serial_time = timed(compare_groups, tasks, embeddings, options, 1)
+    print(f"  in-process: {serial_time:.2f}s")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        parallel, elapsed = timed(compare_groups, tasks, embeddings, options, workers)
+        print(f"  {workers} workers: {elapsed:.2f}s ({serial_time / elapsed:.2f}x), identical: {parallel == serial}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Load time and peak RSS of SymSpell built from the dictionary text versus
+loaded from the pickled snapshot. Each measurement runs in a fresh Python
+process so the RSS numbers are comparable.
+
+Uses the BMO frequency dictionary when present, otherwise the English
+dictionary shipped with symspellpy (with the same build parameters).
+
+    python benchmarks/bench_symspell_snapshot.py
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def child(mode, dictionary_path, snapshot_dir):
+    import _django  # noqa: F401
+    from bmo_backend import process_labels
+    from bmo_backend.symspell_snapshot import build_sym_spell, load_or_build_sym_spell
+
+    start = time.perf_counter()
+    if mode == "text":
+        sym_spell = build_sym_spell(dictionary_path, process_labels.SYMSPELL_MAX_EDIT_DISTANCE, process_labels.SYMSPELL_PREFIX_LENGTH)
+    else:
+        version = process_labels.dictionary_version(dictionary_path)
+        sym_spell = load_or_build_sym_spell(dictionary_path, snapshot_dir, version,
+                                            process_labels.SYMSPELL_MAX_EDIT_DISTANCE, process_labels.SYMSPELL_PREFIX_LENGTH)
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    print(json.dumps({"seconds": seconds, "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                      "words": len(sym_spell.words)}))
+
+
+def run(mode, dictionary_path, snapshot_dir):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--dictionary", dictionary_path, "--snapshot-dir", snapshot_dir],
+        check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--child", choices=["text", "snapshot"])
+    parser.add_argument("--dictionary")
+    parser.add_argument("--snapshot-dir")
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args.dictionary, args.snapshot_dir)
+
+    import _django  # noqa: F401
+    from bmo_backend import process_labels
+    dictionary_path = process_labels.DICTIONARY_PATH
+    if not os.path.exists(dictionary_path):
+        import symspellpy
+        dictionary_path = os.path.join(os.path.dirname(symspellpy.__file__), "frequency_dictionary_en_82_765.txt")
+    print(f"Dictionary: {dictionary_path}")
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        text = run("text", dictionary_path, snapshot_dir)
+        first = run("snapshot", dictionary_path, snapshot_dir)  # builds and writes the snapshot
+        snapshot = run("snapshot", dictionary_path, snapshot_dir)
+        size_mb = sum(os.path.getsize(os.path.join(snapshot_dir, f)) for f in os.listdir(snapshot_dir)) / 2 ** 20
+    print(f"{text['words']} words, snapshot {size_mb:.1f} MB")
+    for name, result in (("build from text", text), ("first start (build + save)", first), ("load snapshot", snapshot)):
+        print(f"  {name:28s} {result['seconds']:7.2f}s  peak RSS {result['max_rss_mb']:7.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
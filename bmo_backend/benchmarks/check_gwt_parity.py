@@ -0,0 +1,67 @@
+"""
+Parity and speed check for the batched GIVEN/WHEN/THEN extraction.
+
+The reference path tokenizes every description one at a time with the full
+en_core_web_sm pipeline (the previous behaviour of process_test_cases). The
+batched path is extract_gwt (nlp.pipe, components disabled). It also checks
+the GWT columns written by process_test_cases. Exits non-zero on any mismatch.
+
+    python benchmarks/check_gwt_parity.py --rows 20000 --n-process 2
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from _django import ADMIN_CSV, scale_frame, timed
+from bmo_backend.input_dissect import clean_description, extract_gwt, process_test_cases, split_gwt
+from bmo_backend.resources import get_resource
+
+GWT_COLUMNS = ["GIVEN", "WHEN", "THEN", "Condition", "Remaining"]
+
+
+def reference_gwt(nlp, descriptions):
+    return [split_gwt(nlp(description), description) for description in descriptions]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--csv", default=ADMIN_CSV)
+    parser.add_argument("--rows", type=int, default=0, help="Scale the CSV up to this many rows for timing.")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--n-process", type=int, default=1)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    if args.rows:
+        df = scale_frame(df, args.rows)
+    descriptions = [clean_description(d) for d in df["Description"] if isinstance(d, str)]
+    nlp = get_resource("spacy_nlp")
+
+    reference, reference_time = timed(reference_gwt, nlp, descriptions)
+    batched, batched_time = timed(extract_gwt, descriptions, nlp, args.batch_size, args.n_process)
+    mismatches = [i for i, (a, b) in enumerate(zip(reference, batched)) if a != b]
+    print(f"{len(descriptions)} descriptions: per-row {reference_time:.2f}s, "
+          f"batched {batched_time:.2f}s ({reference_time / max(batched_time, 1e-9):.1f}x), "
+          f"{len(mismatches)} mismatches")
+
+    # End-to-end: the columns process_test_cases writes (stripped, as stored)
+    result = process_test_cases(args.csv)
+    output = pd.DataFrame(result["data"])
+    expected = pd.read_csv(args.csv)["Description"]
+    expected_rows = [
+        tuple(part.strip() for part in split_gwt(nlp(clean_description(d)), clean_description(d)))
+        if isinstance(d, str) else ("",) * len(GWT_COLUMNS)
+        for d in expected
+    ]
+    actual_rows = list(output[GWT_COLUMNS].fillna("").itertuples(index=False, name=None))
+    column_mismatches = sum(a != b for a, b in zip(expected_rows, actual_rows))
+    print(f"process_test_cases GWT columns: {column_mismatches} mismatching rows of {len(expected_rows)}")
+
+    for i in mismatches[:5]:
+        print(f"  row {i}:\n    per-row: {reference[i]}\n    batched: {batched[i]}")
+    sys.exit(1 if mismatches or column_mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
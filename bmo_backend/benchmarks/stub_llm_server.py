@@ -0,0 +1,100 @@
+"""
+Stub of the Ollama /api/generate endpoint for exercising the feedback client
+without a model.
+
+It classifies the quoted `User Feedback` in the prompt by keywords (BOOST
+for wording/format-only remarks, PENALIZE otherwise) after an artificial
+latency, and can fail every Nth request with a 503 to exercise retries.
+Counts requests and accepted connections.
+
+    python benchmarks/stub_llm_server.py --port 11434 --latency 0.2
+    BMO_FEEDBACK_LLM_URL=http://127.0.0.1:11434 python manage.py runserver
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BOOST_WORDS = re.compile(r"\b(same|similar|minor|wording|format|typo|duplicate|identical)\b", re.IGNORECASE)
+FEEDBACK_LINE = re.compile(r'User Feedback: "(.*)"')
+
+
+def classify(prompt):
+    match = FEEDBACK_LINE.search(prompt)
+    return "BOOST" if match and BOOST_WORDS.search(match.group(1)) else "PENALIZE"
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, fail_every=0):
+        super().__init__(address, StubLLMHandler)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self.connections = 0
+        self._counter_lock = threading.Lock()
+
+    def get_request(self):
+        with self._counter_lock:
+            self.connections += 1
+        return super().get_request()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse connections
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server._counter_lock:
+            self.server.requests += 1
+            number = self.server.requests
+        if self.path != "/api/generate":
+            return self._reply(404, {"error": "not found"})
+        if self.server.fail_every and number % self.server.fail_every == 0:
+            return self._reply(503, {"error": "stub overloaded"})
+        request = json.loads(body)
+        time.sleep(self.server.latency)
+        self._reply(200, {"model": request.get("model"), "response": classify(request.get("prompt", "")), "done": True})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(host="127.0.0.1", port=0, latency=0.0, fail_every=0):
+    """Start the stub on a background thread; returns the server (see .url, .shutdown())."""
+    server = StubLLMServer((host, port), latency, fail_every)
+    threading.Thread(target=server.serve_forever, name="stub-llm", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per classification.")
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth request with 503.")
+    args = parser.parse_args()
+    server = StubLLMServer((args.host, args.port), args.latency, args.fail_every)
+    print(f"Stub LLM listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
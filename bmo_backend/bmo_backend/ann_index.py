@@ -0,0 +1,48 @@
+import math
+import numpy as np
+import faiss
+from django.conf import settings
+
+INDEX_BACKENDS = ("flat", "hnsw", "ivf")
+
+
+def choose_backend(num_vectors, backend=None):
+    """Resolve the configured backend; "auto" switches from flat to HNSW above the size threshold."""
+    backend = (backend or getattr(settings, "COMPARISON_INDEX_BACKEND", "auto")).lower()
+    if backend == "auto":
+        threshold = getattr(settings, "COMPARISON_ANN_THRESHOLD", 5000)
+        return "hnsw" if num_vectors >= threshold else "flat"
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend '{backend}'. Expected one of: auto, {', '.join(INDEX_BACKENDS)}.")
+    return backend
+
+
+def build_index(embeddings, backend=None, hnsw_m=None, ef_construction=None, ef_search=None, nlist=None, nprobe=None):
+    """
+    Build an L2 index over `embeddings` (float32, n x d) for kNN search.
+
+    "flat" is exact. "hnsw" and "ivf" are approximate and return the same
+    squared-L2 distances; IVF may return -1 for missing neighbours when few
+    lists are probed. Parameters default to the COMPARISON_* settings.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    num_vectors, dimension = embeddings.shape
+    backend = choose_backend(num_vectors, backend)
+
+    if backend == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, hnsw_m or getattr(settings, "COMPARISON_HNSW_M", 32))
+        index.hnsw.efConstruction = ef_construction or getattr(settings, "COMPARISON_HNSW_EF_CONSTRUCTION", 80)
+        index.hnsw.efSearch = ef_search or getattr(settings, "COMPARISON_HNSW_EF_SEARCH", 64)
+        index.add(embeddings)
+    elif backend == "ivf":
+        # Rule of thumb: ~4*sqrt(n) lists, each needing enough training points
+        nlist = nlist or max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39 or 1))
+        quantizer = faiss.IndexFlatL2(dimension)
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        index.train(embeddings)
+        index.add(embeddings)
+        index.nprobe = min(nlist, nprobe or getattr(settings, "COMPARISON_IVF_NPROBE", 16))
+    else:
+        index = faiss.IndexFlatL2(dimension)
+        index.add(embeddings)
+    return index
@@ -3,18 +3,88 @@ import os
 from django.core.files.storage import FileSystemStorage, default_storage
 from django.core.files.base import ContentFile
 import json
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 import pandas as pd
 from django.conf import settings
 from rest_framework.views import APIView
 from django.core.paginator import Paginator
 from rest_framework.response import Response
 from rest_framework import status
-from .input_dissect import process_test_cases
+from .input_dissect import get_dissect_result, read_dissect_records
 from .process_labels import process_labels
 from .pre_process import pre_process_test_cases
 from .test_case_comparison import compare_test_cases
-from .feedback import feedback
+from .feedback import feedback, feedback_tier_stats
+from .embedding_cache import embedding_cache_stats
+from .resources import resource_status, is_ready
+from .artifacts import artifact_path, artifact_exists, read_artifact
+from .artifact_cache import artifact_cache, cached_artifact, artifact_cache_stats, estimate_size
+from .feedback_log import append_feedback
+from .jobs import register_job, submit_job, get_job, list_jobs, cancel_job, retry_job
+
+
+def load_baseline_transactions(baseline_file_path):
+    """Canonical transaction types listed in the baseline workbook."""
+    baseline_df = pd.read_excel(baseline_file_path)
+    if baseline_df.empty:
+        raise ValueError('Baseline sheet is empty.')
+    if "Transaction" not in baseline_df.columns:
+        raise ValueError('Expected column "Baselined Transactions" not found in baseline sheet.')
+    return baseline_df["Transaction"].dropna().unique().tolist()
+
+
+def load_transaction_counts():
+    """Per-transaction counts of mapped and unmapped labels, as precomputed by process_labels."""
+    def records(name):
+        counts = read_artifact(name, columns=['Transactions', 'count'])
+        return counts.rename(columns={'Transactions': 'transaction'}).to_dict(orient='records')
+    return records('labels/matched_summary'), records('labels/not_matched_summary')
+
+
+def wants_async(request):
+    """Long-running endpoints run as background jobs when called with async=true."""
+    value = request.GET.get('async', request.data.get('async', False) if hasattr(request, 'data') else False)
+    return str(value).lower() in ('true', '1')
+
+
+def job_accepted_response(job_id):
+    return JsonResponse({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/jobs/{job_id}/"
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+# Background job tasks: each returns the same payload as its synchronous endpoint
+def process_labels_job(params, progress=None):
+    if progress:
+        progress(0, 1, "Processing labels")
+    result = process_labels(params["csv_file_path"], params["metadata_file_path"])
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result
+
+def pre_process_job(params, progress=None):
+    if progress:
+        progress(0, 1, f"Pre-processing {params['transaction_type']} test cases")
+    output_file, message = pre_process_test_cases(params["input_file_path"], params["transaction_type"])
+    if not output_file:
+        raise RuntimeError(message)
+    return {"message": message, "processed_file_url": os.path.join(settings.MEDIA_URL, os.path.basename(output_file))}
+
+def compare_job(params, progress=None):
+    comparison_results_json, comparison_results_file, excel_output_path = compare_test_cases(
+        params["file_path"], progress_callback=progress, incremental=params.get("incremental")
+    )
+    return {
+        "comparison_results_file": comparison_results_file,
+        "comparison_results": comparison_results_json,
+        "excel_output_path": os.path.basename(excel_output_path)
+    }
+
+register_job("process_labels", process_labels_job)
+register_job("pre_process", pre_process_job)
+register_job("compare", compare_job)
 
 
 class UploadFileAPIView(APIView):
@@ -35,8 +105,8 @@ class UploadFileAPIView(APIView):
         file_path = os.path.join(settings.MEDIA_ROOT, filename)
         print("File path:", file_path)
         
-        # Process the file using the helper function
-        result = process_test_cases(file_path)
+        # Process the file using the helper function (fills the dissect cache for the page requests)
+        result = get_dissect_result(file_path)
         print("Processing result:", result)
         if 'error' in result:
             return Response({'error': result['error']}, status=status.HTTP_400_BAD_REQUEST)
@@ -60,11 +130,9 @@ class DissectTestCasesAPIView(APIView):
             relative_file_path = file_url.lstrip('/')
         
         file_path = os.path.join(settings.MEDIA_ROOT, relative_file_path)
-        result = process_test_cases(file_path)
+        result = get_dissect_result(file_path)
         if 'error' in result:
             return Response({'error': result['error']}, status=status.HTTP_400_BAD_REQUEST)
-        
-        data_list = result['data']  # List of processed records
 
         # Convert the processed file path to a URL (assuming it's saved in MEDIA_ROOT)
         processed_file_path = result.get('output_file_path')
@@ -73,19 +141,20 @@ class DissectTestCasesAPIView(APIView):
         # Check if the "all" flag is provided in the query string
         if request.GET.get('all', 'false').lower() == 'true':
             return Response({
-                'data': data_list,
+                'data': read_dissect_records(result['table_path']),
                 'processed_file_url': processed_file_url,
             }, status=status.HTTP_200_OK)
         
-        # Otherwise, return paginated results
+        # Otherwise, return paginated results, decoding only the rows of this page
         page_number = request.GET.get('page', 1)
-        paginator = Paginator(data_list, 10)  # 10 records per page
+        paginator = Paginator(range(result['num_rows']), 10)  # 10 records per page
         page_obj = paginator.get_page(page_number)
+        rows = page_obj.object_list
         
         paginated_data = {
             'current_page': page_obj.number,
             'total_pages': paginator.num_pages,
-            'data': list(page_obj.object_list),
+            'data': read_dissect_records(result['table_path'], rows.start, rows.stop) if len(rows) else [],
             'has_next': page_obj.has_next(),
             'has_previous': page_obj.has_previous(),
             'processed_file_url': processed_file_url,
@@ -119,6 +188,11 @@ class ProcessLabelsAPIView(APIView):
             return Response({"error": f"CSV file not found: {csv_file_path}"}, status=status.HTTP_404_NOT_FOUND)
         if not os.path.exists(metadata_file_path):
             return Response({"error": f"Metadata file not found: {metadata_file_path}"}, status=status.HTTP_404_NOT_FOUND)
+
+        if wants_async(request):
+            return job_accepted_response(submit_job("process_labels", {
+                "csv_file_path": csv_file_path, "metadata_file_path": metadata_file_path
+            }))
         
         result = process_labels(csv_file_path, metadata_file_path)
         print("result from processlabel api",result)
@@ -139,8 +213,7 @@ class UploadMetadataAPIView(APIView):
 class GetTransactionSummaryAPIView(APIView):
     def get(self, request, format=None):
         try:
-            summary_file = os.path.join(settings.MEDIA_ROOT, 'transaction_summary.xlsx')
-            if not os.path.exists(summary_file):
+            if not artifact_exists('labels/matched_summary') or not artifact_exists('labels/not_matched_summary'):
                 return Response({'error': 'Summary file not found.'},
                                 status=status.HTTP_404_NOT_FOUND)
             baseline_file_url = request.GET.get('metadata_url')
@@ -158,37 +231,16 @@ class GetTransactionSummaryAPIView(APIView):
             if not os.path.exists(baseline_file_path):
                 return Response({'error': 'Baseline file not found.'}, status=status.HTTP_404_NOT_FOUND)
             
-            # Read the baseline sheet to get canonical transaction types
-            baseline_df = pd.read_excel(baseline_file_path)
-            if baseline_df.empty:
-                return Response({'error': 'Baseline sheet is empty.'}, status=status.HTTP_400_BAD_REQUEST)
-            if "Transaction" not in baseline_df.columns:
-                return Response({'error': 'Expected column "Baselined Transactions" not found in baseline sheet.'}, status=status.HTTP_400_BAD_REQUEST)
-            baselined_list = baseline_df["Transaction"].dropna().unique().tolist()
-            print(f"Baselined List: {baselined_list}")
-            # Read the "Matched Labels" and "Not Matched Labels" sheets.
-            matched_df = pd.read_excel(summary_file, sheet_name='Matched Labels')
-            not_matched_df = pd.read_excel(summary_file, sheet_name='Not Matched Labels')
-            
-            # Check for the expected "Transactions" column in both sheets.
-            if 'Transactions' not in matched_df.columns or 'Transactions' not in not_matched_df.columns:
-                return Response({'error': 'Expected column "Transactions" not found in one or both sheets.'},
-                                status=status.HTTP_400_BAD_REQUEST)
-            
-            # Process the "Transactions" column by splitting on '|' and exploding to separate rows.
-            matched_series = matched_df['Transactions'].dropna().str.split("|").explode()
-            not_matched_series = not_matched_df['Transactions'].dropna().str.split("|").explode()
-            
-            # Group the transactions and count occurrences.
-            mapped_counts = matched_series.value_counts().reset_index()
-            mapped_counts.columns = ['transaction', 'count']
-            
-            unmapped_counts = not_matched_series.value_counts().reset_index()
-            unmapped_counts.columns = ['transaction', 'count']
-            
-            mapped_list = mapped_counts.to_dict(orient='records')
-            unmapped_list = unmapped_counts.to_dict(orient='records')
-            print(f"Mapped List: {mapped_list}, Unmapped List: {unmapped_list}, Baselined List: {baselined_list}")
+            # Canonical transaction types from the baseline sheet, parsed again only when the file changes
+            baselined_list = cached_artifact("baseline_transactions", baseline_file_path,
+                                             lambda: load_baseline_transactions(baseline_file_path))
+            # Transaction counts are precomputed by process_labels when it writes the label artifacts
+            mapped_list, unmapped_list = cached_artifact(
+                "transaction_counts",
+                [artifact_path('labels/matched_summary'), artifact_path('labels/not_matched_summary')],
+                load_transaction_counts
+            )
+            print(f"Mapped List: {len(mapped_list)}, Unmapped List: {len(unmapped_list)}, Baselined List: {len(baselined_list)}")
             return Response({
                 'mapped': mapped_list,
                 'unmapped': unmapped_list,
@@ -251,20 +303,17 @@ class PreProcessTestCasesAPI(APIView):
             if not transaction_type:
                 return Response({"error": "Missing transaction_type parameter."}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Fetch the latest summary file from the media folder
-            media_path = settings.MEDIA_ROOT
-    
-            summary_files = [f for f in os.listdir(media_path) if f.startswith("transaction_summary") and f.endswith(".xlsx")]
-            print("Summary files:", summary_files)
-            if not summary_files:
+            # The label stage writes matched / not matched test cases as artifacts
+            artifact = "labels/matched" if transaction_type == "mapped" else "labels/not_matched"
+            if not artifact_exists(artifact):
                 return Response({"error": "No summary file found."}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Get the latest summary file based on creation time
-            latest_summary_file = max(summary_files, key=lambda f: os.path.getctime(os.path.join(media_path, f)))
-            print("Latest summary file:", latest_summary_file)
-            input_file_path = os.path.join(media_path, latest_summary_file)
+            input_file_path = artifact_path(artifact)
             print("Input file path:", input_file_path)
             print("Transaction type:", transaction_type)
+            if wants_async(request):
+                return job_accepted_response(submit_job("pre_process", {
+                    "input_file_path": input_file_path, "transaction_type": transaction_type
+                }))
             # Process test cases with the selected transaction type
             output_file, message = pre_process_test_cases(input_file_path, transaction_type)
 
@@ -277,7 +326,58 @@ class PreProcessTestCasesAPI(APIView):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def iter_csv_records(file_path, fields=None, filters=None, offset=0, limit=None, chunksize=5000):
+    """
+    Yield rows of a CSV as dicts (NaN -> ''), reading it in chunks so memory
+    stays flat. Only `fields` (plus filter columns) are parsed; `filters`
+    maps column -> required value (compared as strings).
+    """
+    usecols = None
+    if fields:
+        usecols = list(dict.fromkeys(list(fields) + list(filters or {})))
+    chunks = pd.read_csv(file_path, usecols=usecols, chunksize=chunksize)
+    return iter_frame_records(chunks, fields, filters, offset, limit)
+
+def iter_frame_records(chunks, fields=None, filters=None, offset=0, limit=None):
+    """Yield the selected rows of a sequence of DataFrames as dicts (NaN -> ''), without modifying them."""
+    filters = filters or {}
+    skipped = produced = 0
+    for chunk in chunks:
+        for column, value in filters.items():
+            chunk = chunk[chunk[column].fillna('').astype(str) == value]
+        if skipped < offset:
+            skip = min(offset - skipped, len(chunk))
+            chunk = chunk.iloc[skip:]
+            skipped += skip
+        if limit is not None:
+            chunk = chunk.iloc[:limit - produced]
+        if fields:
+            chunk = chunk[list(fields)]
+        for record in chunk.fillna('').to_dict(orient='records'):
+            yield record
+        produced += len(chunk)
+        if limit is not None and produced >= limit:
+            return
+
+def estimate_csv_frame_bytes(file_path, sample_rows=200):
+    """
+    In-memory size of a CSV once parsed, extrapolated from its first rows
+    (a parsed frame is several times the size of the file).
+    """
+    sample = pd.read_csv(file_path, nrows=sample_rows)
+    if sample.empty:
+        return 0
+    sample_file_bytes = len(sample.to_csv(index=False).encode("utf-8"))
+    return int(estimate_size(sample) / sample_file_bytes * os.path.getsize(file_path))
+
 class GetProcessedTestCasesAPI(APIView):
+    """
+    Query parameters (all optional; without them every row and column is returned):
+      offset, limit     - pagination over the (filtered) rows
+      fields            - comma-separated columns to return
+      filter            - Column:value exact match, may be repeated
+      output=ndjson     - stream one JSON object per line instead of one JSON document
+    """
     def get(self, request, format=None):
         try:
             file_url = request.GET.get('file_url')
@@ -296,13 +396,57 @@ class GetProcessedTestCasesAPI(APIView):
             if not os.path.exists(file_path):
                 return JsonResponse({"error": "File not found."}, status=status.HTTP_404_NOT_FOUND)
 
-            # If file exists, process and send the content
-            with open(file_path, 'r', encoding='utf-8') as file:
-                # Read the content and process it
-                df = pd.read_csv(file)
-                processed_data = df.fillna('').to_dict(orient='records')
-                
-                return JsonResponse({"processed_data": processed_data}, status=status.HTTP_200_OK)
+            try:
+                offset = max(int(request.GET.get('offset', 0)), 0)
+                limit = int(request.GET['limit']) if request.GET.get('limit') else None
+            except ValueError:
+                return JsonResponse({"error": "offset and limit must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+            fields = [f.strip() for f in request.GET.get('fields', '').split(',') if f.strip()] or None
+            filters = {}
+            for item in request.GET.getlist('filter'):
+                if ':' not in item:
+                    return JsonResponse({"error": f"Invalid filter '{item}', expected Column:value."}, status=status.HTTP_400_BAD_REQUEST)
+                column, value = item.split(':', 1)
+                filters[column.strip()] = value.strip()
+
+            # Pages of files whose parsed frame fits in the artifact cache are served from
+            # memory; larger files, and ndjson output, are streamed from disk in chunks
+            # up to offset + limit
+            frame = None
+            if request.GET.get('output') != 'ndjson':
+                frame = artifact_cache.peek("csv", file_path)
+                if frame is None and estimate_csv_frame_bytes(file_path) <= artifact_cache.max_bytes:
+                    frame = cached_artifact("csv", file_path, lambda: pd.read_csv(file_path))
+            if frame is not None:
+                columns = frame.columns
+                read_records = lambda offset, limit: iter_frame_records([frame], fields, filters, offset, limit)
+            else:
+                # Validate requested columns against the header only
+                columns = pd.read_csv(file_path, nrows=0).columns
+                read_records = lambda offset, limit: iter_csv_records(file_path, fields, filters, offset, limit)
+            unknown = [c for c in (fields or []) + list(filters) if c not in columns]
+            if unknown:
+                return JsonResponse({"error": f"Unknown columns: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+            if request.GET.get('output') == 'ndjson':
+                records = read_records(offset, limit)
+                return StreamingHttpResponse(
+                    (json.dumps(record) + "\n" for record in records),
+                    content_type="application/x-ndjson"
+                )
+
+            # Fetch one extra row to know whether another page exists
+            fetch = limit + 1 if limit is not None else None
+            processed_data = list(read_records(offset, fetch))
+            has_more = limit is not None and len(processed_data) > limit
+            if has_more:
+                processed_data = processed_data[:limit]
+            return JsonResponse({
+                "processed_data": processed_data,
+                "offset": offset,
+                "limit": limit,
+                "has_more": has_more
+            }, status=status.HTTP_200_OK)
             
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -326,8 +470,14 @@ class CompareTestCasesAPI(APIView):
             # Check if the file exists
             if not os.path.exists(file_path):
                 return JsonResponse({"error": "File not found."}, status=status.HTTP_404_NOT_FOUND)
+
+            # incremental=false recomputes every transaction group instead of reusing cached ones
+            incremental = request.GET.get('incremental')
+            incremental = None if incremental is None else incremental.lower() in ('true', '1')
+            if wants_async(request):
+                return job_accepted_response(submit_job("compare", {"file_path": file_path, "incremental": incremental}))
             
-            comparison_results_json, comparison_results_file,excel_output_path = compare_test_cases(file_path)
+            comparison_results_json, comparison_results_file,excel_output_path = compare_test_cases(file_path, incremental=incremental)
             excel_output_path = os.path.basename(excel_output_path)
             # Return the results in the response
             return JsonResponse({
@@ -356,7 +506,8 @@ class Feedback(APIView):
             return JsonResponse({
                 "message": "Feedback file uploaded successfully",
                 "file_path": saved_path,
-                "feedback_json":feedback_json
+                "feedback_json":feedback_json,
+                "tier_stats": feedback_tier_stats(feedback_json)
             }, status=status.HTTP_201_CREATED)
 
         except Exception as e:
@@ -370,14 +521,53 @@ class SaveFeedback(APIView):
             if not feedback_data:
                 return JsonResponse({"error": "No feedback data received"}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Save the updated feedback to a JSON file (or database)
-            feedback_dir = r"feedback_files"
-            file_path = os.path.join(settings.MEDIA_ROOT,feedback_dir, "updated_feedback.json")
-            print("File path for saving feedback:", file_path)
-            with open(file_path, "w") as f:
-                json.dump(feedback_data, f, indent=4)
+            # Append new and changed verdicts to the feedback log (compare and the kNN tier read it)
+            appended = append_feedback(feedback_data, source="save-feedback")
+            print(f"Feedback log: {appended} of {len(feedback_data)} rows appended")
 
-            return JsonResponse({"message": "Feedback saved successfully", "file_path": file_path}, status=status.HTTP_200_OK)
+            return JsonResponse({"message": "Feedback saved successfully", "appended": appended}, status=status.HTTP_200_OK)
 
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class EmbeddingCacheStatsAPI(APIView):
+    def get(self, request, format=None):
+        return JsonResponse({"embedding_cache": embedding_cache_stats(), "artifact_cache": artifact_cache_stats()},
+                            status=status.HTTP_200_OK)
+
+class ReadinessAPI(APIView):
+    def get(self, request, format=None):
+        # Without warm-up, resources load lazily on first use and the worker is ready immediately
+        ready = is_ready() if settings.WARM_UP_RESOURCES else True
+        return JsonResponse(
+            {"ready": ready, "warm_up": settings.WARM_UP_RESOURCES, "resources": resource_status()},
+            status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+class JobListAPI(APIView):
+    def get(self, request, format=None):
+        return JsonResponse({"jobs": list_jobs()}, status=status.HTTP_200_OK)
+
+class JobStatusAPI(APIView):
+    def get(self, request, job_id, format=None):
+        job = get_job(job_id)
+        if job is None:
+            return JsonResponse({"error": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+        return JsonResponse(job, status=status.HTTP_200_OK)
+
+class JobCancelAPI(APIView):
+    def post(self, request, job_id, format=None):
+        job = cancel_job(job_id)
+        if job is None:
+            return JsonResponse({"error": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+        return JsonResponse(job, status=status.HTTP_200_OK)
+
+class JobRetryAPI(APIView):
+    def post(self, request, job_id, format=None):
+        job, requeued = retry_job(job_id)
+        if job is None:
+            return JsonResponse({"error": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not requeued:
+            return JsonResponse({"error": f"Only failed, cancelled or interrupted jobs can be retried (job is {job['status']})."},
+                                status=status.HTTP_409_CONFLICT)
+        return JsonResponse(job, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,146 @@
+"""
+In-process cache of parsed artifacts shared by the API views.
+
+Views used to re-read and re-parse the same files on every request (CSV and
+Parquet tables, the FAISS store, the transaction summary). Parsed values are
+now kept in a size-bounded LRU keyed by (kind, paths). Each entry remembers
+the (mtime, size, inode) signature of its files and is reloaded when a file
+changes, so a file rewritten by another worker is picked up on the next read.
+Stages in this process also call invalidate() right after they rewrite a
+file, which does not depend on mtime resolution.
+
+Cached values are shared between requests: callers must not mutate them
+(copy a DataFrame before changing it).
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+
+def file_signature(path):
+    """(mtime_ns, size, inode) of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def estimate_size(value):
+    """Approximate in-memory size of a cached value in bytes."""
+    if hasattr(value, "memory_usage"):        # pandas DataFrame
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, "nbytes"):              # numpy array, pyarrow Table
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple, dict)):
+        items = value.items() if isinstance(value, dict) else value
+        return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in items)
+    return sys.getsizeof(value)
+
+
+class ArtifactCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (kind, paths) -> (signatures, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "uncacheable": 0}
+
+    def get(self, kind, paths, loader, sizeof=estimate_size):
+        """
+        Return loader() for the files `paths` (a path or a list of paths),
+        loading it only when it is not cached or one of the files changed.
+        Values larger than the whole cache are returned without being kept.
+        """
+        key, signatures = self._key(kind, paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signatures:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # One thread loads a given key; others wait for it instead of parsing the same file
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == signatures:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                self.stats["misses"] += 1
+            value = loader()
+            size = sizeof(value)
+            with self._lock:
+                self._remove(key)
+                if size > self.max_bytes:
+                    self.stats["uncacheable"] += 1
+                    return value
+                self._entries[key] = (signatures, value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+                    self.stats["evictions"] += 1
+            return value
+
+    def peek(self, kind, paths):
+        """The cached value for `paths` if it is cached and current, else None (nothing is loaded)."""
+        key, signatures = self._key(kind, paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signatures:
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    @staticmethod
+    def _key(kind, paths):
+        paths = (paths,) if isinstance(paths, str) else tuple(paths)
+        return (kind, paths), tuple(file_signature(path) for path in paths)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def invalidate(self, path):
+        """Drop every entry that depends on `path` (or on a file below it, for a directory)."""
+        path = os.path.normpath(path)
+        prefix = path + os.sep
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if any(os.path.normpath(p) == path or os.path.normpath(p).startswith(prefix) for p in key[1])
+            ]
+            for key in stale:
+                self._remove(key)
+            self.stats["invalidations"] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+
+
+artifact_cache = ArtifactCache(settings.ARTIFACT_CACHE_MAX_MB * 1024 * 1024)
+
+
+def cached_artifact(kind, paths, loader, sizeof=estimate_size):
+    return artifact_cache.get(kind, paths, loader, sizeof)
+
+
+def invalidate_artifact(path):
+    artifact_cache.invalidate(path)
+
+
+def artifact_cache_stats():
+    return artifact_cache.info()
@@ -0,0 +1,156 @@
+"""
+Columnar artifacts passed between pipeline stages.
+
+Each stage writes its output tables as Parquet files under media/artifacts/
+(typed columns per SCHEMAS); later stages and the API views read those
+instead of re-parsing Excel. Excel is only an export format: a stage
+registers which artifacts make up a workbook, and the workbook is written
+from them when it is downloaded (or when it is older than its artifacts).
+"""
+import io
+import os
+import json
+import math
+import pandas as pd
+from django.conf import settings
+from .file_utils import atomic_write_bytes, atomic_write_json, file_lock
+from .artifact_cache import invalidate_artifact
+
+# Paths
+ARTIFACTS_DIR = os.path.join(settings.MEDIA_ROOT, "artifacts")
+EXPORTS_DIR = os.path.join(ARTIFACTS_DIR, "exports")
+
+# Declared column types per artifact. Undeclared numeric and boolean columns keep
+# their dtype; undeclared object columns are stored as text.
+SCHEMAS = {
+    "labels/baselined": {"Baselined Transactions": "string"},
+    "labels/matched": {"Transactions": "string", "Transaction_Count": "int64"},
+    "labels/not_matched": {"Transactions": "string", "Transaction_Count": "int64"},
+    "labels/no_transactions": {"Transaction_Count": "int64"},
+    "labels/matched_summary": {"Transactions": "string", "count": "int64"},
+    "labels/not_matched_summary": {"Transactions": "string", "count": "int64"},
+    "comparison/mapped_transactions": {"Transactions": "string"},
+    "comparison/unique": {"Transactions": "string"},
+    "comparison/similar": {"Transactions": "string"},
+    "comparison/differences": {
+        "Transaction_Type": "string", "Test Case 1": "string", "Test Case 2": "string",
+        "Similarity FAISS Distance": "float64", "Similarity Score": "float64",
+    },
+    "comparison/pairs": {
+        "pair_id": "int64", "Transaction_Type": "string", "Test Case 1": "string", "Test Case 2": "string",
+        "Similarity FAISS Distance": "float64", "Similarity Score": "float64", "Reviewer Verdict": "string",
+    },
+    "comparison/field_differences": {"pair_id": "int64", "field": "string", "left": "string", "right": "string"},
+    "comparison/containment": {
+        "Test Case 1": "string", "Test Case 2": "string", "Contained?": "string",
+        "Jaccard Score": "float64", "FAISS Distance": "float64", "Feedback": "string",
+    },
+    "comparison/step_duplicates": {
+        "Test Case 1": "string", "Test Case 2": "string", "Jaccard Score": "float64",
+        "Transactions 1": "string", "Transactions 2": "string", "Feedback": "string",
+    },
+}
+
+
+def _arrow_type(type_name):
+    import pyarrow as pa
+    return {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(), "bool": pa.bool_()}[type_name]
+
+
+def artifact_path(name):
+    return os.path.join(ARTIFACTS_DIR, f"{name}.parquet")
+
+
+def artifact_exists(name):
+    return os.path.exists(artifact_path(name))
+
+
+def _as_text(value):
+    if value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def write_artifact(name, df):
+    """Write `df` as the artifact `name`, casting declared columns to their schema types."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = SCHEMAS.get(name, {})
+    missing = [column for column in schema if column not in df.columns]
+    if missing and len(df):
+        raise ValueError(f"Artifact '{name}' is missing columns: {', '.join(missing)}")
+
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if schema.get(column) == "string" or (column not in schema and values.dtype == object):
+            values = values.map(_as_text).astype(object)
+        columns[str(column)] = values.reset_index(drop=True)
+    for column in missing:
+        columns[column] = pd.Series([], dtype=object)
+    table = pa.Table.from_pandas(pd.DataFrame(columns), preserve_index=False)
+    table = table.cast(pa.schema(
+        [pa.field(f.name, _arrow_type(schema[f.name])) if f.name in schema else f for f in table.schema],
+        metadata=table.schema.metadata,
+    ))
+
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    path = artifact_path(name)
+    atomic_write_bytes(path, buffer.getvalue())
+    invalidate_artifact(path)
+    return path
+
+
+def read_artifact(name, columns=None):
+    """Read an artifact as a DataFrame (text columns come back as object dtype, missing values as None)."""
+    import pyarrow.parquet as pq
+    path = artifact_path(name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Artifact not found: {name}")
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def _export_manifest_path(export_path):
+    return os.path.join(EXPORTS_DIR, os.path.basename(export_path) + ".json")
+
+
+def register_excel_export(export_path, sheets):
+    """
+    Declare the workbook `export_path` as a view over artifacts. `sheets` is a
+    list of {"sheet", "artifact"} dicts with optional "startrow"/"startcol";
+    several artifacts may share a sheet. Any previous workbook is removed so
+    a stale export is never served.
+    """
+    atomic_write_json(_export_manifest_path(export_path), {"path": export_path, "sheets": sheets})
+    if os.path.exists(export_path):
+        os.remove(export_path)
+
+
+def is_excel_export(export_path):
+    return os.path.exists(_export_manifest_path(export_path))
+
+
+def export_excel(export_path):
+    """Write the registered workbook from its artifacts unless an up-to-date copy exists."""
+    manifest_path = _export_manifest_path(export_path)
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        sheets = json.load(f)["sheets"]
+    sources = [manifest_path] + [artifact_path(sheet["artifact"]) for sheet in sheets]
+    newest_source = max(os.path.getmtime(path) for path in sources)
+    if os.path.exists(export_path) and os.path.getmtime(export_path) >= newest_source:
+        return export_path
+
+    with file_lock(export_path + ".lock", timeout=300):
+        if os.path.exists(export_path) and os.path.getmtime(export_path) >= newest_source:
+            return export_path
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            for sheet in sheets:
+                read_artifact(sheet["artifact"]).to_excel(
+                    writer, sheet_name=sheet["sheet"], index=False,
+                    startrow=sheet.get("startrow", 0), startcol=sheet.get("startcol", 0)
+                )
+        atomic_write_bytes(export_path, buffer.getvalue())
+    print(f"✅ Exported {os.path.basename(export_path)} from {len(sheets)} artifacts")
+    return export_path
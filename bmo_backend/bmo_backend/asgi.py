@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bmo_backend.settings')
 
 application = get_asgi_application()
+
+# Optional model warm-up (settings.WARM_UP_RESOURCES), reported by /api/ready/
+from bmo_backend.resources import start_background_warm_up  # noqa: E402
+from bmo_backend.jobs import start_job_workers  # noqa: E402
+
+start_background_warm_up()
+# Resume queued background jobs after a restart
+start_job_workers()
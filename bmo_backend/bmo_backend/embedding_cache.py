@@ -0,0 +1,187 @@
+import os
+import re
+import json
+import atexit
+import hashlib
+import threading
+import numpy as np
+from django.conf import settings
+from .file_utils import atomic_write_json, file_lock
+from .pair_keys import normalize_text
+
+# Model used by pre-processing and comparison (the cache is keyed by it)
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Paths
+EMBEDDING_CACHE_DIR = os.path.join(settings.MEDIA_ROOT, "models", "embedding_cache")
+
+
+def text_hash(text):
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, on-disk embedding cache for one embedding model.
+
+    Vectors live in an append-only float32 matrix (`vectors.f32`) that is read
+    through a memory map; `index.json` maps the text hash to its row. New
+    vectors are kept in memory until `flush()`, which appends them under a
+    file lock so several worker processes can share the same cache.
+    """
+
+    def __init__(self, model_name, cache_dir=EMBEDDING_CACHE_DIR):
+        self.model_name = model_name
+        self.directory = os.path.join(cache_dir, re.sub(r"[^\w.-]+", "_", model_name))
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.index_path = os.path.join(self.directory, "index.json")
+        self.lock_path = os.path.join(self.directory, ".lock")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._rows = {}
+        self._dimension = None
+        self._index_mtime = None
+        self._matrix = None
+        self._pending = {}
+        self._reload()
+
+    def _reload(self):
+        """Pick up rows flushed by other processes since the last read."""
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._index_mtime:
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._rows = data.get("rows", {})
+        self._dimension = data.get("dimension")
+        self._index_mtime = mtime
+        self._matrix = None
+
+    def _vectors(self):
+        if self._matrix is None and self._rows:
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r",
+                shape=(len(self._rows), self._dimension)
+            )
+        return self._matrix
+
+    def _lookup(self, key):
+        if key in self._pending:
+            return self._pending[key]
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        return np.array(self._vectors()[row])
+
+    def embed(self, texts, embed_fn):
+        """
+        Return a float32 matrix with one embedding per text.
+
+        Cached vectors are served from disk; only the misses are passed to
+        `embed_fn` (a callable taking a list of texts and returning a list of
+        vectors), in a single call.
+        """
+        texts = ["" if t is None else str(t) for t in texts]
+        keys = [text_hash(t) for t in texts]
+        with self._lock:
+            self._reload()
+            found = {key: self._lookup(key) for key in set(keys)}
+            missing = {}
+            for key, text in zip(keys, texts):
+                if found[key] is None:
+                    missing.setdefault(key, text)
+                    self.misses += 1
+                else:
+                    self.hits += 1
+
+        if missing:
+            vectors = embed_fn(list(missing.values()))
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    self._pending[key] = vector
+                    found[key] = vector
+
+        if not keys:
+            return np.empty((0, self._dimension or 0), dtype=np.float32)
+        return np.vstack([found[key] for key in keys]).astype(np.float32, copy=False)
+
+    def flush(self):
+        """Append pending vectors to disk and publish them in the index."""
+        with self._lock:
+            if not self._pending:
+                return
+            with file_lock(self.lock_path):
+                self._reload()
+                new_items = [(k, v) for k, v in self._pending.items() if k not in self._rows]
+                if new_items:
+                    if self._dimension is None:
+                        self._dimension = int(new_items[0][1].shape[0])
+                    block = np.vstack([v for _, v in new_items]).astype(np.float32)
+                    if block.shape[1] != self._dimension:
+                        raise ValueError(
+                            f"Embedding dimension {block.shape[1]} does not match cache dimension {self._dimension}."
+                        )
+                    start = len(self._rows)
+                    # Release the memory map before writing to the file
+                    self._matrix = None
+                    mode = "r+b" if os.path.exists(self.vectors_path) else "wb"
+                    with open(self.vectors_path, mode) as f:
+                        # Rows past the index (from an interrupted flush) are overwritten
+                        f.seek(start * self._dimension * 4)
+                        f.write(block.tobytes())
+                        f.truncate()
+                    rows = dict(self._rows)
+                    for offset, (key, _) in enumerate(new_items):
+                        rows[key] = start + offset
+                    atomic_write_json(self.index_path, {
+                        "model": self.model_name,
+                        "dimension": self._dimension,
+                        "rows": rows,
+                    })
+                    self._rows = rows
+                    self._index_mtime = os.stat(self.index_path).st_mtime_ns
+                self._pending.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "cached_vectors": len(self._rows) + len(self._pending),
+            }
+
+
+# One cache per model, shared by every stage in this process
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name=EMBEDDING_MODEL_NAME):
+    with _caches_lock:
+        if model_name not in _caches:
+            _caches[model_name] = EmbeddingCache(model_name)
+        return _caches[model_name]
+
+
+def embedding_cache_stats():
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [cache.stats() for cache in caches]
+
+
+def flush_embedding_caches():
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.flush()
+
+
+atexit.register(flush_embedding_caches)
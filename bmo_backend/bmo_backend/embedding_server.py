@@ -0,0 +1,212 @@
+"""
+Local embedding service shared by all Django workers.
+
+One process loads the embedding model and serves encode requests over a Unix
+socket; concurrent requests from different workers are coalesced into shared
+model batches. Workers use `EmbeddingClient`, a drop-in for the
+`embed_documents`/`embed_query` part of `HuggingFaceEmbeddings`, so they
+never load the model themselves. Enable it by setting BMO_EMBEDDING_SOCKET
+for both the server and the workers, then start the server with:
+
+    python -m bmo_backend.embedding_server --socket /tmp/bmo-embeddings.sock
+
+Unix sockets are POSIX-only; without BMO_EMBEDDING_SOCKET every worker keeps
+loading its own copy of the model.
+"""
+import os
+import json
+import time
+import queue
+import socket
+import struct
+import argparse
+import threading
+import socketserver
+import numpy as np
+
+_HEADER = struct.Struct("!I")
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Embedding server connection closed.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _send_message(sock, header, payload=b""):
+    header = dict(header, payload_bytes=len(payload))
+    encoded = json.dumps(header).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(encoded)) + encoded + payload)
+
+
+def _recv_message(sock):
+    (length,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, length).decode("utf-8"))
+    payload = _recv_exact(sock, header["payload_bytes"]) if header["payload_bytes"] else b""
+    return header, payload
+
+
+class EmbeddingClient:
+    """Talks to the embedding server; exposes the HuggingFaceEmbeddings methods we use."""
+
+    def __init__(self, socket_path, timeout=300.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _request(self, header, payload=b""):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            _send_message(sock, header, payload)
+            response, data = _recv_message(sock)
+        if response.get("error"):
+            raise RuntimeError(f"Embedding server error: {response['error']}")
+        return response, data
+
+    def ping(self):
+        response, _ = self._request({"op": "ping"})
+        return response
+
+    def encode(self, texts):
+        texts = ["" if t is None else str(t) for t in texts]
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        payload = json.dumps(texts).encode("utf-8")
+        response, data = self._request({"op": "encode"}, payload)
+        return np.frombuffer(data, dtype=np.float32).reshape(response["rows"], response["dim"])
+
+    def embed_documents(self, texts):
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
+
+    # LangChain's FAISS store calls the embedding function directly when it is
+    # not an `Embeddings` instance
+    __call__ = embed_query
+
+
+class _Batcher:
+    """Coalesces encode requests from concurrent connections into shared model batches."""
+
+    def __init__(self, model, max_batch_size, max_wait):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.encoded_texts = 0
+        self.model_calls = 0
+        threading.Thread(target=self._run, name="embedding-batcher", daemon=True).start()
+
+    def encode(self, texts):
+        job = {"texts": texts, "done": threading.Event(), "result": None, "error": None}
+        self.requests.put(job)
+        job["done"].wait()
+        if job["error"]:
+            raise RuntimeError(job["error"])
+        return job["result"]
+
+    def _run(self):
+        from .embeddings import embed_in_batches
+        while True:
+            jobs = [self.requests.get()]
+            total = len(jobs[0]["texts"])
+            deadline = time.monotonic() + self.max_wait
+            while total < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                total += len(job["texts"])
+
+            texts = [text for job in jobs for text in job["texts"]]
+            try:
+                vectors = embed_in_batches(texts, self.model.embed_documents, self.max_batch_size)
+                offset = 0
+                for job in jobs:
+                    job["result"] = vectors[offset:offset + len(job["texts"])]
+                    offset += len(job["texts"])
+                self.encoded_texts += len(texts)
+                self.model_calls += 1
+            except Exception as e:
+                for job in jobs:
+                    job["error"] = str(e)
+            for job in jobs:
+                job["done"].set()
+
+
+class _EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        batcher = self.server.batcher
+        while True:
+            try:
+                header, payload = _recv_message(self.request)
+            except ConnectionError:
+                return
+            try:
+                if header.get("op") == "ping":
+                    _send_message(self.request, {
+                        "model": self.server.model_name,
+                        "encoded_texts": batcher.encoded_texts,
+                        "model_calls": batcher.model_calls,
+                    })
+                elif header.get("op") == "encode":
+                    vectors = np.ascontiguousarray(batcher.encode(json.loads(payload.decode("utf-8"))), dtype=np.float32)
+                    _send_message(self.request, {"rows": vectors.shape[0], "dim": vectors.shape[1]}, vectors.tobytes())
+                else:
+                    _send_message(self.request, {"error": f"Unknown op: {header.get('op')}"})
+            except Exception as e:
+                _send_message(self.request, {"error": str(e)})
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, model, model_name, max_batch_size=64, max_wait=0.01):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # stale socket from a previous run
+        super().__init__(socket_path, _EmbeddingRequestHandler)
+        self.model_name = model_name
+        self.batcher = _Batcher(model, max_batch_size, max_wait)
+
+
+def main():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bmo_backend.settings")
+    import django
+    django.setup()
+    from django.conf import settings
+    from .embedding_cache import EMBEDDING_MODEL_NAME
+    from .embeddings import load_local_embedding_model
+
+    parser = argparse.ArgumentParser(description="Serve embeddings to all workers over a Unix socket.")
+    parser.add_argument("--socket", default=settings.EMBEDDING_SERVER_SOCKET)
+    parser.add_argument("--batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0,
+                        help="How long to wait for other requests to join a batch.")
+    args = parser.parse_args()
+    if not args.socket:
+        parser.error("--socket (or BMO_EMBEDDING_SOCKET) is required")
+
+    print(f"🔄 Loading {EMBEDDING_MODEL_NAME}...")
+    model = load_local_embedding_model()
+    server = EmbeddingServer(args.socket, model, EMBEDDING_MODEL_NAME, args.batch_size, args.max_wait_ms / 1000)
+    print(f"✅ Embedding server listening on {args.socket}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import numpy as np
+from django.conf import settings
+from .embedding_cache import EMBEDDING_MODEL_NAME
+from .resources import register_resource, get_resource
+
+
+# Embedding model shared by every stage, built on first use
+def load_local_embedding_model():
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+
+def load_embedding_model():
+    # With a shared embedding server configured, workers only hold a client
+    socket_path = getattr(settings, "EMBEDDING_SERVER_SOCKET", None)
+    if socket_path:
+        from .embedding_server import EmbeddingClient
+        client = EmbeddingClient(socket_path)
+        client.ping()
+        return client
+    return load_local_embedding_model()
+
+register_resource("embedding_model", load_embedding_model)
+
+
+def get_embedding_model():
+    return get_resource("embedding_model")
+
+
+def approximate_token_count(text):
+    """Cheap stand-in for the tokenizer length, good enough to bucket texts by size."""
+    return len(text.split())
+
+
+def embed_in_batches(texts, embed_fn, batch_size=None):
+    """
+    Embed `texts` with `embed_fn` (list of texts -> list of vectors) in batches.
+
+    Identical texts are embedded once, texts are sorted by length so each
+    batch pads to a similar size, and vectors are written back in input
+    order. Returns a float32 matrix with one row per input text.
+    """
+    batch_size = batch_size or getattr(settings, "EMBEDDING_BATCH_SIZE", 64)
+    texts = ["" if t is None else str(t) for t in texts]
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    # Dedupe identical texts, remembering where each one goes back
+    unique_texts = list(dict.fromkeys(texts))
+    position = {text: i for i, text in enumerate(unique_texts)}
+
+    # Length-bucketed order cuts padding inside each batch
+    order = sorted(range(len(unique_texts)), key=lambda i: (approximate_token_count(unique_texts[i]), len(unique_texts[i])))
+
+    unique_vectors = [None] * len(unique_texts)
+    for start in range(0, len(order), batch_size):
+        batch_ids = order[start:start + batch_size]
+        vectors = embed_fn([unique_texts[i] for i in batch_ids])
+        for i, vector in zip(batch_ids, vectors):
+            unique_vectors[i] = vector
+
+    unique_matrix = np.asarray(unique_vectors, dtype=np.float32)
+    return unique_matrix[[position[text] for text in texts]]
@@ -1,12 +1,24 @@
 import os
+import json
+import hashlib
 from django.conf import settings
 import pandas as pd
-import subprocess
+from .pair_keys import normalize_test_case_id, normalize_text
+from .file_utils import atomic_write_json, file_lock
+from .llm_client import LLMError, get_llm_client
+from .feedback_classifier import get_feedback_classifier
 
 #ollama_path = r'C:\Users\yuvaranjani.mani\AppData\Local\Programs\Ollama\ollama.exe'
 
-def classify_feedback_with_ollama(transaction_type, test_case_1, test_case_2, feedback):
-    prompt = f"""
+# Classifications already made, keyed by feedback_key(); re-uploaded workbooks reuse them
+CLASSIFICATION_CACHE_PATH = os.path.join(settings.MEDIA_ROOT, "models", "feedback_classifications.json")
+CLASSIFICATIONS = ["BOOST", "PENALIZE"]
+# Which step classified a row: an earlier LLM answer, the kNN tier, or the LLM
+TIERS = ["cache", "knn", "llm"]
+
+
+def build_feedback_prompt(transaction_type, test_case_1, test_case_2, feedback):
+    return f"""
     You are an AI assistant evaluating user feedback on test case similarity.
     The user has provided feedback for the following test cases:
     - Transaction_type: {transaction_type}
@@ -18,13 +30,89 @@ def classify_feedback_with_ollama(transaction_type, test_case_1, test_case_2, fe
     2. PENALIZE - If the feedback indicates major differences in functionality, steps, or transaction type.
     Respond with ONLY "BOOST" or "PENALIZE" and nothing else.
     """
-    
-    result = subprocess.run(["ollama", "run", "mistral", prompt], capture_output=True, text=True, encoding='utf-8')
-    classification = result.stdout.strip().upper()
-    if classification not in ["BOOST", "PENALIZE"]:
-        classification = "UNKNOWN"
-    
-    return classification    
+
+
+def parse_classification(response):
+    classification = response.strip().upper()
+    return classification if classification in CLASSIFICATIONS else "UNKNOWN"
+
+
+def feedback_key(transaction_type, test_case_1, test_case_2, feedback, model=None):
+    """Hash of (model, transaction, unordered test case pair (899155.0 as 899155), feedback text with whitespace collapsed)."""
+    pair = sorted(normalize_test_case_id(test_case) for test_case in (test_case_1, test_case_2))
+    parts = [model or settings.FEEDBACK_LLM_MODEL, normalize_text(transaction_type), *pair, normalize_text(feedback)]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def load_classification_cache():
+    if not os.path.exists(CLASSIFICATION_CACHE_PATH):
+        return {}
+    with open(CLASSIFICATION_CACHE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_classifications(classifications):
+    """Merge new classifications into the cache file (other workers may have added some)."""
+    if not classifications:
+        return
+    with file_lock(CLASSIFICATION_CACHE_PATH + ".lock"):
+        cache = load_classification_cache()
+        cache.update(classifications)
+        atomic_write_json(CLASSIFICATION_CACHE_PATH, cache)
+
+
+def classify_feedback_rows(rows):
+    """
+    (classification, tier, confidence) for each (transaction_type, test_case_1,
+    test_case_2, feedback) row. Rows the LLM already classified are reused;
+    the kNN tier takes the rows it is confident about, and only the rest go to
+    the LLM, concurrently. Only BOOST / PENALIZE answers from the LLM are
+    cached, so rows that failed or came back unparseable are retried on the
+    next upload.
+    """
+    cache = load_classification_cache()
+    keys = [feedback_key(*row) for row in rows]
+    pending = {}
+    for key, row in zip(keys, rows):
+        if key not in cache:
+            pending.setdefault(key, row)
+
+    classified = {}
+    if pending and settings.FEEDBACK_KNN_THRESHOLD <= 1:
+        try:
+            predictions = get_feedback_classifier().predict([row[3] for row in pending.values()])
+        except Exception as e:
+            print(f"⚠️ kNN feedback classifier unavailable, using the LLM for every row: {e}")
+            predictions = [(None, 0.0)] * len(pending)
+        for key, (label, confidence) in zip(list(pending), predictions):
+            if label is not None and confidence >= settings.FEEDBACK_KNN_THRESHOLD:
+                classified[key] = (label, "knn", confidence)
+                del pending[key]
+    print(f"Feedback classification: {len(rows)} rows, {len(set(keys)) - len(pending) - len(classified)} cached, "
+          f"{len(classified)} by kNN, {len(pending)} sent to the LLM")
+
+    responses = get_llm_client().generate_many([build_feedback_prompt(*row) for row in pending.values()])
+    new_entries = {}
+    for key, response in zip(pending, responses):
+        if isinstance(response, LLMError):
+            print(f"⚠️ {response}")
+            classified[key] = ("UNKNOWN", "llm", None)
+            continue
+        classified[key] = (parse_classification(response), "llm", None)
+        if classified[key][0] != "UNKNOWN":
+            new_entries[key] = classified[key][0]
+    save_classifications(new_entries)
+    return [(cache[key], "cache", None) if key in cache else classified[key] for key in keys]
+
+
+def feedback_tier_stats(feedback_results):
+    """Fraction of rows classified by each tier."""
+    total = len(feedback_results)
+    return {
+        tier: round(sum(result["Tier"] == tier for result in feedback_results) / total, 4) if total else 0.0
+        for tier in TIERS
+    }
+
 
 def feedback(file_path):
     file_path = os.path.basename(file_path)
@@ -34,24 +122,25 @@ def feedback(file_path):
     feedback_present = feedback_df[feedback_df['Feedback'].notna()]
     feedback_dict = feedback_present.to_dict(orient='records')
     print("feedback_dict", feedback_dict)
-    
+
+    rows = [
+        (feedback.get('Transaction_Type'), feedback.get('Test Case 1'), feedback.get('Test Case 2'), feedback.get('Feedback'))
+        for feedback in feedback_dict
+    ]
+    classifications = classify_feedback_rows(rows)
+
     feedback_results = []
-    for feedback in feedback_dict:
-        filtered_feedback = {key: feedback[key] for key in ['Transaction_Type', 'Test Case 1', 'Test Case 2', 'Feedback'] if key in feedback}
-        classification = classify_feedback_with_ollama(
-            filtered_feedback.get('Transaction_Type'),
-            filtered_feedback.get('Test Case 1'),
-            filtered_feedback.get('Test Case 2'),
-            filtered_feedback.get('Feedback')
-        )
+    for (transaction_type, test_case_1, test_case_2, feedback_text), (classification, tier, confidence) in zip(rows, classifications):
         feedback_json = {
-            "Transaction_Type": filtered_feedback.get('Transaction_Type'),
-            "Test_Case_1": filtered_feedback.get('Test Case 1'),
-            "Test_Case_2": filtered_feedback.get('Test Case 2'),
-            "Feedback": filtered_feedback.get('Feedback'),
-            "Classification": classification
+            "Transaction_Type": transaction_type,
+            "Test_Case_1": test_case_1,
+            "Test_Case_2": test_case_2,
+            "Feedback": feedback_text,
+            "Classification": classification,
+            "Tier": tier,
+            "Confidence": confidence
         }
         print("feedback form backend:", feedback_json)
         feedback_results.append(feedback_json)
-    
+
     return feedback_results
@@ -0,0 +1,96 @@
+"""
+First-tier feedback classifier: kNN over MiniLM embeddings of labelled feedback.
+
+Most feedback strings are near-duplicates of ones already classified, so
+rows are first matched against the feedback log SaveFeedback appends to
+(feedback_log.py), using each pair's current verdict. Each distinct feedback
+text keeps its BOOST / PENALIZE vote counts. A row's k nearest texts (cosine
+similarity, at least FEEDBACK_KNN_MIN_SIMILARITY) vote with weight
+similarity x votes, and
+
+    confidence = (winning weight / total weight) x best similarity
+
+so only a close match with a consistent history scores high. Rows below
+FEEDBACK_KNN_THRESHOLD go to the LLM.
+"""
+import threading
+import numpy as np
+from django.conf import settings
+from .feedback_log import feedback_log_version, load_labelled_feedback
+from .embedding_cache import get_embedding_cache
+from .pair_keys import normalize_text
+from .embeddings import embed_in_batches, get_embedding_model
+
+LABELS = ["BOOST", "PENALIZE"]
+
+
+def embed_feedback_texts(texts):
+    """MiniLM embeddings through the shared embedding cache."""
+    return get_embedding_cache().embed(
+        texts, lambda misses: embed_in_batches(misses, get_embedding_model().embed_documents)
+    )
+
+
+def _unit_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class FeedbackKNNClassifier:
+    def __init__(self, records, embed_fn=embed_feedback_texts, k=None, min_similarity=None):
+        self.embed_fn = embed_fn
+        self.k = k or settings.FEEDBACK_KNN_K
+        self.min_similarity = settings.FEEDBACK_KNN_MIN_SIMILARITY if min_similarity is None else min_similarity
+        votes = {}
+        for record in records:
+            label = str(record.get("Classification") or "").upper()
+            text = normalize_text(record.get("Feedback"))
+            if label in LABELS and text:
+                votes.setdefault(text, np.zeros(len(LABELS), dtype=np.float32))[LABELS.index(label)] += 1
+        self.texts = list(votes)
+        self.votes = np.array([votes[text] for text in self.texts], dtype=np.float32).reshape(-1, len(LABELS))
+        self.vectors = _unit_rows(embed_fn(self.texts)) if self.texts else None
+
+    def __len__(self):
+        return len(self.texts)
+
+    def predict(self, texts):
+        """(label, confidence) per text; label is None when no history text is similar enough."""
+        if not texts:
+            return []
+        if not self.texts:
+            return [(None, 0.0)] * len(texts)
+        texts = [normalize_text(text) for text in texts]
+        distinct = list(dict.fromkeys(texts))
+        similarities = _unit_rows(self.embed_fn(distinct)) @ self.vectors.T
+        k = min(self.k, len(self.texts))
+        neighbours = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+
+        predictions = {}
+        for row, text in enumerate(distinct):
+            sims = similarities[row, neighbours[row]]
+            keep = sims >= self.min_similarity
+            if not keep.any():
+                predictions[text] = (None, 0.0)
+                continue
+            weights = (sims[keep, None] * self.votes[neighbours[row][keep]]).sum(axis=0)
+            best = int(np.argmax(weights))
+            confidence = float(weights[best] / weights.sum() * min(sims[keep].max(), 1.0))
+            predictions[text] = (LABELS[best], round(confidence, 4))
+        return [predictions[text] for text in texts]
+
+
+_classifier = None  # (feedback log version, classifier)
+_classifier_lock = threading.Lock()
+
+
+def get_feedback_classifier():
+    """Classifier over the feedback log, rebuilt when feedback was appended since."""
+    global _classifier
+    version = feedback_log_version()
+    with _classifier_lock:
+        if _classifier is None or _classifier[0] != version:
+            records, version = load_labelled_feedback()
+            _classifier = (version, FeedbackKNNClassifier(records))
+        return _classifier[1]
@@ -0,0 +1,151 @@
+"""
+Append-only log of reviewer feedback on test case pairs, in the project's
+SQLite database (table `bmo_feedback_log`).
+
+SaveFeedback appends the rows that changed instead of rewriting
+updated_feedback.json. Rows are indexed by the normalized (transaction, test
+case pair); the current verdict of a pair is its latest row, if that is
+BOOST or PENALIZE (a later UNKNOWN re-opens the pair). compare_test_cases
+loads all current verdicts once per run and looks pairs up in a dict.
+"""
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+from django.conf import settings
+from .pair_keys import normalize_text, pair_key
+
+VERDICTS = ("BOOST", "PENALIZE")
+# Saved before the log existed; imported into an empty log once
+LEGACY_FEEDBACK_PATH = os.path.join(settings.MEDIA_ROOT, "feedback_files", "updated_feedback.json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bmo_feedback_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    transaction_key TEXT NOT NULL,
+    test_case_1 TEXT NOT NULL,
+    test_case_2 TEXT NOT NULL,
+    transaction_type TEXT,
+    feedback TEXT,
+    classification TEXT NOT NULL,
+    source TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bmo_feedback_log_pair ON bmo_feedback_log (transaction_key, test_case_1, test_case_2, id);
+"""
+
+
+def _connect():
+    connection = sqlite3.connect(str(settings.DATABASES["default"]["NAME"]), timeout=30)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+_schema_ready = False
+
+
+@contextmanager
+def _db():
+    """One short transaction on a fresh connection (committed on success, always closed)."""
+    global _schema_ready
+    connection = _connect()
+    try:
+        if not _schema_ready:
+            connection.executescript(_SCHEMA)
+            _import_legacy_feedback(connection)
+            _schema_ready = True
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def _rows_to_append(connection, records, source):
+    latest = {}
+    rows = []
+    now = time.time()
+    for record in records:
+        classification = str(record.get("Classification") or "").upper()
+        key = pair_key(record.get("Transaction_Type"), record.get("Test_Case_1"), record.get("Test_Case_2"))
+        feedback = normalize_text(record.get("Feedback"))
+        if key not in latest:
+            row = connection.execute(
+                "SELECT feedback, classification FROM bmo_feedback_log "
+                "WHERE transaction_key = ? AND test_case_1 = ? AND test_case_2 = ? ORDER BY id DESC LIMIT 1",
+                key
+            ).fetchone()
+            latest[key] = (row["feedback"], row["classification"]) if row else None
+        # Re-saving an unchanged row does not add another entry
+        if latest[key] == (feedback, classification):
+            continue
+        latest[key] = (feedback, classification)
+        rows.append((*key, normalize_text(record.get("Transaction_Type")), feedback, classification, source, now))
+    return rows
+
+
+def _insert(connection, rows):
+    connection.executemany(
+        "INSERT INTO bmo_feedback_log (transaction_key, test_case_1, test_case_2, transaction_type, feedback, "
+        "classification, source, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+
+
+def _import_legacy_feedback(connection):
+    if not os.path.exists(LEGACY_FEEDBACK_PATH):
+        return
+    with open(LEGACY_FEEDBACK_PATH, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    with connection:
+        # Take the write lock first so two processes cannot both import into the empty log
+        connection.execute("BEGIN IMMEDIATE")
+        if connection.execute("SELECT 1 FROM bmo_feedback_log LIMIT 1").fetchone():
+            return
+        rows = _rows_to_append(connection, records, os.path.basename(LEGACY_FEEDBACK_PATH))
+        _insert(connection, rows)
+    print(f"✅ Imported {len(rows)} feedback rows from {os.path.basename(LEGACY_FEEDBACK_PATH)}")
+
+
+def append_feedback(records, source=None):
+    """
+    Append feedback records (Transaction_Type, Test_Case_1, Test_Case_2,
+    Feedback, Classification) whose feedback or classification differs from
+    the pair's latest entry. Returns the number of rows appended.
+    """
+    with _db() as connection:
+        rows = _rows_to_append(connection, records, source)
+        _insert(connection, rows)
+    return len(rows)
+
+
+def load_pair_verdicts():
+    """pair_key -> latest BOOST / PENALIZE classification of that pair."""
+    with _db() as connection:
+        rows = connection.execute(
+            "SELECT transaction_key, test_case_1, test_case_2, classification FROM bmo_feedback_log "
+            "WHERE id IN (SELECT MAX(id) FROM bmo_feedback_log GROUP BY transaction_key, test_case_1, test_case_2)"
+        ).fetchall()
+    return {
+        (row["transaction_key"], row["test_case_1"], row["test_case_2"]): row["classification"]
+        for row in rows if row["classification"] in VERDICTS
+    }
+
+
+def load_labelled_feedback():
+    """(feedback text, classification) of each pair's latest BOOST / PENALIZE entry, and the log version."""
+    with _db() as connection:
+        version = connection.execute("SELECT COALESCE(MAX(id), 0) FROM bmo_feedback_log").fetchone()[0]
+        rows = connection.execute(
+            "SELECT feedback, classification FROM bmo_feedback_log "
+            "WHERE id IN (SELECT MAX(id) FROM bmo_feedback_log GROUP BY transaction_key, test_case_1, test_case_2)"
+        ).fetchall()
+    records = [{"Feedback": row["feedback"], "Classification": row["classification"]}
+               for row in rows if row["classification"] in VERDICTS]
+    return records, version
+
+
+def feedback_log_version():
+    """Id of the newest entry; changes whenever feedback is appended."""
+    with _db() as connection:
+        return connection.execute("SELECT COALESCE(MAX(id), 0) FROM bmo_feedback_log").fetchone()[0]
@@ -0,0 +1,56 @@
+import os
+import json
+import time
+import tempfile
+from contextlib import contextmanager
+
+
+def atomic_write_bytes(path, data):
+    """Write bytes to path via a temp file + rename so readers never see a partial file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_json(path, payload):
+    atomic_write_bytes(path, json.dumps(payload).encode("utf-8"))
+
+
+@contextmanager
+def file_lock(lock_path, timeout=30.0, poll_interval=0.05):
+    """Cross-process lock based on exclusive creation of a lock file.
+
+    Works on both Windows and POSIX. A lock older than `timeout` seconds is
+    treated as stale (left behind by a crashed process) and broken.
+    """
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > timeout:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(poll_interval)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        try:
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,230 @@
+"""
+Per-transaction-group comparison, serially or across a process pool.
+
+compare_group() pairs each test case with its nearest neighbours in the
+group and diffs their metadata column by column. Its output is columnar: a
+pairs table and a long-format table of differing fields (pair, field,
+left, right); wide_differences() turns the two into the Differences sheet
+layout. It takes everything it needs as arguments (index parameters come
+in `options`, so ann_index never falls back to the Django settings; pair
+keys come from pair_keys, which has no settings; no embedding model), so
+it runs unchanged in worker processes.
+
+compare_groups() fans groups out to COMPARE_WORKERS processes: the
+embedding matrix (one row per test case) is copied once into shared memory
+and each worker gathers its group's rows from there, groups are submitted
+largest first so a big group does not start last, and results are
+returned in group order, so the output matches a serial run.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from .ann_index import build_index
+from .pair_keys import pair_key
+
+# EXCLUDE_FIELDS: keys to skip during metadata comparison
+EXCLUDE_FIELDS = [
+    "Subject", "test_case_id", "Test Name", "Pre-Condition", "Description",
+    "No of Steps", "Designer", "Type", "Major Functional Area", "Business Unit",
+    "test_steps", "Remaining", "Transactions", "Transaction_Count", "Condition", "Processed_Steps"
+]
+
+PAIR_COLUMNS = ["Transaction_Type", "Test Case 1", "Test Case 2", "Similarity FAISS Distance", "Similarity Score", "Reviewer Verdict"]
+DIFFERENCE_COLUMNS = ["pair", "field", "left", "right"]
+
+
+def metadata_fields(test_cases_df):
+    """Compared columns as text arrays (str() of each value, so NaN is "nan"), in column order."""
+    return {
+        str(column): test_cases_df[column].astype(str).to_numpy(dtype=object)
+        for column in test_cases_df.columns if column not in EXCLUDE_FIELDS
+    }
+
+
+def candidate_pairs(test_case_ids, distances, neighbours):
+    """
+    (left, right, distance) of the kNN pairs, in search order, without
+    self-matches, empty ANN slots (-1) or a pair already seen the other way
+    round (pairs are the same when their test case IDs are).
+    """
+    count, k = neighbours.shape
+    left = np.repeat(np.arange(count), k)
+    right = neighbours.ravel().astype(np.intp)
+    distances = distances.ravel()
+    keep = (right >= 0) & (right != left)
+    left, right, distances = left[keep], right[keep], distances[keep]
+    codes = pd.factorize(pd.Series(test_case_ids, dtype=object))[0].astype(np.int64)
+    low, high = np.minimum(codes[left], codes[right]), np.maximum(codes[left], codes[right])
+    _, first = np.unique(low * count + high, return_index=True)
+    first.sort()
+    return left[first], right[first], distances[first]
+
+
+def field_differences(fields, left, right):
+    """Long-format differences (pair, field, left, right), ordered by pair and then column."""
+    pairs, names, left_values, right_values, ranks = [], [], [], [], []
+    for rank, (name, values) in enumerate(fields.items()):
+        lefts, rights = values[left], values[right]
+        differ = np.flatnonzero(lefts != rights)
+        pairs.append(differ)
+        names.append(np.full(len(differ), name, dtype=object))
+        left_values.append(lefts[differ])
+        right_values.append(rights[differ])
+        ranks.append(np.full(len(differ), rank))
+    if not pairs:
+        return {column: [] for column in DIFFERENCE_COLUMNS}
+    pairs, ranks = np.concatenate(pairs), np.concatenate(ranks)
+    order = np.lexsort((ranks, pairs))
+    return {
+        "pair": pairs[order].tolist(),
+        "field": np.concatenate(names)[order].tolist(),
+        "left": np.concatenate(left_values)[order].tolist(),
+        "right": np.concatenate(right_values)[order].tolist(),
+    }
+
+
+def compare_group(transaction, test_case_ids, fields, embeddings, verdicts, options, backend=None):
+    """
+    Pairs and field differences of one transaction group (columns as lists,
+    pair numbers local to the group), and the number of pairs skipped /
+    boosted by reviewer verdicts (`verdicts`: pair_key -> BOOST / PENALIZE).
+    `fields`: metadata_fields() rows of the group. `options`: neighbours,
+    boost_score and index (build_index keyword arguments); `backend` is the
+    group's resolved index backend.
+    """
+    counts = {"skipped": 0, "boosted": 0}
+    pairs = {column: [] for column in PAIR_COLUMNS}
+    differences = {column: [] for column in DIFFERENCE_COLUMNS}
+    if len(test_case_ids) <= 1:
+        return pairs, differences, counts
+    if embeddings.ndim != 2:
+        raise ValueError("Embeddings must be a 2D array.")
+    # Build a local FAISS index for this transaction group (flat, or HNSW/IVF for large groups)
+    index_local = build_index(embeddings, backend=backend, **options["index"])
+    # Search local index for each test case (k nearest neighbors)
+    k = min(options["neighbours"], len(test_case_ids))
+    D, I = index_local.search(embeddings, k)
+    left, right, distances = candidate_pairs(test_case_ids, D, I)
+
+    ids = np.asarray(test_case_ids, dtype=object)
+    pair_verdicts = np.array([verdicts.get(pair_key(transaction, ids[i], ids[j])) for i, j in zip(left, right)]
+                             if verdicts else [None] * len(left), dtype=object)
+    # Reviewers already marked PENALIZE pairs as not similar
+    keep = pair_verdicts != "PENALIZE"
+    counts["skipped"] = int((~keep).sum())
+    left, right, distances, pair_verdicts = left[keep], right[keep], distances[keep], pair_verdicts[keep]
+
+    similarity = 1 / (1 + distances.astype(np.float64))
+    scores = np.round(similarity, 4)
+    boosted = pair_verdicts == "BOOST"
+    scores[boosted] = np.round(np.minimum(1.0, similarity[boosted] + options["boost_score"]), 4)
+    counts["boosted"] = int(boosted.sum())
+    pairs = {
+        "Transaction_Type": [transaction] * len(left),
+        "Test Case 1": ids[left].tolist(),
+        "Test Case 2": ids[right].tolist(),
+        # Rounded in float64: float32 rounding leaves noise (0.0092 -> 0.009200000204145908)
+        "Similarity FAISS Distance": np.round(distances.astype(np.float64), 4).tolist(),
+        "Similarity Score": scores.tolist(),
+        "Reviewer Verdict": pair_verdicts.tolist(),
+    }
+    differences = field_differences(fields, left, right)
+    print(f"Transaction {transaction}: {len(test_case_ids)} test cases, {len(left)} pairs, "
+          f"{len(differences['pair'])} differing fields")
+    return pairs, differences, counts
+
+
+def wide_differences(pairs, differences):
+    """
+    The Differences sheet layout: one row per pair with a "left:right" column
+    per field that differs somewhere, and Reviewer Verdict if any pair has
+    one. Columns come in the order they first occur going down the pairs.
+    `differences` refers to pairs by pair_id, their row number in `pairs`.
+    """
+    wide = pairs[PAIR_COLUMNS[:-1]].copy()
+    if wide.empty:
+        return wide
+    first_seen = differences.groupby("field", sort=False)["pair_id"].min()
+    extra = first_seen.index.tolist()
+    verdict_pairs = np.flatnonzero(pairs["Reviewer Verdict"].notna().to_numpy())
+    if len(verdict_pairs):
+        # A pair's verdict comes before its field columns
+        extra.insert(int((first_seen.to_numpy() < verdict_pairs[0]).sum()), "Reviewer Verdict")
+    values = (differences["left"] + ":" + differences["right"]).to_numpy()
+    table = pd.DataFrame(index=pd.RangeIndex(len(wide)))
+    for column in extra:
+        if column == "Reviewer Verdict":
+            table[column] = pairs["Reviewer Verdict"].to_numpy()
+            continue
+        rows = differences["field"].to_numpy() == column
+        series = pd.Series(np.nan, index=table.index, dtype=object)
+        series.iloc[differences["pair_id"].to_numpy()[rows]] = values[rows]
+        table[column] = series
+    return pd.concat([wide, table], axis=1)
+
+
+def _run_task(task, embeddings, options):
+    return compare_group(task["transaction"], task["test_case_ids"], task["fields"],
+                         embeddings[task["rows"]], task["verdicts"], options, task["backend"])
+
+
+def _init_worker():
+    # One FAISS thread per worker; the pool provides the parallelism
+    import faiss
+    faiss.omp_set_num_threads(1)
+
+
+def _compare_shared_group(shm_name, shape, task, options):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    matrix = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    try:
+        return _run_task(task, matrix, options)
+    finally:
+        del matrix  # the buffer cannot be closed while a view of it exists
+        shm.close()
+
+
+def compare_groups(tasks, embeddings, options, workers=1, on_done=None):
+    """
+    (pairs, differences, counts) per task, in task order. Each task is a dict
+    with transaction, test_case_ids, fields, verdicts, backend and the
+    rows of its test cases in `embeddings` (a test case in several groups
+    has one row). `on_done(task)` is called in the calling thread as each
+    group finishes.
+    """
+    outputs = [None] * len(tasks)
+    if workers <= 1 or len(tasks) < 2:
+        for position, task in enumerate(tasks):
+            outputs[position] = _run_task(task, embeddings, options)
+            if on_done:
+                on_done(task)
+        return outputs
+
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    shm = shared_memory.SharedMemory(create=True, size=max(embeddings.nbytes, 1))
+    try:
+        np.ndarray(embeddings.shape, dtype=np.float32, buffer=shm.buf)[:] = embeddings
+        largest_first = sorted(range(len(tasks)), key=lambda position: -len(tasks[position]["test_case_ids"]))
+        # spawn, not fork: the server process has threads (jobs, FAISS/OpenMP) that fork would copy mid-state
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker) as executor:
+            futures = {
+                executor.submit(_compare_shared_group, shm.name, embeddings.shape, tasks[position], options): position
+                for position in largest_first
+            }
+            try:
+                for future in as_completed(futures):
+                    position = futures[future]
+                    outputs[position] = future.result()
+                    if on_done:
+                        on_done(tasks[position])
+            except BaseException:
+                # Failed or cancelled: drop the groups not started yet
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+    finally:
+        shm.close()
+        shm.unlink()
+    return outputs
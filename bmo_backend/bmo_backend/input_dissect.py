@@ -1,16 +1,175 @@
 import os
 import re
-import difflib
+import io
+import json
+import shutil
+import hashlib
 import pandas as pd
-import spacy
 import numpy as np
 from django.conf import settings
 from django.shortcuts import render
 from django.core.paginator import Paginator
 from django.http import Http404, HttpResponse, FileResponse
+from .resources import register_resource, get_resource
+from .file_utils import atomic_write_bytes, atomic_write_json, file_lock
+from .label_matcher import get_label_matcher
+from .artifacts import is_excel_export, export_excel
+from .artifact_cache import cached_artifact, invalidate_artifact
 
-# Load spaCy model once (at module level)
-nlp = spacy.load("en_core_web_sm")
+# Bump whenever the extraction logic below changes, so cached dissect results are recomputed
+DISSECT_CODE_VERSION = "2"
+DISSECT_CACHE_DIR = os.path.join(settings.MEDIA_ROOT, "models", "dissect_cache")
+DISSECT_OUTPUT_NAME = 'Admin_with_gwt_conditions.csv'
+
+# Load spaCy model once, on first use
+def load_spacy_model():
+    import spacy
+    return spacy.load("en_core_web_sm")
+
+register_resource("spacy_nlp", load_spacy_model)
+
+def clean_description(description):
+    return re.sub(r'\n\s*\n', '\n', description)
+
+def split_gwt(doc, description):
+    """
+    Split one tokenized description into (GIVEN, WHEN, THEN, Condition, Remaining).
+
+    Only token.text, token.i and token.idx are used, so the doc only needs
+    the tokenizer.
+    """
+    given_text, when_text, then_text, condition_text, remaining_text = "", "", "", "", ""
+    start_index = None
+    for token in doc:
+        if "design" in token.text.lower():
+            remaining_text = doc[:token.i].text
+            start_index = None
+        elif "given" in token.text.lower():
+            start_index = token.i
+        elif "when" in token.text.lower() and start_index is not None:
+            given_text = doc[start_index:token.i].text
+            start_index = token.i
+        elif "then" in token.text.lower() and start_index is not None:
+            when_text = doc[start_index:token.i].text
+            start_index = token.i
+        elif "condition" in token.text.lower() and start_index is not None:
+            then_text = doc[start_index:token.i].text
+            condition_text = description[token.idx:]
+            start_index = None
+    return given_text, when_text, then_text, condition_text, remaining_text
+
+def extract_gwt(descriptions, nlp=None, batch_size=None, n_process=None):
+    """
+    split_gwt over cleaned descriptions, tokenized in batches with nlp.pipe and
+    every pipeline component disabled. Returns one tuple per description.
+    """
+    nlp = nlp or get_resource("spacy_nlp")
+    batch_size = batch_size or getattr(settings, "GWT_BATCH_SIZE", 256)
+    n_process = n_process or getattr(settings, "GWT_N_PROCESS", 1)
+    docs = nlp.pipe(descriptions, batch_size=batch_size, n_process=n_process, disable=nlp.pipe_names)
+    return [split_gwt(doc, description) for doc, description in zip(docs, descriptions)]
+
+# Precompiled extraction patterns
+TRANSACTION_PATTERN = re.compile(r"Transaction\s*[:=]\s*([\s\S]+?)(?=\s*(?:\n|[|~]|$))", re.IGNORECASE)
+TRANSACTION_FALLBACK_PATTERN = re.compile(r"(\S+)\s+transaction", re.IGNORECASE | re.DOTALL)
+EXAMPLE_PATTERN = re.compile(r'\b(?:e\.?g\.?|ex|example)\b', re.IGNORECASE)
+GATEWAY_PATTERN = re.compile(r'\bgateway\s*[:\-]\s*(\S+)', re.IGNORECASE)
+GWT_COLUMNS = ['GIVEN', 'WHEN', 'THEN', 'Condition', 'Remaining']
+
+def extract_labels(text, label_matcher):
+    labels = {}
+    lines = text.split("\n")
+    def add_label(label, value):
+        if label and value:
+            canonical = label_matcher.canonical(label)
+            if canonical in labels:
+                if not isinstance(labels[canonical], list):
+                    labels[canonical] = [labels[canonical]]
+                labels[canonical].append(value)
+            else:
+                labels[canonical] = value
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if ":" in line:
+            key, value = map(str.strip, line.split(":", 1))
+            add_label(key, value)
+    return labels
+
+def _join_matches(matches):
+    """' | '-join the non-empty regex matches of each row (extractall output)."""
+    grouped = {}
+    for row, value in zip(matches.index.get_level_values(0), matches):
+        if value:
+            grouped.setdefault(row, []).append(value)
+    return pd.Series({row: " | ".join(values) for row, values in grouped.items()}, dtype=object)
+
+def extract_transactions(test_steps):
+    """
+    Transaction types mentioned in each test_steps text: the "Transaction: X"
+    values, or else the words before "transaction". Empty when the text does
+    not mention a transaction.
+    """
+    steps = test_steps.fillna("").astype(str)
+    transactions = pd.Series("", index=steps.index, dtype=object)
+    mentions = steps[steps.str.contains('transaction', case=False, regex=False)]
+    if mentions.empty:
+        return transactions
+
+    explicit = mentions.str.extractall(TRANSACTION_PATTERN)
+    explicit_rows = explicit.index.get_level_values(0).unique()
+    if len(explicit):
+        cleaned = explicit[0].str.replace(r"\s+", " ", regex=True).str.strip()
+        joined = _join_matches(cleaned)
+        transactions.loc[joined.index] = joined
+
+    # Rows without any "Transaction:" value fall back to "<word> transaction"
+    fallback = mentions[~mentions.index.isin(explicit_rows)].str.extractall(TRANSACTION_FALLBACK_PATTERN)
+    if len(fallback):
+        joined = _join_matches(fallback[0].str.strip())
+        transactions.loc[joined.index] = joined
+    return transactions
+
+def assemble_dissect_frame(df, gwt, label_matcher):
+    """
+    Fill the GWT, label, Transactions and Gateway columns of `df` from the
+    per-row GWT parts (`gwt`, indexed by the rows that have a description).
+    """
+    if gwt.empty:
+        return df
+    processed = list(gwt.index)
+    conditions = gwt['Condition']
+    transactions = extract_transactions(df.loc[processed, 'test_steps'])
+    gateways = conditions.str.extract(GATEWAY_PATTERN, expand=False).str.strip().fillna('No')
+    # Condition labels are skipped when the condition only gives examples
+    use_condition_labels = ~conditions.str.contains(EXAMPLE_PATTERN)
+
+    # Labels are resolved row by row (remaining text, then condition) so the
+    # canonical spellings match the order the matcher sees them in. Later
+    # keys override earlier ones, as the cell writes used to.
+    records = []
+    for remaining_text, condition_text, with_condition, transaction, gateway in zip(
+            gwt['Remaining'], conditions, use_condition_labels, transactions, gateways):
+        record = extract_labels(remaining_text, label_matcher)
+        record['Transactions'] = transaction
+        if with_condition:
+            record.update(extract_labels(condition_text, label_matcher))
+        record['Gateway'] = gateway
+        records.append(record)
+    extracted = pd.DataFrame(records, index=processed)
+
+    # Assemble the output frame once: GWT text, then labels over existing
+    # columns (only where the row had the label), then new label columns
+    # in order of first appearance
+    for column in GWT_COLUMNS:
+        df[column] = gwt[column].str.strip().reindex(df.index).fillna("")
+    new_columns = [column for column in extracted.columns if column not in df.columns]
+    for column in extracted.columns.difference(new_columns, sort=False):
+        values = extracted[column].reindex(df.index)
+        df[column] = values.where(values.notna(), df[column])
+    df = pd.concat([df, extracted[new_columns].reindex(df.index)], axis=1)
+    return df
 
 def process_test_cases(file_path):
     if not os.path.exists(file_path):
@@ -29,125 +188,25 @@ def process_test_cases(file_path):
             return {'error': f"Missing necessary column: {column}"}
 
     # Initialize new columns
-    df[['GIVEN', 'WHEN', 'THEN', 'Condition', 'Remaining']] = ""
-
-    # Define helper functions (normalize_label, get_canonical_label, etc.)
-    def normalize_label(label):
-        label = label.lower().strip()
-        label = re.sub(r"[-]", " ", label)
-        label = re.sub(r"[^\w\s]", "", label)
-        if label.endswith("s"):
-            label = label[:-1]
-        return label
-
-    def get_canonical_label(label, canonical_dict, cutoff=0.8):
-        normalized = normalize_label(label)
-        if not canonical_dict:
-            canonical_dict[normalized] = label
-            return label
-        matches = difflib.get_close_matches(normalized, canonical_dict.keys(), n=1, cutoff=cutoff)
-        if matches:
-            return canonical_dict[matches[0]]
-        else:
-            canonical_dict[normalized] = label
-            return label
-
-    def extract_labels(text, canonical_dict):
-        labels = {}
-        lines = text.split("\n")
-        def add_label(label, value):
-            if label and value:
-                canonical = get_canonical_label(label, canonical_dict)
-                if canonical in labels:
-                    if not isinstance(labels[canonical], list):
-                        labels[canonical] = [labels[canonical]]
-                    labels[canonical].append(value)
-                else:
-                    labels[canonical] = value
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            if ":" in line:
-                key, value = map(str.strip, line.split(":", 1))
-                add_label(key, value)
-        return labels
-
-    def extract_all_transactions(text):
-        sentences = text.split('|')
-        transaction_types = []
-        for sentence in sentences:
-            if 'transaction' in sentence.lower():
-                pattern = re.compile(r"Transaction\s*[:=]\s*([\s\S]+?)(?=\s*(?:\n|[|~]|$))", re.IGNORECASE)
-                matches = pattern.findall(text)
-                if matches:
-                    transaction_types = [re.sub(r"\s+", " ", m).strip() for m in matches if m.strip()]
-                    return " | ".join(transaction_types)
-                fallback_pattern = re.compile(r"(\S+)\s+transaction", re.IGNORECASE | re.DOTALL)
-                fallback_matches = fallback_pattern.findall(text)
-                if fallback_matches:
-                    fallback_matches = [m.strip() for m in fallback_matches if m.strip()]
-                    return " | ".join(fallback_matches)
-                return ""
-        return ""
-
-    # Process each row in the DataFrame
-    canonical_dict = {}
-    for i, row in df.iterrows():
-        description = row['Description']
-        if pd.isna(description) or not isinstance(description, str):
-            continue
-        description = re.sub(r'\n\s*\n', '\n', description)
-        doc = nlp(description)
-        given_text, when_text, then_text, condition_text, remaining_text = "", "", "", "", ""
-        start_index = None
-        for token in doc:
-            if "design" in token.text.lower():
-                remaining_text = doc[:token.i].text
-                start_index = None
-            elif "given" in token.text.lower():
-                start_index = token.i
-            elif "when" in token.text.lower() and start_index is not None:
-                given_text = doc[start_index:token.i].text
-                start_index = token.i
-            elif "then" in token.text.lower() and start_index is not None:
-                when_text = doc[start_index:token.i].text
-                start_index = token.i
-            elif "condition" in token.text.lower() and start_index is not None:
-                then_text = doc[start_index:token.i].text
-                condition_text = description[token.idx:]
-                start_index = None
-
-        df.at[i, 'GIVEN'] = given_text.strip()
-        df.at[i, 'WHEN'] = when_text.strip()
-        df.at[i, 'THEN'] = then_text.strip()
-        df.at[i, 'Condition'] = condition_text.strip()
-        df.at[i, 'Remaining'] = remaining_text.strip()
-
-        # Extract labels from remaining text
-        extracted_labels = extract_labels(remaining_text, canonical_dict)
-        for label, value in extracted_labels.items():
-            df.at[i, label] = value
-
-        # Extract transaction types from test_steps
-        transactions = extract_all_transactions(row['test_steps'])
-        df.at[i, 'Transactions'] = transactions
-
-        # Extract additional labels from condition text if necessary
-        example_pattern = re.compile(r'\b(e\.?g\.?|ex|example)\b', re.IGNORECASE)
-        if not example_pattern.search(condition_text):
-            extract_from_condition = extract_labels(condition_text, canonical_dict)
-            for label, value in extract_from_condition.items():
-                df.at[i, label] = value
-
-        # Extract gateway type from condition text
-        gateway_pattern = re.compile(r'\bgateway\s*[:\-]\s*(\S+)', re.IGNORECASE)
-        gateway_match = gateway_pattern.search(condition_text)
-        df.at[i, 'Gateway'] = gateway_match.group(1).strip() if gateway_match else 'No'
+    df[GWT_COLUMNS] = ""
+
+    # Tokenize all descriptions up front in batches
+    descriptions = {
+        i: clean_description(description) for i, description in df['Description'].items()
+        if not pd.isna(description) and isinstance(description, str)
+    }
+    processed = list(descriptions)
+    gwt = pd.DataFrame(extract_gwt(list(descriptions.values())), index=processed, columns=GWT_COLUMNS, dtype=object)
+
+    # Label spellings are mapped to canonical labels shared across uploads
+    label_matcher = get_label_matcher()
+    df = assemble_dissect_frame(df, gwt, label_matcher)
+    label_matcher.save()
 
     # Save updated DataFrame to a new CSV file
     output_file_path = os.path.join(settings.MEDIA_ROOT, 'Admin_with_gwt_conditions.csv')
     df.to_csv(output_file_path, index=False)
+    invalidate_artifact(output_file_path)
 
     # Sanitize the DataFrame:
     # Replace NaN, inf, -inf with None so that JSON serialization works properly
@@ -160,18 +219,109 @@ def process_test_cases(file_path):
         'data': df.to_dict('records')
     }
 
+def file_content_hash(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _json_default(value):
+    # numpy scalars that survive the sanitizing step
+    return value.item() if hasattr(value, 'item') else str(value)
+
+def _write_dissect_table(table_path, records):
+    """
+    Store the records as a Parquet table with one string column per field.
+
+    Cells are JSON-encoded so lists (repeated labels), numbers and None come
+    back exactly as process_test_cases returned them.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    columns = list(dict.fromkeys(key for record in records for key in record))
+    table = pa.table({
+        column: pa.array([json.dumps(record.get(column), default=_json_default) for record in records], type=pa.string())
+        for column in columns
+    })
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    atomic_write_bytes(table_path, buffer.getvalue())
+
+def read_dissect_records(table_path, start=0, stop=None):
+    """Decode rows [start, stop) of a cached dissect table."""
+    import pyarrow.parquet as pq
+    # Tables are content-addressed, so a page request only decodes its slice of the cached table
+    table = cached_artifact("dissect_table", table_path, lambda: pq.read_table(table_path))
+    stop = table.num_rows if stop is None else min(stop, table.num_rows)
+    columns = table.slice(start, max(stop - start, 0)).to_pydict()
+    names = list(columns)
+    return [
+        {name: json.loads(value) for name, value in zip(names, row)}
+        for row in zip(*(columns[name] for name in names))
+    ]
+
+def get_dissect_result(file_path):
+    """
+    Dissect `file_path`, reusing the cached result for the same file content
+    and DISSECT_CODE_VERSION. Returns the cached table path and row count
+    instead of the records; read pages with `read_dissect_records`.
+    """
+    if not os.path.exists(file_path):
+        return {'error': 'File not found'}
+
+    # The upload is only re-hashed when it changed on disk
+    content_hash = cached_artifact("sha1", file_path, lambda: file_content_hash(file_path), sizeof=len)
+    key = f"{content_hash}-v{DISSECT_CODE_VERSION}"
+    table_path = os.path.join(DISSECT_CACHE_DIR, f"{key}.parquet")
+    csv_copy_path = os.path.join(DISSECT_CACHE_DIR, f"{key}.csv")
+    meta_path = os.path.join(DISSECT_CACHE_DIR, f"{key}.json")
+    current_path = os.path.join(DISSECT_CACHE_DIR, "current_output.json")
+    output_file_path = os.path.join(settings.MEDIA_ROOT, DISSECT_OUTPUT_NAME)
+
+    with file_lock(os.path.join(DISSECT_CACHE_DIR, f"{key}.lock"), timeout=600):
+        if os.path.exists(table_path) and os.path.exists(meta_path):
+            print(f"✅ Dissect cache hit for {os.path.basename(file_path)} ({key})")
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            # The output CSV has a fixed name; restore it if another input overwrote it since
+            current = {}
+            if os.path.exists(current_path):
+                with open(current_path, 'r', encoding='utf-8') as f:
+                    current = json.load(f)
+            if current.get('key') != key or not os.path.exists(output_file_path):
+                shutil.copyfile(csv_copy_path, output_file_path)
+                invalidate_artifact(output_file_path)
+                atomic_write_json(current_path, {'key': key})
+        else:
+            result = process_test_cases(file_path)
+            if 'error' in result:
+                return result
+            _write_dissect_table(table_path, result['data'])
+            shutil.copyfile(result['output_file_path'], csv_copy_path)
+            meta = {'num_rows': len(result['data']), 'message': result['message']}
+            atomic_write_json(meta_path, meta)
+            atomic_write_json(current_path, {'key': key})
+
+    return {
+        'message': meta['message'],
+        'output_file_path': output_file_path,
+        'table_path': table_path,
+        'num_rows': meta['num_rows'],
+    }
+
 def dissect_test_cases(request):
     file_url = request.GET.get('file_url')
     if not file_url:
         return render(request, 'upload.html', {'error': 'No file URL provided'})
     file_path = os.path.join(settings.MEDIA_ROOT, file_url.lstrip('/'))
 
-    result = process_test_cases(file_path)
+    result = get_dissect_result(file_path)
     if 'error' in result:
         return render(request, 'upload.html', {'error': result['error']})
 
     # Paginate the processed data
-    paginator = Paginator(result['data'], 10)  # 10 records per page
+    paginator = Paginator(read_dissect_records(result['table_path']), 10)  # 10 records per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
@@ -197,6 +347,9 @@ def download_file(request):
     
     file_path = os.path.join(settings.MEDIA_ROOT, relative_file_path)
     
+    # Workbooks registered as artifact exports are written on first download
+    if is_excel_export(file_path):
+        export_excel(file_path)
     if not os.path.exists(file_path):
         raise Http404("File not found")
     
@@ -0,0 +1,291 @@
+"""
+Local background job runner backed by the project's SQLite database.
+
+Long-running pipeline stages (compare, pre-process, label processing) are
+submitted as jobs and return a job ID immediately. Every Django process runs
+a small dispatcher that claims queued jobs from the `bmo_jobs` table and
+executes them on a thread pool, so no external broker is needed. Job state,
+progress and results live in SQLite and survive restarts: queued jobs are
+picked up again, and running jobs whose process died (no heartbeat) are
+marked interrupted and can be retried.
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+import traceback
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED, INTERRUPTED = (
+    "queued", "running", "succeeded", "failed", "cancelled", "interrupted"
+)
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED, INTERRUPTED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bmo_jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress_done INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER NOT NULL DEFAULT 0,
+    progress_message TEXT NOT NULL DEFAULT '',
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS bmo_jobs_status_created ON bmo_jobs (status, created_at);
+"""
+
+# Job kind -> callable(params, progress) returning a JSON-serialisable result
+_job_kinds = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def register_job(kind, fn):
+    _job_kinds[kind] = fn
+
+
+def _connect():
+    connection = sqlite3.connect(str(settings.DATABASES["default"]["NAME"]), timeout=30)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+_schema_ready = False
+
+
+@contextmanager
+def _db():
+    """One short transaction on a fresh connection (committed on success, always closed)."""
+    global _schema_ready
+    connection = _connect()
+    try:
+        if not _schema_ready:
+            connection.executescript(_SCHEMA)
+            _schema_ready = True
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+
+def submit_job(kind, params):
+    if kind not in _job_kinds:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job_id = uuid.uuid4().hex
+    with _db() as connection:
+        connection.execute(
+            "INSERT INTO bmo_jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(params), QUEUED, time.time())
+        )
+    start_job_workers()
+    _dispatcher.wake()
+    return job_id
+
+
+def get_job(job_id):
+    with _db() as connection:
+        return _row_to_job(connection.execute("SELECT * FROM bmo_jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+def list_jobs(limit=50):
+    with _db() as connection:
+        rows = connection.execute(
+            "SELECT * FROM bmo_jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+    jobs = [_row_to_job(row) for row in rows]
+    for job in jobs:
+        job.pop("result", None)  # results can be large; fetch them per job
+    return jobs
+
+
+def cancel_job(job_id):
+    """Cancel a queued job immediately; ask a running job to stop at its next progress update."""
+    with _db() as connection:
+        connection.execute(
+            "UPDATE bmo_jobs SET status = ?, cancel_requested = 1, finished_at = ? WHERE id = ? AND status = ?",
+            (CANCELLED, time.time(), job_id, QUEUED)
+        )
+        connection.execute(
+            "UPDATE bmo_jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING)
+        )
+    return get_job(job_id)
+
+
+def retry_job(job_id):
+    """Requeue a failed, cancelled or interrupted job with the same parameters."""
+    with _db() as connection:
+        updated = connection.execute(
+            "UPDATE bmo_jobs SET status = ?, cancel_requested = 0, error = NULL, result = NULL, "
+            "progress_done = 0, progress_total = 0, progress_message = '', owner = NULL, "
+            "started_at = NULL, finished_at = NULL, heartbeat_at = NULL "
+            "WHERE id = ? AND status IN (?, ?, ?)",
+            (QUEUED, job_id, FAILED, CANCELLED, INTERRUPTED)
+        ).rowcount
+    if updated:
+        start_job_workers()
+        _dispatcher.wake()
+    return get_job(job_id), bool(updated)
+
+
+class JobProgress:
+    """Handed to job functions: report progress and check for cancellation."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def update(self, done, total, message=""):
+        with _db() as connection:
+            connection.execute(
+                "UPDATE bmo_jobs SET progress_done = ?, progress_total = ?, progress_message = ?, heartbeat_at = ? WHERE id = ?",
+                (int(done), int(total), str(message), time.time(), self.job_id)
+            )
+            cancelled = connection.execute(
+                "SELECT cancel_requested FROM bmo_jobs WHERE id = ?", (self.job_id,)
+            ).fetchone()["cancel_requested"]
+        if cancelled:
+            raise JobCancelled()
+
+    def __call__(self, done, total, message=""):
+        self.update(done, total, message)
+
+
+class _Dispatcher:
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.max_workers = max(1, getattr(settings, "JOB_WORKERS", 2))
+        self.heartbeat_timeout = getattr(settings, "JOB_HEARTBEAT_TIMEOUT", 120)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bmo-job")
+        self.running = set()
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name="bmo-job-dispatcher", daemon=True)
+                self.thread.start()
+
+    def wake(self):
+        self.event.set()
+
+    def _loop(self):
+        last_heartbeat = 0.0
+        while True:
+            try:
+                now = time.time()
+                if now - last_heartbeat > self.heartbeat_timeout / 4:
+                    self._heartbeat(now)
+                    self._reap_stale(now)
+                    last_heartbeat = now
+                while len(self.running) < self.max_workers:
+                    job_id = self._claim()
+                    if job_id is None:
+                        break
+                    with self.lock:
+                        self.running.add(job_id)
+                    self.executor.submit(self._run, job_id)
+            except Exception as e:
+                print(f"❌ Job dispatcher error: {e}")
+            self.event.wait(1.0)
+            self.event.clear()
+
+    def _claim(self):
+        # Jobs of a kind this process has not registered stay queued for one that has
+        kinds = list(_job_kinds)
+        if not kinds:
+            return None
+        with _db() as connection:
+            row = connection.execute(
+                f"SELECT id FROM bmo_jobs WHERE status = ? AND kind IN ({', '.join('?' * len(kinds))}) "
+                "ORDER BY created_at LIMIT 1", (QUEUED, *kinds)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            claimed = connection.execute(
+                "UPDATE bmo_jobs SET status = ?, owner = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                "WHERE id = ? AND status = ?",
+                (RUNNING, self.owner, now, now, row["id"], QUEUED)
+            ).rowcount
+        return row["id"] if claimed else None
+
+    def _heartbeat(self, now):
+        with self.lock:
+            running = list(self.running)
+        if running:
+            with _db() as connection:
+                connection.executemany(
+                    "UPDATE bmo_jobs SET heartbeat_at = ? WHERE id = ?", [(now, job_id) for job_id in running]
+                )
+
+    def _reap_stale(self, now):
+        """Running jobs whose process stopped sending heartbeats (e.g. a restart) are marked interrupted."""
+        with _db() as connection:
+            connection.execute(
+                "UPDATE bmo_jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND heartbeat_at < ?",
+                (INTERRUPTED, "Worker stopped before the job finished.", now, RUNNING, now - self.heartbeat_timeout)
+            )
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with _db() as connection:
+            connection.execute(
+                "UPDATE bmo_jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND owner = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, self.owner)
+            )
+
+    def _run(self, job_id):
+        try:
+            job = get_job(job_id)
+            result = _job_kinds[job["kind"]](job["params"], JobProgress(job_id))
+            self._finish(job_id, SUCCEEDED, result=result)
+        except JobCancelled:
+            self._finish(job_id, CANCELLED, error="Cancelled by user.")
+        except Exception as e:
+            self._finish(job_id, FAILED, error=f"{e}\n{traceback.format_exc()}")
+        finally:
+            with self.lock:
+                self.running.discard(job_id)
+            self.wake()
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def start_job_workers():
+    """Start this process's dispatcher (idempotent)."""
+    global _dispatcher
+    # Import the module that registers the job kinds, so queued jobs resume at boot
+    from . import api  # noqa: F401
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = _Dispatcher()
+        _dispatcher.start()
+    return _dispatcher
@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import math
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from difflib import SequenceMatcher
+from django.conf import settings
+from .file_utils import atomic_write_json, file_lock
+
+# Paths
+CANONICAL_LABELS_PATH = os.path.join(settings.MEDIA_ROOT, "models", "canonical_labels.json")
+
+
+def normalize_label(label):
+    label = label.lower().strip()
+    label = re.sub(r"[-]", " ", label)
+    label = re.sub(r"[^\w\s]", "", label)
+    if label.endswith("s"):
+        label = label[:-1]
+    return label
+
+
+def _bigrams(text):
+    padded = f"\x02{text}\x03"
+    return Counter(padded[i:i + 2] for i in range(len(padded) - 1))
+
+
+def _min_matches(total_length, cutoff):
+    """Smallest number of matching characters M with 2*M/total_length >= cutoff (as difflib computes it)."""
+    matches = max(0, math.floor(cutoff * total_length / 2) - 1)
+    while 2.0 * matches / total_length < cutoff:
+        matches += 1
+    return matches
+
+
+class CanonicalLabelMatcher:
+    """
+    Maps raw label spellings to a canonical label, with the same result as
+
+        difflib.get_close_matches(normalize_label(label), keys, n=1, cutoff=cutoff)
+
+    over the keys seen so far (adding the label as a new key when nothing
+    matches), but without scoring every key.
+
+    Candidates are pruned losslessly before the exact SequenceMatcher check:
+      - length: ratio <= 2*min(la, lb) / (la + lb)
+      - padded bigrams: with M matching characters in B blocks, the two
+        strings share at least M - B bigrams, and B - 1 cannot exceed the
+        la + lb - 2*M unmatched characters, so a key needs at least
+        3*M_min - la - lb - 1 shared bigrams to reach the cutoff.
+    Keys are only ever appended, so a resolved raw label is kept in an LRU and
+    later only re-checked against the keys added since.
+    """
+
+    def __init__(self, cutoff=0.8, path=None, cache_size=4096):
+        self.cutoff = cutoff
+        self.path = path
+        self.cache_size = cache_size
+        self.labels = {}                    # normalized key -> canonical label
+        self._keys = []
+        self._positions = {}                 # normalized key -> position
+        self._by_length = defaultdict(list)  # key length -> key positions
+        self._postings = defaultdict(dict)   # bigram -> key length -> [(key position, count)]
+        self._resolved = OrderedDict()       # raw label -> (score, key position, keys checked)
+        self._saved_keys = 0
+        self._lock = threading.RLock()
+        self.stats = {"lookups": 0, "lru_hits": 0, "exact_hits": 0, "fuzzy": 0, "scored": 0}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for key, label in json.load(f).get("labels", {}).items():
+                    self._add(key, label)
+            self._saved_keys = len(self._keys)
+
+    def _add(self, key, label):
+        position = len(self._keys)
+        bigrams = _bigrams(key)
+        self.labels[key] = label
+        self._keys.append(key)
+        self._positions[key] = position
+        self._by_length[len(key)].append(position)
+        for gram, count in bigrams.items():
+            self._postings[gram].setdefault(len(key), []).append((position, count))
+
+    def _best_match(self, word, start=0):
+        """(ratio, key position) of the best key at or after `start`, or None below the cutoff."""
+        word_length = len(word)
+        needed = {}
+        for length in self._by_length:
+            total = length + word_length
+            if total and 2.0 * min(length, word_length) / total >= self.cutoff:
+                needed[length] = 3 * _min_matches(total, self.cutoff) - total - 1
+
+        # Only keys within the length bound are scanned; lengths whose bigram bound is
+        # trivial are checked in full
+        candidates = set()
+        indexed_lengths = []
+        for length, required in needed.items():
+            if required <= 0:
+                candidates.update(p for p in self._by_length[length] if p >= start)
+            else:
+                indexed_lengths.append(length)
+        shared = defaultdict(int)
+        for gram, count in _bigrams(word).items():
+            by_length = self._postings.get(gram)
+            if not by_length:
+                continue
+            for length in indexed_lengths:
+                for position, key_count in by_length.get(length, ()):
+                    if position >= start:
+                        shared[position] += count if count < key_count else key_count
+        candidates.update(p for p, n in shared.items() if needed[len(self._keys[p])] <= n)
+
+        best = None
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        for position in candidates:
+            key = self._keys[position]
+            matcher.set_seq1(key)
+            self.stats["scored"] += 1
+            if matcher.real_quick_ratio() >= self.cutoff and matcher.quick_ratio() >= self.cutoff:
+                score = matcher.ratio()
+                # get_close_matches keeps the largest (score, key)
+                if score >= self.cutoff and (best is None or (score, key) > (best[0], self._keys[best[1]])):
+                    best = (score, position)
+        return best
+
+    def canonical(self, label):
+        """Canonical label for a raw label, registering it when no existing key is close enough."""
+        with self._lock:
+            self.stats["lookups"] += 1
+            cached = self._resolved.get(label)
+            if cached is not None:
+                self._resolved.move_to_end(label)
+                self.stats["lru_hits"] += 1
+                score, position, checked = cached
+                if checked < len(self._keys):
+                    newer = self._best_match(normalize_label(label), start=checked)
+                    if newer is not None and (newer[0], self._keys[newer[1]]) > (score, self._keys[position]):
+                        score, position = newer
+                    self._resolved[label] = (score, position, len(self._keys))
+                return self.labels[self._keys[position]]
+
+            normalized = normalize_label(label)
+            if normalized in self.labels:
+                self.stats["exact_hits"] += 1
+                best = (1.0, self._positions[normalized])
+            else:
+                self.stats["fuzzy"] += 1
+                best = self._best_match(normalized)
+                if best is None:
+                    self._add(normalized, label)
+                    best = (1.0, len(self._keys) - 1)
+            self._resolved[label] = (best[0], best[1], len(self._keys))
+            if len(self._resolved) > self.cache_size:
+                self._resolved.popitem(last=False)
+            return self.labels[self._keys[best[1]]]
+
+    def save(self):
+        """Persist new keys, merging keys other processes saved in the meantime."""
+        if not self.path:
+            return
+        with self._lock:
+            if self._saved_keys == len(self._keys):
+                return
+            with file_lock(self.path + ".lock"):
+                labels = {}
+                if os.path.exists(self.path):
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        labels = json.load(f).get("labels", {})
+                for key in self._keys[self._saved_keys:]:
+                    labels.setdefault(key, self.labels[key])
+                atomic_write_json(self.path, {"cutoff": self.cutoff, "labels": labels})
+            self._saved_keys = len(self._keys)
+            print(f"Canonical labels saved: {len(labels)} keys ({self.stats})")
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_label_matcher():
+    """Process-wide matcher backed by the canonical dictionary shared across uploads."""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = CanonicalLabelMatcher(path=CANONICAL_LABELS_PATH)
+        return _matcher
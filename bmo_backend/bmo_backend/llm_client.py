@@ -0,0 +1,89 @@
+"""
+HTTP client for the local LLM endpoint (Ollama's /api/generate).
+
+Feedback classification used to spawn `ollama run` once per row, with no
+timeout. The client keeps a pooled keep-alive session to the Ollama server
+instead, bounds every call with a (connect, read) timeout, and retries
+connection errors and 429/5xx responses with backoff. `generate_many` runs
+prompts concurrently, at most `max_concurrency` at a time, which is also
+the size of the connection pool.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMClient:
+    def __init__(self, base_url, model, timeout=60.0, connect_timeout=5.0, retries=2, backoff=0.5, max_concurrency=4):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.url = base_url.rstrip("/") + "/api/generate"
+        self.model = model
+        self.timeout = (connect_timeout, timeout)
+        self.max_concurrency = max_concurrency
+        retry = Retry(
+            total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"POST"}), raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def generate(self, prompt):
+        """Response text for one prompt; raises LLMError once retries are exhausted."""
+        import requests
+        with self._slots:
+            try:
+                response = self.session.post(
+                    self.url,
+                    json={"model": self.model, "prompt": prompt, "stream": False, "options": {"temperature": 0}},
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                return response.json().get("response", "")
+            except (requests.RequestException, ValueError) as e:
+                raise LLMError(f"LLM request to {self.url} failed: {e}") from e
+
+    def generate_many(self, prompts):
+        """
+        Responses in prompt order; a prompt whose call failed gets its LLMError
+        in place of the text.
+        """
+        def call(prompt):
+            try:
+                return self.generate(prompt)
+            except LLMError as e:
+                return e
+
+        if len(prompts) <= 1:
+            return [call(prompt) for prompt in prompts]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(prompts))) as executor:
+            return list(executor.map(call, prompts))
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Process-wide client for the configured feedback LLM."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient(
+                settings.FEEDBACK_LLM_URL, settings.FEEDBACK_LLM_MODEL,
+                timeout=settings.FEEDBACK_LLM_TIMEOUT, retries=settings.FEEDBACK_LLM_RETRIES,
+                max_concurrency=settings.FEEDBACK_LLM_CONCURRENCY,
+            )
+        return _client
@@ -0,0 +1,189 @@
+import io
+import os
+import zlib
+import threading
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from .embedding_cache import text_hash
+from .file_utils import atomic_write_bytes, file_lock
+
+# Paths
+MINHASH_DIR = os.path.join(settings.MEDIA_ROOT, "models", "minhash")
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SEED = 1
+
+
+def tokenize_steps(text):
+    """Same tokenization as the Jaccard check in check_semantic_containment."""
+    return set(str(text).lower().split()) if isinstance(text, str) else set()
+
+
+def _permutations(num_perm, seed=_SEED):
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signature(tokens, a, b):
+    """MinHash signature (uint32, one value per permutation) of a token set."""
+    if not tokens:
+        return np.full(len(a), _MAX_HASH, dtype=np.uint32)
+    hashes = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.uint64, count=len(tokens))
+    permuted = np.bitwise_and((np.outer(a, hashes) + b[:, None]) % _MERSENNE_PRIME, _MAX_HASH)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+class MinHashSignatureStore:
+    """
+    Persisted MinHash signatures keyed by the hash of the steps text.
+
+    Only texts not seen before are hashed; the store is rewritten atomically
+    by `save()`.
+    """
+
+    def __init__(self, num_perm, directory=MINHASH_DIR):
+        self.num_perm = num_perm
+        self.path = os.path.join(directory, f"signatures_{num_perm}_{_SEED}.npz")
+        self.lock_path = self.path + ".lock"
+        self.a, self.b = _permutations(num_perm)
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._new = {}
+        if os.path.exists(self.path):
+            data = np.load(self.path, allow_pickle=False)
+            self._rows = {key: row for row, key in enumerate(data["keys"].tolist())}
+            self._signatures = data["signatures"]
+
+    def signatures(self, texts):
+        """Return an (n, num_perm) uint32 matrix, hashing only unseen texts."""
+        keys = [text_hash(text) for text in texts]
+        out = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        hashed = 0
+        with self._lock:
+            for i, (key, text) in enumerate(zip(keys, texts)):
+                if key in self._rows:
+                    out[i] = self._signatures[self._rows[key]]
+                    continue
+                if key not in self._new:
+                    self._new[key] = minhash_signature(tokenize_steps(text), self.a, self.b)
+                    hashed += 1
+                out[i] = self._new[key]
+        print(f"MinHash: {hashed} new signatures, {len(texts) - hashed} reused")
+        return out
+
+    def save(self):
+        with self._lock:
+            if not self._new:
+                return
+            with file_lock(self.lock_path):
+                # Merge with signatures saved by other processes in the meantime
+                if os.path.exists(self.path):
+                    data = np.load(self.path, allow_pickle=False)
+                    keys = data["keys"].tolist()
+                    signatures = data["signatures"]
+                else:
+                    keys, signatures = [], np.empty((0, self.num_perm), dtype=np.uint32)
+                known = set(keys)
+                new_items = [(k, v) for k, v in self._new.items() if k not in known]
+                if new_items:
+                    keys = keys + [k for k, _ in new_items]
+                    signatures = np.vstack([signatures] + [v[None, :] for _, v in new_items])
+                buffer = io.BytesIO()
+                np.savez(buffer, keys=np.array(keys), signatures=signatures)
+                atomic_write_bytes(self.path, buffer.getvalue())
+            self._rows = {key: row for row, key in enumerate(keys)}
+            self._signatures = signatures
+            self._new.clear()
+
+
+def lsh_candidate_pairs(signatures, bands, exclude=None):
+    """
+    Candidate pairs (i < j) whose signatures agree on at least one band.
+
+    Each band is hashed to a 64-bit bucket key; rows listed in `exclude`
+    (e.g. empty step lists) are left out.
+    """
+    num_rows, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    keep = np.ones(num_rows, dtype=bool)
+    if exclude is not None:
+        keep[exclude] = False
+    candidates = np.flatnonzero(keep)
+    multipliers = np.random.RandomState(_SEED).randint(1, 1 << 62, size=rows_per_band, dtype=np.uint64) | np.uint64(1)
+
+    codes = []
+    for band in range(bands):
+        block = signatures[candidates, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+        bucket_keys = (block * multipliers).sum(axis=1, dtype=np.uint64)
+        order = np.argsort(bucket_keys, kind="stable")
+        sorted_keys = bucket_keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        sizes = np.diff(np.r_[starts, len(sorted_keys)])
+        for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+            members = candidates[order[start:start + size]]
+            i, j = np.triu_indices(size, k=1)
+            left, right = np.minimum(members[i], members[j]), np.maximum(members[i], members[j])
+            codes.append(left.astype(np.int64) * num_rows + right)
+
+    if not codes:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    unique_codes = np.unique(np.concatenate(codes))
+    return unique_codes // num_rows, unique_codes % num_rows
+
+
+def find_step_duplicates(test_cases_df, jaccard_threshold=None, num_perm=None, bands=None):
+    """
+    All pairs of test cases whose tokenized Processed_Steps have Jaccard
+    similarity >= `jaccard_threshold`, regardless of description or
+    transaction. LSH proposes candidates in near-linear time; each candidate
+    is then verified with the exact Jaccard score.
+    """
+    jaccard_threshold = jaccard_threshold if jaccard_threshold is not None else getattr(settings, "STEP_DUPLICATE_JACCARD_THRESHOLD", 0.5)
+    num_perm = num_perm or getattr(settings, "MINHASH_NUM_PERM", 128)
+    bands = bands or getattr(settings, "MINHASH_BANDS", 32)
+    columns = ["Test Case 1", "Test Case 2", "Jaccard Score", "Transactions 1", "Transactions 2", "Feedback"]
+
+    cases = test_cases_df.drop_duplicates(subset=["test_case_id"]).reset_index(drop=True)
+    if len(cases) < 2 or "Processed_Steps" not in cases.columns:
+        return pd.DataFrame(columns=columns)
+    steps = cases["Processed_Steps"].fillna("").astype(str).tolist()
+    token_sets = [tokenize_steps(text) for text in steps]
+
+    store = get_signature_store(num_perm)
+    signatures = store.signatures(steps)
+    store.save()
+
+    empty = [i for i, tokens in enumerate(token_sets) if not tokens]
+    left, right = lsh_candidate_pairs(signatures, bands, exclude=empty)
+    scores = np.array([
+        len(token_sets[i] & token_sets[j]) / len(token_sets[i] | token_sets[j]) for i, j in zip(left, right)
+    ], dtype=float)
+    keep = scores >= jaccard_threshold
+    print(f"MinHash LSH: {len(left)} candidate pairs, {int(keep.sum())} with Jaccard >= {jaccard_threshold}")
+
+    transactions = cases["Transactions"] if "Transactions" in cases.columns else pd.Series("", index=cases.index)
+    result = pd.DataFrame({
+        "Test Case 1": cases["test_case_id"].to_numpy()[left[keep]],
+        "Test Case 2": cases["test_case_id"].to_numpy()[right[keep]],
+        "Jaccard Score": np.round(scores[keep], 3),
+        "Transactions 1": transactions.to_numpy()[left[keep]],
+        "Transactions 2": transactions.to_numpy()[right[keep]],
+        "Feedback": "",
+    }, columns=columns)
+    return result.sort_values(["Jaccard Score", "Test Case 1", "Test Case 2"], ascending=[False, True, True], ignore_index=True)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_signature_store(num_perm):
+    with _stores_lock:
+        if num_perm not in _stores:
+            _stores[num_perm] = MinHashSignatureStore(num_perm)
+        return _stores[num_perm]
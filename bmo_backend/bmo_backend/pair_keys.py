@@ -0,0 +1,30 @@
+"""
+Normalized keys for texts and test case pairs.
+
+Kept free of Django settings so the compare worker processes
+(group_compare.py) can import them without a configured project.
+"""
+import re
+
+
+def normalize_text(text):
+    """Collapse whitespace so formatting-only edits still hit the cache."""
+    if text is None:
+        return ""
+    return re.sub(r"\s+", " ", str(text)).strip()
+
+
+def normalize_test_case_id(value):
+    """Test case IDs as text; IDs read back from Excel as floats (899155.0) match their integer form."""
+    text = normalize_text(value)
+    return re.sub(r"^(\d+)\.0+$", r"\1", text)
+
+
+def normalize_transaction(value):
+    return normalize_text(value).lower()
+
+
+def pair_key(transaction_type, test_case_1, test_case_2):
+    """(transaction, test case, test case) with the pair in a fixed order."""
+    first, second = sorted((normalize_test_case_id(test_case_1), normalize_test_case_id(test_case_2)))
+    return normalize_transaction(transaction_type), first, second
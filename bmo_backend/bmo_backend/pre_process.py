@@ -114,20 +114,12 @@
 import os
 import pandas as pd
 import traceback
-import numpy as np
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.conf import settings
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import FAISS
-import faiss
-from langchain.storage import InMemoryStore
-from langchain.schema import Document
-
-# Paths
-FAISS_DB_PATH = os.path.join(settings.MEDIA_ROOT, "models", "faiss_vector_store")
-
-# Initialize Embeddings Model
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+from .embedding_cache import get_embedding_cache
+from .embeddings import embed_in_batches, get_embedding_model
+from .vector_store import upsert_test_cases
+from .artifact_cache import invalidate_artifact
 
 # Function to clean and preprocess test steps
 def clean_test_steps(test_steps):
@@ -142,62 +134,39 @@ def clean_test_steps(test_steps):
     ]
     return "\n".join([f"{step} | {expected}" for step, expected in processed_steps])
 
-# Updated function to process and embed a single test case row with full metadata
-def process_and_embed_row(index, test_cases_df):
-    test_case_id = test_cases_df.loc[index, 'test_case_id']
-    description = test_cases_df.loc[index, 'Description']
-    transaction_type = test_cases_df.loc[index, 'Transactions']
-    steps_text = test_cases_df.loc[index, 'Processed_Steps'] if pd.notna(test_cases_df.loc[index, 'Processed_Steps']) else ""
-    combined_text = f"Test ID:{test_case_id} Description:{description} Transaction:{transaction_type} Steps: {steps_text}"
-    embedding = np.array(embedding_model.embed_documents([combined_text])[0])
-    # Extract all columns as metadata (convert NaN to empty strings)
-    metadata = test_cases_df.loc[index].fillna("").to_dict()
-    return combined_text, embedding, metadata
-
-# Function to load or create FAISS index
-def load_or_create_faiss():
-    if os.path.exists(FAISS_DB_PATH):
-        print("🔄 Loading existing FAISS index...")
-        return FAISS.load_local(FAISS_DB_PATH, embeddings=embedding_model, allow_dangerous_deserialization=True)
-    else:
-        print("🆕 Creating new FAISS index...")
-        dimension = 384  # Adjust based on embedding model
-        index = faiss.IndexFlatL2(dimension)
-        return index  # Return raw FAISS index
-
-# Function to add embeddings to FAISS index
-def add_embeddings_to_faiss(texts, embeddings, metadata_list):
-    """Add embeddings to FAISS index and save it correctly."""
-    vector_store = load_or_create_faiss()
-    # Ensure embeddings are in NumPy format
-    embeddings_np = np.array(embeddings, dtype=np.float32)
-
-    # Create FAISS index
-    faiss_index = faiss.IndexFlatL2(embeddings_np.shape[1])
-    faiss_index.add(embeddings_np)
-
-    # Convert metadata to LangChain Document format
-    documents = {str(i): Document(page_content=texts[i], metadata=metadata_list[i]) for i in range(len(texts))}
-
-    # Use InMemoryStore to store metadata
-    docstore = InMemoryStore()
-    docstore.mset(list(documents.items()))
-    # Map FAISS index IDs to metadata store
-    index_to_docstore_id = {i: str(i) for i in range(len(embeddings))}
-
-    # Create FAISS vector store
-    vector_store = FAISS(embedding_model, faiss_index, docstore, index_to_docstore_id)
-
-    # Save FAISS index and metadata
-    vector_store.save_local(FAISS_DB_PATH)
-
-    print(f"FAISS index updated and saved at {FAISS_DB_PATH}")
+# Function to build the text that gets embedded for a test case
+def build_combined_text(test_case_id, description, transaction_type, steps_text):
+    steps_text = steps_text if pd.notna(steps_text) else ""
+    return f"Test ID:{test_case_id} Description:{description} Transaction:{transaction_type} Steps: {steps_text}"
+
+# Texts and metadata for the embedding stage, in row order
+def build_embedding_rows(test_cases_df):
+    combined_texts = [
+        build_combined_text(test_case_id, description, transaction_type, steps_text)
+        for test_case_id, description, transaction_type, steps_text in zip(
+            test_cases_df['test_case_id'], test_cases_df['Description'],
+            test_cases_df['Transactions'], test_cases_df['Processed_Steps']
+        )
+    ]
+    metadata_list = test_cases_df.fillna("").to_dict(orient="records")
+    return combined_texts, metadata_list
+
+# Batched embedding stage: one vector per text, returned in input order
+def embed_texts_batched(texts, batch_size=None):
+    # Cache hits are served from disk; misses are deduped, length-sorted and encoded in batches
+    return get_embedding_cache().embed(
+        texts,
+        lambda misses: embed_in_batches(misses, get_embedding_model().embed_documents, batch_size)
+    )
 
 # Main function to preprocess test cases and generate embeddings
 def pre_process_test_cases(input_file, transaction_type):
     try:
-        sheet_name = "Matched Labels" if transaction_type == "mapped" else "Unmatched Labels"
-        test_cases_df = pd.read_excel(input_file, sheet_name=sheet_name)
+        if input_file.endswith(".parquet"):
+            test_cases_df = pd.read_parquet(input_file)
+        else:
+            sheet_name = "Matched Labels" if transaction_type == "mapped" else "Not Matched Labels"
+            test_cases_df = pd.read_excel(input_file, sheet_name=sheet_name)
         with ThreadPoolExecutor() as executor:
             futures = {executor.submit(clean_test_steps, test_cases_df.loc[i, 'test_steps']): i for i in range(len(test_cases_df))}
             for future in as_completed(futures):
@@ -207,20 +176,23 @@ def pre_process_test_cases(input_file, transaction_type):
         output_filename = f"processed_test_cases_{transaction_type}.csv"
         output_file = os.path.join(settings.MEDIA_ROOT, output_filename)
         test_cases_df.to_csv(output_file, index=False)
+        invalidate_artifact(output_file)
         
-        combined_texts, combined_vectors, metadata_list = [], [], []
-        with ThreadPoolExecutor() as executor:
-            futures = {executor.submit(process_and_embed_row, i, test_cases_df): i for i in range(len(test_cases_df))}
-            for future in as_completed(futures):
-                text, vector, metadata = future.result()
-                combined_texts.append(text)
-                combined_vectors.append(vector)
-                metadata_list.append(metadata)
-        
-        if combined_vectors:
-            add_embeddings_to_faiss(combined_texts, combined_vectors, metadata_list)
+        combined_texts, metadata_list = build_embedding_rows(test_cases_df)
+
+        # Only new or changed test cases are embedded; removed ones are deleted from the store
+        upsert_stats = upsert_test_cases(
+            test_cases_df['test_case_id'].tolist(), combined_texts, metadata_list,
+            embed_texts_batched, source=transaction_type
+        )
+
+        embedding_cache = get_embedding_cache()
+        embedding_cache.flush()
+        print("Embedding cache:", embedding_cache.stats())
         
-        return output_file, f"Preprocessed {transaction_type} test cases saved successfully, and FAISS index updated."
+        return output_file, (
+            f"Preprocessed {transaction_type} test cases saved successfully, and FAISS index updated "
+            f"({upsert_stats['added']} added, {upsert_stats['updated']} updated, {upsert_stats['deleted']} deleted)."
+        )
     except Exception as e:
         return None, f"❌ Error: {str(e)}\n{traceback.format_exc()}"
-
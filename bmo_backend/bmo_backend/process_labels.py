@@ -1,26 +1,73 @@
 import os
 import re
+import hashlib
+import functools
 import pandas as pd
-from symspellpy.symspellpy import SymSpell
 from django.conf import settings
+from .resources import register_resource, get_resource
+from .symspell_snapshot import load_or_build_sym_spell
+from .artifacts import write_artifact, register_excel_export
+from .artifact_cache import invalidate_artifact
 
-# Initialize SymSpell for spell correction
+# Initialize SymSpell for spell correction (loaded on first use)
 DICTIONARY_PATH = os.path.join(settings.MEDIA_ROOT, "models", "frequency_dictionary_BMO.txt")
+SYMSPELL_SNAPSHOT_DIR = os.path.join(settings.MEDIA_ROOT, "models", "symspell")
+SYMSPELL_MAX_EDIT_DISTANCE = 2
+SYMSPELL_PREFIX_LENGTH = 100
+NORMALIZE_CACHE_SIZE = 65536
+
+# Version of the loaded dictionary; part of the normalization cache key
+_dictionary_version = None
+
+def dictionary_version(path=DICTIONARY_PATH):
+    """Hash of the dictionary file and the SymSpell parameters."""
+    digest = hashlib.sha1(f"{SYMSPELL_MAX_EDIT_DISTANCE}:{SYMSPELL_PREFIX_LENGTH}".encode("utf-8"))
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def load_sym_spell():
+    """SymSpell from the versioned snapshot, rebuilt from the dictionary text when it changed."""
+    global _dictionary_version
+    version = dictionary_version(DICTIONARY_PATH)
+    sym_spell = load_or_build_sym_spell(
+        DICTIONARY_PATH, SYMSPELL_SNAPSHOT_DIR, version, SYMSPELL_MAX_EDIT_DISTANCE, SYMSPELL_PREFIX_LENGTH
+    )
+    _dictionary_version = version
+    return sym_spell
 
-sym_spell = SymSpell(max_dictionary_edit_distance=2, prefix_length=100)
-sym_spell.load_dictionary(DICTIONARY_PATH, term_index=0, count_index=1)
+register_resource("sym_spell", load_sym_spell)
 
 # Global synonym mapping
 CUSTOM_SYNONYMS = {}
 
+def spell_correct(label, sym_spell):
+    """
+    lookup_compound's correction of `label`. When every word is already in the
+    dictionary, lookup_compound neither splits nor combines words and returns
+    them lowercased and space-joined, so the search is skipped.
+    """
+    from symspellpy.helpers import parse_words
+    words = parse_words(label)
+    if words and all(word in sym_spell.words for word in words):
+        return " ".join(words)
+    suggestions = sym_spell.lookup_compound(label, max_edit_distance=SYMSPELL_MAX_EDIT_DISTANCE)
+    return suggestions[0].term if suggestions else label
+
 def normalize_label(label):
     """Normalize transaction labels using spell correction and regex cleanup."""
     if not isinstance(label, str) or not label.strip():
         return None
-    
+    get_resource("sym_spell")  # loads the dictionary and sets its version
+    return _normalize_label(label, _dictionary_version)
+
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_label(label, version):
+    # `version` only keys the cache, so a different dictionary never reuses results
     # Apply spell correction
-    suggestions = sym_spell.lookup_compound(label, max_edit_distance=2)
-    label = suggestions[0].term if suggestions else label
+    label = spell_correct(label, get_resource("sym_spell"))
     
     # Convert to lowercase and remove special characters
     label = label.lower().strip()
@@ -74,7 +121,7 @@ def process_labels(csv_file_path, metadata_file_path, synonyms=None):
         ]
         return "|".join(updated_transactions)
 
-    def map_labels(label_string):
+    def map_labels(label_string, normalized_lookup):
         """Map input labels to known metadata labels using normalization and synonyms."""
         if pd.isna(label_string):
             return None
@@ -95,10 +142,8 @@ def process_labels(csv_file_path, metadata_file_path, synonyms=None):
                 corrected_labels.append(label)
                 continue
             
-            # Normalize and look up in metadata
-            normalized = normalize_label(label)
-            matched_label = normalized_metadata.get(normalized, label)
-            corrected_labels.append(matched_label)
+            # Normalized and looked up in metadata once per distinct label
+            corrected_labels.append(normalized_lookup[label])
         
         return "|".join(corrected_labels)
 
@@ -106,8 +151,19 @@ def process_labels(csv_file_path, metadata_file_path, synonyms=None):
     if synonyms:
         labeled_data["Transactions"] = labeled_data["Transactions"].map(apply_synonyms)
 
-    # Normalize and map transactions
-    labeled_data["Transactions"] = labeled_data["Transactions"].map(map_labels)
+    # Normalize each distinct label once, then map the distinct transaction
+    # strings and spread the results back over the column
+    distinct_labels = labeled_data["Transactions"].dropna().astype(str).str.split("|").explode().str.strip().dropna().unique()
+    normalized_lookup = {
+        label: normalized_metadata.get(normalize_label(label), label)
+        for label in distinct_labels
+        if label not in CUSTOM_SYNONYMS and label not in metadata_labels
+    }
+    mapped = {
+        label_string: map_labels(label_string, normalized_lookup)
+        for label_string in labeled_data["Transactions"].dropna().unique()
+    }
+    labeled_data["Transactions"] = labeled_data["Transactions"].map(mapped)
 
     # Compute transaction counts
     transaction_counts = labeled_data["Transactions"].str.split("|").explode().value_counts()
@@ -136,23 +192,31 @@ def process_labels(csv_file_path, metadata_file_path, synonyms=None):
     if synonyms and previous_synonyms != CUSTOM_SYNONYMS:
         updated_csv_path = csv_file_path.replace(".csv", "_updated.csv")
         labeled_data.to_csv(updated_csv_path, index=False)
+        invalidate_artifact(updated_csv_path)
 
-    # Write summary report to Excel
+    # Write the stage output as artifacts; the summary workbook is exported from them on download.
+    # The matched / not matched summaries are the per-transaction counts the summary view serves.
     output_filename = "transaction_summary.xlsx"
     output_file_path = os.path.join(settings.MEDIA_ROOT, output_filename)
 
     try:
-        with pd.ExcelWriter(output_file_path, engine="openpyxl") as writer:
-            pd.DataFrame(list(metadata_labels), columns=["Baselined Transactions"]).to_excel(
-                writer, sheet_name="Transaction Summary", startrow=1, index=False
-            )
-            matched_records.to_excel(writer, sheet_name="Matched Labels", index=False)
-            not_matched_records.to_excel(writer, sheet_name="Not Matched Labels", index=False)
-            no_transaction_records.to_excel(writer, sheet_name="No Transactions", index=False)
-            matched_summary.to_excel(writer, sheet_name="Transaction Summary", startrow=len(metadata_labels) + 5, startcol=0, index=False)
-            not_matched_summary.to_excel(writer, sheet_name="Transaction Summary", startrow=len(metadata_labels) + 5, startcol=3, index=False)
+        write_artifact("labels/baselined", pd.DataFrame(list(metadata_labels), columns=["Baselined Transactions"]))
+        write_artifact("labels/matched", matched_records)
+        write_artifact("labels/not_matched", not_matched_records)
+        write_artifact("labels/no_transactions", no_transaction_records)
+        write_artifact("labels/matched_summary", matched_summary)
+        write_artifact("labels/not_matched_summary", not_matched_summary)
+        summary_row = len(metadata_labels) + 5
+        register_excel_export(output_file_path, [
+            {"sheet": "Transaction Summary", "artifact": "labels/baselined", "startrow": 1},
+            {"sheet": "Matched Labels", "artifact": "labels/matched"},
+            {"sheet": "Not Matched Labels", "artifact": "labels/not_matched"},
+            {"sheet": "No Transactions", "artifact": "labels/no_transactions"},
+            {"sheet": "Transaction Summary", "artifact": "labels/matched_summary", "startrow": summary_row, "startcol": 0},
+            {"sheet": "Transaction Summary", "artifact": "labels/not_matched_summary", "startrow": summary_row, "startcol": 3},
+        ])
     except Exception as e:
-        return {"error": f"Error writing Excel file: {e}"}
+        return {"error": f"Error writing transaction summary: {e}"}
 
     return {
         "message": "Transactions updated and summary saved successfully!",
@@ -0,0 +1,72 @@
+import time
+import threading
+from django.conf import settings
+
+# Registry of heavy resources (NLP models, spell checkers, embedding models).
+# Modules register a loader at import time; the resource itself is only built
+# on first use, so importing the API (and every manage.py command) stays cheap.
+_loaders = {}
+_resources = {}
+_status = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+
+def register_resource(name, loader):
+    """Register a zero-argument `loader` that builds the resource called `name`."""
+    with _registry_lock:
+        _loaders[name] = loader
+        _locks.setdefault(name, threading.Lock())
+        _status.setdefault(name, {"state": "not_loaded", "load_seconds": None, "error": None})
+
+
+def get_resource(name):
+    """Return the resource, loading it on first use (thread-safe, loaded once)."""
+    if name in _resources:
+        return _resources[name]
+    if name not in _loaders:
+        raise KeyError(f"Unknown resource: {name}")
+    with _locks[name]:
+        if name not in _resources:
+            _status[name] = {"state": "loading", "load_seconds": None, "error": None}
+            start = time.perf_counter()
+            try:
+                resource = _loaders[name]()
+            except Exception as e:
+                _status[name] = {"state": "failed", "load_seconds": None, "error": str(e)}
+                raise
+            _resources[name] = resource
+            _status[name] = {"state": "ready", "load_seconds": round(time.perf_counter() - start, 3), "error": None}
+            print(f"✅ Loaded resource '{name}' in {_status[name]['load_seconds']}s")
+    return _resources[name]
+
+
+def resource_status():
+    with _registry_lock:
+        return {name: dict(_status[name]) for name in _loaders}
+
+
+def warm_up(names=None):
+    """Load the given resources (all registered ones by default); failures are recorded, not raised."""
+    for name in names or list(_loaders):
+        try:
+            get_resource(name)
+        except Exception as e:
+            print(f"❌ Warm-up of '{name}' failed: {e}")
+    return resource_status()
+
+
+def is_ready(names=None):
+    status = resource_status()
+    return all(status[name]["state"] == "ready" for name in (names or status))
+
+
+def start_background_warm_up():
+    """Warm up in a daemon thread when settings.WARM_UP_RESOURCES is enabled."""
+    if not getattr(settings, "WARM_UP_RESOURCES", False):
+        return None
+    # Import the modules that register the pipeline resources
+    from . import api  # noqa: F401
+    thread = threading.Thread(target=warm_up, name="resource-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -133,4 +133,77 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # Replace with your frontend URL
-]
\ No newline at end of file
+]
+# Embedding pipeline
+# Number of texts sent to the embedding model per encode call
+EMBEDDING_BATCH_SIZE = int(os.environ.get('BMO_EMBEDDING_BATCH_SIZE', 64))
+# Unix socket of the shared embedding server (python -m bmo_backend.embedding_server).
+# When set, workers send encode requests there instead of loading the model.
+EMBEDDING_SERVER_SOCKET = os.environ.get('BMO_EMBEDDING_SOCKET') or None
+
+# Model loading
+# spaCy, SymSpell and the embedding model load lazily on first use. Set
+# BMO_WARM_UP_RESOURCES=1 to load them in the background at worker start;
+# /api/ready/ reports 503 until they are loaded.
+WARM_UP_RESOURCES = os.environ.get('BMO_WARM_UP_RESOURCES', '0') == '1'
+
+# GIVEN/WHEN/THEN extraction (input dissect)
+# Descriptions are tokenized with nlp.pipe in batches of GWT_BATCH_SIZE, with the
+# tagger/parser/NER disabled. GWT_N_PROCESS > 1 tokenizes in worker processes.
+GWT_BATCH_SIZE = int(os.environ.get('BMO_GWT_BATCH_SIZE', 256))
+GWT_N_PROCESS = int(os.environ.get('BMO_GWT_N_PROCESS', 1))
+
+# Parsed artifacts (tables, the FAISS store, summaries) kept in memory per worker
+# for the API views; least recently used entries are dropped above this size.
+ARTIFACT_CACHE_MAX_MB = int(os.environ.get('BMO_ARTIFACT_CACHE_MAX_MB', 256))
+
+# Comparison kNN index
+# "flat" is exact; "hnsw" / "ivf" are approximate. "auto" uses flat below
+# COMPARISON_ANN_THRESHOLD vectors per transaction group and HNSW above it.
+# Tune the parameters with benchmarks/bench_ann_recall.py.
+COMPARISON_INDEX_BACKEND = os.environ.get('BMO_COMPARISON_INDEX_BACKEND', 'auto')
+COMPARISON_ANN_THRESHOLD = int(os.environ.get('BMO_COMPARISON_ANN_THRESHOLD', 5000))
+COMPARISON_HNSW_M = int(os.environ.get('BMO_COMPARISON_HNSW_M', 32))
+COMPARISON_HNSW_EF_CONSTRUCTION = int(os.environ.get('BMO_COMPARISON_HNSW_EF_CONSTRUCTION', 80))
+COMPARISON_HNSW_EF_SEARCH = int(os.environ.get('BMO_COMPARISON_HNSW_EF_SEARCH', 64))
+COMPARISON_IVF_NPROBE = int(os.environ.get('BMO_COMPARISON_IVF_NPROBE', 16))
+
+# Incremental compare: per-transaction-group results are cached under
+# media/models/compare_cache/ by a fingerprint of the group's rows and the
+# comparison settings; unchanged groups are reused instead of recomputed.
+COMPARE_INCREMENTAL = os.environ.get('BMO_COMPARE_INCREMENTAL', '1') == '1'
+# Cached group results not used for this many days are deleted.
+COMPARE_CACHE_MAX_AGE_DAYS = int(os.environ.get('BMO_COMPARE_CACHE_MAX_AGE_DAYS', 30))
+# Transaction groups to recompute are compared in this many worker processes
+# (0: one per CPU). Starting the pool takes about a second, so 1 (in-process)
+# suits small inputs; see benchmarks/bench_parallel_compare.py.
+COMPARE_WORKERS = int(os.environ.get('BMO_COMPARE_WORKERS', 1))
+
+# Step-level duplicate detection (MinHash LSH over tokenized Processed_Steps)
+# 32 bands x 4 rows puts the LSH threshold near 0.42, below the Jaccard cut-off.
+STEP_DUPLICATE_JACCARD_THRESHOLD = float(os.environ.get('BMO_STEP_DUPLICATE_JACCARD_THRESHOLD', 0.5))
+MINHASH_NUM_PERM = 128
+MINHASH_BANDS = 32
+
+# Feedback classification (local Ollama server, see llm_client.py)
+# At most FEEDBACK_LLM_CONCURRENCY requests are in flight per worker; each call
+# times out after FEEDBACK_LLM_TIMEOUT seconds and is retried FEEDBACK_LLM_RETRIES times.
+FEEDBACK_LLM_URL = os.environ.get('BMO_FEEDBACK_LLM_URL', 'http://localhost:11434')
+FEEDBACK_LLM_MODEL = os.environ.get('BMO_FEEDBACK_LLM_MODEL', 'mistral')
+FEEDBACK_LLM_TIMEOUT = float(os.environ.get('BMO_FEEDBACK_LLM_TIMEOUT', 60))
+FEEDBACK_LLM_RETRIES = int(os.environ.get('BMO_FEEDBACK_LLM_RETRIES', 2))
+FEEDBACK_LLM_CONCURRENCY = int(os.environ.get('BMO_FEEDBACK_LLM_CONCURRENCY', 4))
+# First tier (feedback_classifier.py): kNN over the saved feedback history. Rows whose
+# confidence is below FEEDBACK_KNN_THRESHOLD go to the LLM; a threshold above 1 disables it.
+FEEDBACK_KNN_K = int(os.environ.get('BMO_FEEDBACK_KNN_K', 5))
+FEEDBACK_KNN_MIN_SIMILARITY = float(os.environ.get('BMO_FEEDBACK_KNN_MIN_SIMILARITY', 0.6))
+FEEDBACK_KNN_THRESHOLD = float(os.environ.get('BMO_FEEDBACK_KNN_THRESHOLD', 0.85))
+# Saved verdicts (feedback_log.py) in compare: PENALIZE pairs are skipped, BOOST pairs
+# get FEEDBACK_BOOST_SCORE added to their similarity score (capped at 1).
+FEEDBACK_BOOST_SCORE = float(os.environ.get('BMO_FEEDBACK_BOOST_SCORE', 0.2))
+
+# Background jobs (stored in the bmo_jobs table of the default SQLite database)
+# Jobs run on this many threads per server process.
+JOB_WORKERS = int(os.environ.get('BMO_JOB_WORKERS', 2))
+# Seconds without a heartbeat before a running job is marked interrupted.
+JOB_HEARTBEAT_TIMEOUT = int(os.environ.get('BMO_JOB_HEARTBEAT_TIMEOUT', 120))
@@ -0,0 +1,103 @@
+"""
+Versioned snapshots of the compiled SymSpell dictionary.
+
+Building SymSpell from the frequency dictionary generates the deletes of every
+word (with prefix_length=100, of the whole word), which is slow and memory
+hungry, and every worker used to repeat it. The compiled state is pickled once
+with SymSpell.save_pickle under media/models/symspell/; the file name carries
+the dictionary version (a hash of the dictionary file and the build
+parameters) and SymSpell's data format version, so a changed dictionary gets a
+fresh snapshot automatically on the next load. Workers only unpickle it.
+
+Build (or rebuild) the snapshot ahead of deployment with:
+
+    python -m bmo_backend.symspell_snapshot [--force]
+"""
+import os
+import gc
+import glob
+import argparse
+from .file_utils import atomic_write_bytes, file_lock
+
+
+def snapshot_path(snapshot_dir, version):
+    from symspellpy.symspellpy import SymSpell
+    return os.path.join(snapshot_dir, f"symspell_{version}_d{SymSpell.data_version}.pkl")
+
+
+def build_sym_spell(dictionary_path, max_edit_distance, prefix_length):
+    from symspellpy.symspellpy import SymSpell
+    sym_spell = SymSpell(max_dictionary_edit_distance=max_edit_distance, prefix_length=prefix_length)
+    sym_spell.load_dictionary(dictionary_path, term_index=0, count_index=1)
+    return sym_spell
+
+
+def load_or_build_sym_spell(dictionary_path, snapshot_dir, version, max_edit_distance, prefix_length, force=False):
+    """
+    Load the snapshot for `version`, or build SymSpell from the dictionary text
+    and write the snapshot (one process builds; others wait for it).
+    """
+    from symspellpy.symspellpy import SymSpell
+    if not os.path.exists(dictionary_path):
+        print(f"⚠️ SymSpell dictionary not found at {dictionary_path}; spell correction is disabled.")
+        return SymSpell(max_dictionary_edit_distance=max_edit_distance, prefix_length=prefix_length)
+
+    path = snapshot_path(snapshot_dir, version)
+
+    def load_snapshot():
+        sym_spell = SymSpell(max_dictionary_edit_distance=max_edit_distance, prefix_length=prefix_length)
+        if not os.path.exists(path):
+            return None
+        # Unpickling millions of delete lists triggers repeated cyclic GC passes that
+        # find nothing to collect; pausing the collector makes the load ~2x faster
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            loaded = sym_spell.load_pickle(path, compressed=False)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        if loaded:
+            print(f"✅ Loaded SymSpell snapshot {os.path.basename(path)}")
+            return sym_spell
+        return None
+
+    if not force:
+        sym_spell = load_snapshot()
+        if sym_spell is not None:
+            return sym_spell
+
+    with file_lock(path + ".lock", timeout=600):
+        # Another process may have written the snapshot while we waited
+        sym_spell = None if force else load_snapshot()
+        if sym_spell is None:
+            print(f"🔄 Building SymSpell from {os.path.basename(dictionary_path)} (snapshot {os.path.basename(path)})...")
+            sym_spell = build_sym_spell(dictionary_path, max_edit_distance, prefix_length)
+            atomic_write_bytes(path, sym_spell.save_pickle(to_bytes=True))
+            for stale in glob.glob(os.path.join(snapshot_dir, "symspell_*.pkl")):
+                if stale != path:
+                    os.remove(stale)
+    return sym_spell
+
+
+def main():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bmo_backend.settings")
+    import django
+    django.setup()
+    from . import process_labels
+
+    parser = argparse.ArgumentParser(description="Build the SymSpell dictionary snapshot.")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if a current snapshot exists.")
+    args = parser.parse_args()
+    if not os.path.exists(process_labels.DICTIONARY_PATH):
+        parser.error(f"dictionary not found: {process_labels.DICTIONARY_PATH}")
+    version = process_labels.dictionary_version(process_labels.DICTIONARY_PATH)
+    load_or_build_sym_spell(
+        process_labels.DICTIONARY_PATH, process_labels.SYMSPELL_SNAPSHOT_DIR, version,
+        process_labels.SYMSPELL_MAX_EDIT_DISTANCE, process_labels.SYMSPELL_PREFIX_LENGTH, force=args.force
+    )
+    print(f"✅ SymSpell snapshot ready: {snapshot_path(process_labels.SYMSPELL_SNAPSHOT_DIR, version)}")
+
+
+if __name__ == "__main__":
+    main()
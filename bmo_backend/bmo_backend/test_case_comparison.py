@@ -1,178 +1,316 @@
 import os
+import json
+import time
+import hashlib
 import pandas as pd
 import numpy as np
-import faiss  # Local FAISS usage for building a temporary index
+from collections import defaultdict
 from django.conf import settings
-from langchain.vectorstores import FAISS as LC_FAISS  # Global FAISS index if needed elsewhere
-from langchain_huggingface import HuggingFaceEmbeddings
-from multiprocessing.pool import ThreadPool
-
-# EXCLUDE_FIELDS: keys to skip during metadata comparison
-EXCLUDE_FIELDS = [
-    "Subject", "test_case_id", "Test Name", "Pre-Condition", "Description", 
-    "No of Steps", "Designer", "Type", "Major Functional Area", "Business Unit", 
-    "test_steps", "Remaining", "Transactions", "Transaction_Count", "Condition", "Processed_Steps"
-]
-
-def compare_metadata(meta1, meta2):
-    differences = {}
-    for key in meta1:
-        if key in EXCLUDE_FIELDS:
-            continue
-        val1 = str(meta1.get(key, ""))
-        val2 = str(meta2.get(key, ""))
-        if val1 != val2:
-            differences[key] = f"{val1}:{val2}"
-    return differences
+from .embedding_cache import EMBEDDING_MODEL_NAME, get_embedding_cache
+from .file_utils import atomic_write_json
+from .embeddings import get_embedding_model
+from .vector_store import load_langchain_store
+from .ann_index import choose_backend
+from .group_compare import DIFFERENCE_COLUMNS, EXCLUDE_FIELDS, PAIR_COLUMNS, compare_groups, metadata_fields, wide_differences
+from .minhash_lsh import find_step_duplicates
+from .artifacts import write_artifact, register_excel_export
+from .artifact_cache import cached_artifact, invalidate_artifact
+from .feedback_log import load_pair_verdicts
+from .pair_keys import normalize_transaction
+
+# Nearest neighbours searched per test case within a transaction group
+COMPARE_NEIGHBOURS = 5
+
+# Per-group results of incremental compare, keyed by the group fingerprint.
+# Bump COMPARE_CODE_VERSION when compare_group changes its output.
+COMPARE_CACHE_DIR = os.path.join(settings.MEDIA_ROOT, "models", "compare_cache")
+COMPARE_CODE_VERSION = "2"
+
+# Test cases embedded per call (progress is reported after each)
+EMBED_PROGRESS_ROWS = 1000
+
+def jaccard_similarity(set1, set2):
+    union = len(set1 | set2)
+    return len(set1 & set2) / union if union else 0
+
+def pairwise_squared_l2(matrix, left, right, chunk_size=65536):
+    """Squared L2 distance (as FAISS IndexFlatL2 reports it) between matrix[left[i]] and matrix[right[i]]."""
+    distances = np.empty(len(left), dtype=np.float32)
+    for start in range(0, len(left), chunk_size):
+        stop = start + chunk_size
+        delta = matrix[left[start:stop]] - matrix[right[start:stop]]
+        distances[start:stop] = np.einsum("ij,ij->i", delta, delta)
+    return distances
 
 def check_semantic_containment(profile_df, diff_df, jaccard_threshold=0.5):
     if profile_df.empty or diff_df.empty:
         return pd.DataFrame()  # Return empty DataFrame if no test cases to process
 
-    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    embedding_model = get_embedding_model()
 
-    # Ensure Processed_Steps are string
-    profile_df["Processed_Steps"] = profile_df["Processed_Steps"].fillna("").astype(str)
+    # Index profile_df by test_case_id once
+    profile = profile_df.assign(
+        test_case_id=profile_df["test_case_id"].astype(str),
+        Processed_Steps=profile_df["Processed_Steps"].fillna("").astype(str)
+    ).drop_duplicates(subset=["test_case_id"])
+    id_index = pd.Index(profile["test_case_id"])
+    steps = profile["Processed_Steps"].tolist()
 
-    # Generate embeddings only for test cases in diff_df
-    test_case_embeddings = {}
-    for _, row in profile_df.iterrows():
-        test_case_embeddings[row["test_case_id"]] = (
-            embedding_model.embed_query(row["Processed_Steps"]) if row["Processed_Steps"].strip() else np.zeros(384)
+    # One embedding matrix for all test cases (cache first, model on misses); empty steps stay zero
+    embeddings = np.zeros((len(steps), 384), dtype=np.float32)
+    non_empty = [i for i, text in enumerate(steps) if text.strip()]
+    if non_empty:
+        embeddings[non_empty] = get_embedding_cache().embed(
+            [steps[i] for i in non_empty],
+            lambda texts: [embedding_model.embed_query(text) for text in texts]
         )
 
-    contained_results = []
+    # Tokenize each test case's steps exactly once
+    token_sets = [set(text.lower().split()) for text in steps]
 
-    def jaccard_similarity(text1, text2):
-        set1, set2 = set(text1.lower().split()), set(text2.lower().split())
-        return len(set1 & set2) / len(set1 | set2) if set1 | set2 else 0
+    # Resolve all pairs to matrix rows and compute their distances in one gather
+    tc1_ids = diff_df["Test Case 1"].astype(str).to_numpy()
+    tc2_ids = diff_df["Test Case 2"].astype(str).to_numpy()
+    left, right = id_index.get_indexer(tc1_ids), id_index.get_indexer(tc2_ids)
+    known = (left >= 0) & (right >= 0)
+    tc1_ids, tc2_ids, left, right = tc1_ids[known], tc2_ids[known], left[known], right[known]
+    distances = pairwise_squared_l2(embeddings, left, right)
+    jaccard_scores = np.array([jaccard_similarity(token_sets[i], token_sets[j]) for i, j in zip(left, right)], dtype=float)
 
-    # Process only the pairs in diff_df
-    for _, row in diff_df.iterrows():
-        tc1_id, tc2_id = str(row["Test Case 1"]), str(row["Test Case 2"])
-        tc1_steps = profile_df.loc[profile_df["test_case_id"] == tc1_id, "Processed_Steps"].values
-        tc2_steps = profile_df.loc[profile_df["test_case_id"] == tc2_id, "Processed_Steps"].values
+    contained = jaccard_scores >= jaccard_threshold
+    print(f"Containment check: {len(left)} pairs compared, {int(contained.sum())} contained (Jaccard >= {jaccard_threshold})")
+    if not contained.any():
+        return pd.DataFrame()
 
-        if tc1_id in test_case_embeddings and tc2_id in test_case_embeddings:
-            embedding1, embedding2 = test_case_embeddings[tc1_id], test_case_embeddings[tc2_id]
-            
-            # FAISS distance computation
-            index = faiss.IndexFlatL2(384)
-            index.add(np.array([embedding1]))
-            D, _ = index.search(np.array([embedding2]), 1)
-            
-            jaccard_score = jaccard_similarity(tc1_steps[0], tc2_steps[0]) if tc1_steps.size and tc2_steps.size else 0
+    return pd.DataFrame({
+        "Test Case 1": tc1_ids[contained],
+        "Test Case 2": tc2_ids[contained],
+        "Contained?": "Yes",
+        "Jaccard Score": np.round(jaccard_scores[contained], 3),
+        "FAISS Distance": np.round(distances[contained], 3),
+        "Feedback": ""
+    })
+
+def comparison_parameters():
+    """Everything besides the group's rows that compare_group's output depends on."""
+    return {
+        "version": COMPARE_CODE_VERSION,
+        "neighbours": COMPARE_NEIGHBOURS,
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "exclude_fields": EXCLUDE_FIELDS,
+        "index": [
+            settings.COMPARISON_INDEX_BACKEND, settings.COMPARISON_ANN_THRESHOLD, settings.COMPARISON_HNSW_M,
+            settings.COMPARISON_HNSW_EF_CONSTRUCTION, settings.COMPARISON_HNSW_EF_SEARCH, settings.COMPARISON_IVF_NPROBE,
+        ],
+        "boost_score": settings.FEEDBACK_BOOST_SCORE,
+    }
+
+def comparison_options():
+    """compare_group arguments taken from the settings (worker processes do not read them)."""
+    return {
+        "neighbours": COMPARE_NEIGHBOURS,
+        "boost_score": settings.FEEDBACK_BOOST_SCORE,
+        "index": {
+            "hnsw_m": settings.COMPARISON_HNSW_M,
+            "ef_construction": settings.COMPARISON_HNSW_EF_CONSTRUCTION,
+            "ef_search": settings.COMPARISON_HNSW_EF_SEARCH,
+            "nprobe": settings.COMPARISON_IVF_NPROBE,
+        },
+    }
+
+def transaction_groups(test_cases_df):
+    """
+    Transaction -> positions of its rows in `test_cases_df`, in sorted
+    transaction order. A test case tagged "A|B" is in both groups without
+    its row being copied; rows without transactions form the "" group.
+    """
+    labels = test_cases_df["Transactions"].fillna("").astype(str).str.split('|').tolist()
+    rows = np.repeat(np.arange(len(labels)), [len(names) for names in labels])
+    names = np.array([name for names in labels for name in names], dtype=object)
+    order = np.argsort(names, kind="stable")
+    transactions, starts = np.unique(names[order], return_index=True)
+    return dict(zip(transactions.tolist(), np.split(rows[order], starts[1:]))) if len(names) else {}
+
+def group_fingerprint(transaction, columns, row_hashes, parameters, verdicts):
+    """
+    Hash of a transaction group: its member rows (content hashes, in order,
+    as order decides pairing), the columns, the comparison parameters and
+    the reviewer verdicts recorded for the transaction.
+    """
+    digest = hashlib.sha1()
+    digest.update(json.dumps([str(transaction), columns, parameters, sorted(verdicts)],
+                             sort_keys=True).encode("utf-8"))
+    digest.update(np.ascontiguousarray(row_hashes, dtype=np.uint64).tobytes())
+    return digest.hexdigest()
+
+def _json_default(value):
+    # numpy scalars in result rows; float32 goes through its shortest repr, as
+    # .item() would widen it with float32 noise (0.0092 -> 0.009200000204145908)
+    if isinstance(value, np.floating):
+        return float(str(value))
+    return value.item() if hasattr(value, "item") else str(value)
+
+def load_group_results(fingerprint):
+    path = os.path.join(COMPARE_CACHE_DIR, f"{fingerprint}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            results = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    os.utime(path)  # recently used entries survive pruning
+    return results
 
-            print(f"Comparing {tc1_id} with {tc2_id} - Jaccard: {jaccard_score:.3f}, FAISS Distance: {D[0][0]:.3f}")
+def store_group_results(fingerprint, results):
+    """Store a group's results; returns them as read back, so fresh and cached groups look the same."""
+    encoded = json.dumps(results, default=_json_default)
+    atomic_write_json(os.path.join(COMPARE_CACHE_DIR, f"{fingerprint}.json"), json.loads(encoded))
+    return json.loads(encoded)
 
-            if jaccard_score >= jaccard_threshold:
-                contained_results.append({
-                    "Test Case 1": tc1_id,
-                    "Test Case 2": tc2_id,
-                    "Contained?": "Yes" if jaccard_score >= jaccard_threshold else "No",
-                    "Jaccard Score": round(jaccard_score, 3),
-                    "FAISS Distance": round(D[0][0], 3),
-                    "Feedback": ""
-                })
+def prune_group_cache(max_age_days=None):
+    max_age_days = settings.COMPARE_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    if not os.path.isdir(COMPARE_CACHE_DIR):
+        return
+    cutoff = time.time() - max_age_days * 86400
+    for name in os.listdir(COMPARE_CACHE_DIR):
+        path = os.path.join(COMPARE_CACHE_DIR, name)
+        if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+            os.remove(path)
 
-    return pd.DataFrame(contained_results)
+def compare_test_cases(file_path, progress_callback=None, incremental=None):
+    """
+    Compare test cases within each transaction group. `progress_callback`,
+    if given, is called as progress_callback(done, total, message) after
+    each transaction group (the job runner uses it for progress and cancellation).
 
-def compare_test_cases(file_path):
+    With `incremental` (default settings.COMPARE_INCREMENTAL), groups whose
+    fingerprint is unchanged since an earlier run reuse their cached result
+    rows; only changed groups are embedded, indexed and diffed again.
+    """
+    incremental = settings.COMPARE_INCREMENTAL if incremental is None else incremental
     # Output paths for CSV and Excel files
     comparison_file_path = os.path.join(settings.MEDIA_ROOT, "comparison_results_all_transactions.csv")
     excel_output_path = os.path.join(settings.MEDIA_ROOT, "comparison_results_all_transactions.xlsx")
     
     # Load global FAISS vector store (if needed elsewhere)
-    faiss_store_path = os.path.join(settings.MEDIA_ROOT, "models", "faiss_vector_store")
-    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    global_vector_store = LC_FAISS.load_local(
-        faiss_store_path,
-        embeddings=embedding_model,
-        allow_dangerous_deserialization=True
-    )
+    embedding_model = get_embedding_model()
+    global_vector_store = load_langchain_store(embedding_model)
     if global_vector_store.index.ntotal == 0:
         raise ValueError("FAISS index is empty! Ensure embeddings were added correctly.")
 
-    # Load test cases CSV
-    test_cases_df = pd.read_csv(file_path)
+    # Load test cases CSV (the parsed frame is cached, so work on a copy)
+    test_cases_df = cached_artifact("csv", file_path, lambda: pd.read_csv(file_path)).copy()
     mapped_transactions = test_cases_df.copy()
-    if "Transactions" in test_cases_df.columns:
-        test_cases_df["Transactions"] = test_cases_df["Transactions"].fillna("").astype(str).str.split('|')
-        test_cases_df = test_cases_df.explode("Transactions").dropna(subset=["Description"])
-    else:
+    if "Transactions" not in test_cases_df.columns:
         raise ValueError("Missing 'Transactions' column in test cases file.")
-    # Process each transaction group to perform metadata comparison
-    grouped = test_cases_df.groupby("Transactions")
-    final_results = []  # Will hold the differences for Sheet4
-
-    # Function to compute an embedding from a text using embed_query
-    def get_embedding(text):
-        return np.array(embedding_model.embed_query(text), dtype=np.float32)
-
-    def process_transaction(transaction, group):
-        results = []
-        test_case_ids = group["test_case_id"].tolist()
-        descriptions = group["Description"].tolist()
-        # Get full metadata for each row in this group
-        metadata_records = group.to_dict('records')
-        print(f"Processing transaction: {transaction}, Test cases count: {len(test_case_ids)}")
-        if len(test_case_ids) > 1:
-            # Compute embeddings (based on descriptions)
-            embeddings = np.array([get_embedding(desc) for desc in descriptions], dtype=np.float32)
-            if embeddings.ndim != 2:
-                raise ValueError("Embeddings must be a 2D array.")
-            dimension = embeddings.shape[1]
-            # Build a local FAISS index for this transaction group
-            index_local = faiss.IndexFlatL2(dimension)
-            index_local.add(embeddings)
-            # Search local index for each test case (k nearest neighbors)
-            k = min(5, len(test_case_ids))
-            D, I = index_local.search(embeddings, k)
-            print(f"Local FAISS search returned distances:\n{D}")
-            print(f"Local FAISS search returned indices:\n{I}")
-            # Create unique pairs based on FAISS results
-            seen_pairs = set()
-            test_case_pairs = []
-            for i in range(len(test_case_ids)):
-                for j_idx, j in enumerate(I[i]):
-                    if j == i:
-                        continue  # Skip self-comparison
-                    test_case_1 = test_case_ids[i]
-                    test_case_2 = test_case_ids[j]
-                    faiss_distance = D[i][j_idx]
-                    similarity_score = 1 / (1 + faiss_distance)
-                    meta1 = metadata_records[i]
-                    meta2 = metadata_records[j]
-                    normalized_pair = tuple(sorted((test_case_1, test_case_2)))
-                    if normalized_pair not in seen_pairs:
-                        seen_pairs.add(normalized_pair)
-                        test_case_pairs.append((transaction, test_case_1, test_case_2, meta1, meta2,faiss_distance, similarity_score))
-            print("Test case pairs (with metadata):", test_case_pairs)
-            # For each pair, compare metadata
-            for pair in test_case_pairs:
-                transaction_val, tc1, tc2, meta1, meta2, faiss_dist, sim_score = pair
-                diff_dict = compare_metadata(meta1, meta2)
-                result_row = {
-                    "Transaction_Type": transaction_val,
-                    "Test Case 1": tc1,
-                    "Test Case 2": tc2,
-                    "Similarity FAISS Distance": round(faiss_dist, 4),
-                    "Similarity Score": round(sim_score, 4)
-                }
-                result_row.update(diff_dict)
-                results.append(result_row)
-                print(f"Compared Test Case {tc1} with Test Case {tc2}:\nDifferences: {diff_dict}\n")
-        return results
-
-    for transaction, group in grouped:
-        final_results.extend(process_transaction(transaction, group))
-    
-    # Create a DataFrame for differences (Sheet4)
-    diff_df = pd.DataFrame(final_results)
+    # One row per test case; each transaction group is a list of row positions into it
+    test_cases_df = test_cases_df.dropna(subset=["Description"])
+    groups = transaction_groups(test_cases_df)
+
+    # Function to compute an embedding from a text using embed_query (cache first)
+    embedding_cache = get_embedding_cache()
+    # Reviewer verdicts from the feedback log, looked up per pair
+    pair_verdicts = load_pair_verdicts()
+    verdict_counts = {"skipped": 0, "boosted": 0}
+    def embed_descriptions(descriptions):
+        return embedding_cache.embed(descriptions, lambda texts: [embedding_model.embed_query(t) for t in texts])
+
+    total_groups = len(groups)
+    parameters = comparison_parameters()
+    # Group membership is given by the positions, so the Transactions column is left out of the row hashes
+    row_hashes = pd.util.hash_pandas_object(test_cases_df.drop(columns=["Transactions"]), index=False).to_numpy()
+    columns = [str(column) for column in test_cases_df.columns]
+    test_case_ids = test_cases_df["test_case_id"].to_numpy()
+    fields = None
+    verdicts_by_transaction = defaultdict(dict)
+    for key, verdict in pair_verdicts.items():
+        verdicts_by_transaction[key[0]][key] = verdict
+
+    # Reuse unchanged groups; the others become tasks for compare_groups
+    group_results = {}
+    tasks = []
+    done = 0
+    for transaction, positions in groups.items():
+        verdicts = verdicts_by_transaction.get(normalize_transaction(transaction), {})
+        fingerprint = group_fingerprint(transaction, columns, row_hashes[positions], parameters,
+                                        [[*key, verdict] for key, verdict in verdicts.items()])
+        results = load_group_results(fingerprint) if incremental else None
+        if results is not None:
+            group_results[transaction] = results
+            done += 1
+            if progress_callback:
+                progress_callback(done, total_groups, f"Reused transaction {transaction}")
+            continue
+        if fields is None:
+            fields = metadata_fields(test_cases_df)
+        tasks.append({
+            "transaction": transaction,
+            "positions": positions,
+            "test_case_ids": test_case_ids[positions].tolist(),
+            # Compared metadata columns of the group's rows
+            "fields": {name: values[positions] for name, values in fields.items()},
+            "verdicts": verdicts,
+            "backend": choose_backend(len(positions)),
+            "fingerprint": fingerprint,
+        })
+
+    # Embed each test case in a group to recompute once (based on descriptions), however many transactions it has
+    needed = [task["positions"] for task in tasks if len(task["positions"]) > 1]
+    needed = np.unique(np.concatenate(needed)) if needed else np.array([], dtype=np.intp)
+    matrix_row = np.full(len(test_cases_df), -1, dtype=np.intp)
+    matrix_row[needed] = np.arange(len(needed))
+    descriptions = test_cases_df["Description"].to_numpy()
+    embedding_blocks = []
+    for start in range(0, len(needed), EMBED_PROGRESS_ROWS):
+        embedding_blocks.append(embed_descriptions(descriptions[needed[start:start + EMBED_PROGRESS_ROWS]].tolist()))
+        if progress_callback:
+            progress_callback(done, total_groups, f"Embedded {min(start + EMBED_PROGRESS_ROWS, len(needed))} of {len(needed)} test cases")
+    embeddings = np.vstack(embedding_blocks) if embedding_blocks else np.zeros((0, 0), dtype=np.float32)
+    for task in tasks:
+        positions = task.pop("positions")
+        task["rows"] = matrix_row[positions] if len(positions) > 1 else np.array([], dtype=np.intp)
+
+    def group_done(task):
+        nonlocal done
+        done += 1
+        if progress_callback:
+            progress_callback(done, total_groups, f"Compared transaction {task['transaction']}")
+
+    # Changed groups are compared in COMPARE_WORKERS processes (largest first), merged back in group order
+    workers = settings.COMPARE_WORKERS or os.cpu_count()
+    outputs = compare_groups(tasks, embeddings, comparison_options(), workers=workers, on_done=group_done)
+    for task, (pairs, differences, counts) in zip(tasks, outputs):
+        group_results[task["transaction"]] = store_group_results(task["fingerprint"], {"pairs": pairs, "differences": differences})
+        for name, count in counts.items():
+            verdict_counts[name] += count
+    # Number the pairs across groups (in group order) and concatenate the columns
+    pair_columns = {column: [] for column in PAIR_COLUMNS}
+    difference_columns = {column: [] for column in DIFFERENCE_COLUMNS}
+    for transaction in groups:
+        results = group_results[transaction]
+        offset = len(pair_columns["Test Case 1"])
+        for column in PAIR_COLUMNS:
+            pair_columns[column].extend(results["pairs"][column])
+        difference_columns["pair"].extend(pair + offset for pair in results["differences"]["pair"])
+        for column in DIFFERENCE_COLUMNS[1:]:
+            difference_columns[column].extend(results["differences"][column])
+    pairs_df = pd.DataFrame(pair_columns)
+    pairs_df.insert(0, "pair_id", np.arange(len(pairs_df)))
+    field_differences_df = pd.DataFrame(difference_columns).rename(columns={"pair": "pair_id"})
+    recomputed = len(tasks)
+
+    embedding_cache.flush()
+    prune_group_cache()
+    print("Embedding cache:", embedding_cache.stats())
+    print(f"Transaction groups: {recomputed} of {total_groups} recomputed, {total_groups - recomputed} reused")
+    print(f"Reviewer verdicts in recomputed groups: {verdict_counts['skipped']} pairs skipped, {verdict_counts['boosted']} boosted")
+
+    # Wide view of the differences (Sheet4)
+    diff_df = wide_differences(pairs_df, field_differences_df)
     # Convert mapped transactions to DataFrame
     mapped_transactions_df = pd.DataFrame(mapped_transactions)
     similar_test_cases = mapped_transactions_df[mapped_transactions_df["test_case_id"].isin(diff_df["Test Case 1"].tolist() + diff_df["Test Case 2"].tolist())]
     unique_test_cases = mapped_transactions_df[~mapped_transactions_df["test_case_id"].isin(similar_test_cases["test_case_id"].tolist())]
+    contained_df = pd.DataFrame()
     # Check for differences in the 'Profile' column where one value is NaN
     if not diff_df.empty:
         profile_diff_df = diff_df[
@@ -192,6 +330,7 @@ def compare_test_cases(file_path):
         if not profile_df.empty:
             print("yes")
             contained_df = check_semantic_containment(profile_df, diff_df) if not profile_df.empty else pd.DataFrame()
+            embedding_cache.flush()
             print("contained_df:",contained_df)
         else:
             contained_df = pd.DataFrame()
@@ -228,16 +367,29 @@ def compare_test_cases(file_path):
         print("⚠️ Warning: diff_df is empty. Skipping merge.")
         merged_df = pd.DataFrame()
 
-    # Write merged results to CSV & Excel
+    # Step-level duplicates across the whole suite, independent of descriptions and transactions
+    step_duplicates_df = find_step_duplicates(mapped_transactions) if "Processed_Steps" in mapped_transactions.columns else pd.DataFrame()
+
+    # Write merged results to CSV and the sheets as artifacts; the workbook is exported on download
     merged_df.to_csv(comparison_file_path, index=False)
+    invalidate_artifact(comparison_file_path)
     comparison_results_json = merged_df.fillna("").to_dict(orient="records")
-    with pd.ExcelWriter(excel_output_path, engine='openpyxl') as writer:
-        mapped_transactions.to_excel(writer, sheet_name="Mapped_Transactions", index=False)
-        unique_test_cases.to_excel(writer, sheet_name="Unique_transaction", index=False)
-        similar_test_cases.to_excel(writer, sheet_name="Similar_transaction", index=False)
-        merged_df.to_excel(writer, sheet_name="Differences", index=False)
-        if not contained_df.empty:
-            contained_df.to_excel(writer, sheet_name="Containment_Check", index=False)
+    sheets = [
+        ("Mapped_Transactions", "comparison/mapped_transactions", mapped_transactions),
+        ("Unique_transaction", "comparison/unique", unique_test_cases),
+        ("Similar_transaction", "comparison/similar", similar_test_cases),
+        ("Differences", "comparison/differences", merged_df),
+    ]
+    if not contained_df.empty:
+        sheets.append(("Containment_Check", "comparison/containment", contained_df))
+    if not step_duplicates_df.empty:
+        sheets.append(("Step_Duplicates", "comparison/step_duplicates", step_duplicates_df))
+    for _, artifact, df in sheets:
+        write_artifact(artifact, df)
+    # Long format, for consumers that do not need the sparse wide sheet
+    write_artifact("comparison/pairs", pairs_df)
+    write_artifact("comparison/field_differences", field_differences_df)
+    register_excel_export(excel_output_path, [{"sheet": sheet, "artifact": artifact} for sheet, artifact, _ in sheets])
 
     print(f"✅ Comparison results saved to {comparison_file_path} and {excel_output_path}")
     return comparison_results_json, comparison_file_path, excel_output_path
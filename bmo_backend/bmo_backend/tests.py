@@ -0,0 +1,41 @@
+"""
+Run with: python manage.py test bmo_backend
+"""
+import os
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from .embedding_cache import EmbeddingCache, EMBEDDING_MODEL_NAME
+from .feedback import feedback_key
+
+
+class EmbeddingCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+
+    def test_directory_named_after_model(self):
+        cache = EmbeddingCache(EMBEDDING_MODEL_NAME, self.cache_dir.name)
+        self.assertEqual(os.path.basename(cache.directory), "sentence-transformers_all-MiniLM-L6-v2")
+
+    def test_flushed_vectors_are_served_without_the_model(self):
+        calls = []
+
+        def embed_fn(texts):
+            calls.append(texts)
+            return [np.full(4, len(text), dtype=np.float32) for text in texts]
+
+        cache = EmbeddingCache(EMBEDDING_MODEL_NAME, self.cache_dir.name)
+        first = cache.embed(["a b", "cd", "a  b"], embed_fn)
+        cache.flush()
+        second = EmbeddingCache(EMBEDDING_MODEL_NAME, self.cache_dir.name).embed(["cd", "a b"], embed_fn)
+        self.assertEqual(calls, [["a b", "cd"]])
+        np.testing.assert_array_equal(second, first[[1, 0]])
+
+
+class FeedbackKeyTests(SimpleTestCase):
+    def test_ids_read_back_as_floats_share_the_key(self):
+        self.assertEqual(feedback_key("T", "899155", "12", "same", model="m"),
+                         feedback_key("T", 12, 899155.0, "same", model="m"))
@@ -21,7 +21,7 @@ from django.urls import path, include
 from django.shortcuts import redirect
 from django.conf import settings
 from django.conf.urls.static import static
-from .api import UploadFileAPIView, DissectTestCasesAPIView, ProcessLabelsAPIView, UploadMetadataAPIView, GetTransactionSummaryAPIView,UpdateTransactionMappingAPIView,PreProcessTestCasesAPI,GetProcessedTestCasesAPI,CompareTestCasesAPI,Feedback,SaveFeedback
+from .api import UploadFileAPIView, DissectTestCasesAPIView, ProcessLabelsAPIView, UploadMetadataAPIView, GetTransactionSummaryAPIView,UpdateTransactionMappingAPIView,PreProcessTestCasesAPI,GetProcessedTestCasesAPI,CompareTestCasesAPI,Feedback,SaveFeedback,EmbeddingCacheStatsAPI,ReadinessAPI,JobListAPI,JobStatusAPI,JobCancelAPI,JobRetryAPI
 from .input_dissect import download_file
 urlpatterns = [
 
@@ -37,6 +37,12 @@ urlpatterns = [
     path('api/compare-test-cases/', CompareTestCasesAPI.as_view(), name='compare_test_cases'),
     path('api/upload-feedback/', Feedback.as_view(), name='feedback'),
     path('api/save-feedback/',SaveFeedback.as_view(),name='save-feedback'),
+    path('api/embedding-cache-stats/', EmbeddingCacheStatsAPI.as_view(), name='embedding-cache-stats'),
+    path('api/ready/', ReadinessAPI.as_view(), name='ready'),
+    path('api/jobs/', JobListAPI.as_view(), name='jobs'),
+    path('api/jobs/<str:job_id>/', JobStatusAPI.as_view(), name='job-status'),
+    path('api/jobs/<str:job_id>/cancel/', JobCancelAPI.as_view(), name='job-cancel'),
+    path('api/jobs/<str:job_id>/retry/', JobRetryAPI.as_view(), name='job-retry'),
 
 ]
 
@@ -0,0 +1,163 @@
+import os
+import json
+import pickle
+import shutil
+import tempfile
+import numpy as np
+import faiss
+from django.conf import settings
+from .embedding_cache import text_hash
+from .file_utils import file_lock
+from .artifact_cache import cached_artifact, invalidate_artifact
+
+# Paths
+FAISS_DB_PATH = os.path.join(settings.MEDIA_ROOT, "models", "faiss_vector_store")
+FAISS_BACKUP_PATH = FAISS_DB_PATH + ".old"
+FAISS_LOCK_PATH = FAISS_DB_PATH + ".lock"
+
+# The store directory stays loadable with LangChain's FAISS.load_local:
+#   index.faiss    - IndexIDMap2 over IndexFlatL2, keyed by stable integer IDs
+#   index.pkl      - (docstore, {stable id: test_case_id}) as LangChain expects
+#   manifest.json  - test_case_id -> stable id, text hash and source
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+MANIFEST_FILE = "manifest.json"
+
+
+def recover_vector_store():
+    """Finish an interrupted save: if only the backup survived, put it back."""
+    if not os.path.exists(FAISS_DB_PATH) and os.path.exists(FAISS_BACKUP_PATH):
+        print("⚠️ Restoring FAISS store from backup after an interrupted save.")
+        os.rename(FAISS_BACKUP_PATH, FAISS_DB_PATH)
+
+
+def _load_store(dimension):
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    recover_vector_store()
+    manifest_path = os.path.join(FAISS_DB_PATH, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        if os.path.exists(FAISS_DB_PATH):
+            print("🔄 Existing FAISS store has no manifest; rebuilding it incrementally from this run.")
+        else:
+            print("🆕 Creating new FAISS index...")
+        index = faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+        return index, InMemoryDocstore({}), {}, {"next_id": 0, "entries": {}}
+
+    print("🔄 Loading existing FAISS index...")
+    index = faiss.read_index(os.path.join(FAISS_DB_PATH, INDEX_FILE))
+    with open(os.path.join(FAISS_DB_PATH, DOCSTORE_FILE), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return index, docstore, index_to_docstore_id, manifest
+
+
+def _save_store(index, docstore, index_to_docstore_id, manifest):
+    """Write the store to a temp directory, then swap it in so a crash never leaves a half-written store."""
+    parent = os.path.dirname(FAISS_DB_PATH)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".faiss_vector_store-")
+    try:
+        faiss.write_index(index, os.path.join(tmp_dir, INDEX_FILE))
+        with open(os.path.join(tmp_dir, DOCSTORE_FILE), "wb") as f:
+            pickle.dump((docstore, index_to_docstore_id), f)
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    if os.path.exists(FAISS_BACKUP_PATH):
+        shutil.rmtree(FAISS_BACKUP_PATH)
+    if os.path.exists(FAISS_DB_PATH):
+        os.rename(FAISS_DB_PATH, FAISS_BACKUP_PATH)
+    os.rename(tmp_dir, FAISS_DB_PATH)
+    shutil.rmtree(FAISS_BACKUP_PATH, ignore_errors=True)
+    invalidate_artifact(FAISS_DB_PATH)
+
+
+def upsert_test_cases(test_case_ids, texts, metadata_list, embed_fn, source=None, delete_missing=True, dimension=384):
+    """
+    Upsert test cases into the persisted FAISS store, keyed by test_case_id.
+
+    New test cases get a fresh stable integer ID, test cases whose text hash
+    changed are re-embedded under their existing ID, and (with
+    `delete_missing`) test cases previously indexed from the same `source`
+    but absent from this batch are deleted. `embed_fn` (list of texts ->
+    matrix) is only called for new or changed texts.
+    """
+    from langchain.schema import Document
+
+    # Last occurrence wins if a test case appears twice in the batch
+    rows = {}
+    for test_case_id, text, metadata in zip(test_case_ids, texts, metadata_list):
+        rows[str(test_case_id)] = (text, metadata)
+
+    with file_lock(FAISS_LOCK_PATH, timeout=600):
+        index, docstore, index_to_docstore_id, manifest = _load_store(dimension)
+        entries = manifest["entries"]
+
+        to_embed, to_remove = [], []
+        added = updated = unchanged = 0
+        for test_case_id, (text, metadata) in rows.items():
+            digest = text_hash(text)
+            entry = entries.get(test_case_id)
+            if entry is None:
+                entry = {"id": manifest["next_id"], "hash": digest, "source": source}
+                manifest["next_id"] += 1
+                entries[test_case_id] = entry
+                to_embed.append((entry["id"], text))
+                added += 1
+            elif entry["hash"] != digest:
+                entry.update(hash=digest, source=source)
+                to_remove.append(entry["id"])
+                to_embed.append((entry["id"], text))
+                updated += 1
+            else:
+                entry["source"] = source
+                unchanged += 1
+            # Metadata is refreshed even when the text (and vector) did not change
+            docstore._dict[test_case_id] = Document(page_content=text, metadata=metadata)
+            index_to_docstore_id[entry["id"]] = test_case_id
+
+        deleted = 0
+        if delete_missing:
+            for test_case_id in [tc for tc, e in entries.items() if e.get("source") == source and tc not in rows]:
+                entry = entries.pop(test_case_id)
+                to_remove.append(entry["id"])
+                docstore._dict.pop(test_case_id, None)
+                index_to_docstore_id.pop(entry["id"], None)
+                deleted += 1
+
+        if to_remove:
+            index.remove_ids(np.array(to_remove, dtype=np.int64))
+        if to_embed:
+            vectors = np.asarray(embed_fn([text for _, text in to_embed]), dtype=np.float32)
+            index.add_with_ids(vectors, np.array([stable_id for stable_id, _ in to_embed], dtype=np.int64))
+
+        _save_store(index, docstore, index_to_docstore_id, manifest)
+
+    stats = {"added": added, "updated": updated, "deleted": deleted, "unchanged": unchanged, "total": int(index.ntotal)}
+    print(f"FAISS index upserted and saved at {FAISS_DB_PATH}: {stats}")
+    return stats
+
+
+def _langchain_store_size(store):
+    documents = store.docstore._dict.values()
+    return store.index.ntotal * store.index.d * 4 + sum(len(doc.page_content) for doc in documents)
+
+
+def load_langchain_store(embeddings):
+    """
+    Load the persisted store as a LangChain FAISS vector store. The loaded
+    store is cached until the files are replaced by the next save; treat it
+    as read-only.
+    """
+    from langchain.vectorstores import FAISS as LC_FAISS
+    recover_vector_store()
+    paths = [os.path.join(FAISS_DB_PATH, name) for name in (INDEX_FILE, DOCSTORE_FILE, MANIFEST_FILE)]
+    return cached_artifact(
+        f"langchain_store:{id(embeddings)}", paths,
+        lambda: LC_FAISS.load_local(FAISS_DB_PATH, embeddings=embeddings, allow_dangerous_deserialization=True),
+        sizeof=_langchain_store_size
+    )